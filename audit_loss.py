@@ -1,6 +1,13 @@
+import os
+import sys
+
 import pandas as pd
 import ast
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
+
+import storage  # noqa: E402
+
 # === CARGA ===
 # Ajusta rutas si es necesario
 raw_path = "data/raw/dataset.csv"          # <- cambia si tu raw está en otro lugar
@@ -16,7 +23,7 @@ except Exception as e:
     exit()
 
 try:
-    clean_df = pd.read_csv(clean_path)
+    clean_df = storage.read_table(clean_path)  # Parquet si existe, si no el CSV
     print(f"[OK] Clean loaded: {len(clean_df)} rows")
 except Exception as e:
     print(f"[ERROR] Could not load clean: {e}")
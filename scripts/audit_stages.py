@@ -1,6 +1,11 @@
-import pandas as pd
+import os
+import sys
 from pathlib import Path
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import storage  # noqa: E402
+
 BASE = Path("data/processed")
 
 FILES = {
@@ -13,9 +18,10 @@ FILES = {
 }
 
 def safe_read(path: Path):
-    if not path.exists():
+    # Parquet (data/processed ya no exporta CSV) o el CSV si es lo único que hay
+    if not storage.exists(str(path)):
         return None
-    return pd.read_csv(path)
+    return storage.read_table(str(path))
 
 def count_unique(df, cols):
     if df is None: 
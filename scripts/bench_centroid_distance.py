@@ -0,0 +1,143 @@
+"""
+Benchmark + equivalencia: distancia coseno medio -> centroides (global / grupos)
+con dicts por medio (build_distance_stage3_monthly original) vs producto disperso
+por mes (src/centroid_distance.py), sobre todos los meses.
+
+Uso:
+    python scripts/bench_centroid_distance.py --rows 3000000 --medios 40 --groups MX US CA
+    python scripts/bench_centroid_distance.py --path data/bi/agenda_counts_stage3_monthly.csv
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import storage  # noqa: E402
+from centroid_distance import centroid_distances, default_groups, group_column  # noqa: E402
+
+META = "data/bi/media_metadata.csv"
+
+
+def synthetic_counts(rows: int, medios: int, groups, seed: int = 11):
+    rng = np.random.default_rng(seed)
+    names = np.array([f"medio {i:03d}" for i in range(medios)], dtype=object)
+    ents = np.array([f"entidad {i}" for i in range(100_000)], dtype=object)
+    df = pd.DataFrame({
+        "month": rng.choice(pd.period_range("2023-01", "2024-12", freq="M").astype(str), rows),
+        "Medio": rng.choice(names, rows),
+        "entity_canon": ents[rng.zipf(1.25, rows) % len(ents)],
+        "count": rng.integers(1, 20, rows),
+    })
+    df = df.groupby(["month", "Medio", "entity_canon"], as_index=False)["count"].sum()
+    # algunos medios sin grupo (fuera de media_metadata)
+    meta = pd.DataFrame({"Medio": names[: medios - 2], "country_group": rng.choice(groups, medios - 2)})
+    return df, meta
+
+
+def cosine_distance_from_dicts(d1, d2):
+    if not d1 or not d2:
+        return np.nan
+    keys = set(d1) | set(d2)
+    v1 = np.fromiter((d1.get(k, 0.0) for k in keys), dtype=float)
+    v2 = np.fromiter((d2.get(k, 0.0) for k in keys), dtype=float)
+    n1 = np.linalg.norm(v1)
+    n2 = np.linalg.norm(v2)
+    if n1 == 0 or n2 == 0:
+        return np.nan
+    return 1.0 - float(np.dot(v1, v2) / (n1 * n2))
+
+
+def reference(df: pd.DataFrame, meta: pd.DataFrame, groups) -> pd.DataFrame:
+    """Loop original (dict por medio y por referencia), generalizado a `groups`."""
+    df = df.merge(meta, on="Medio", how="left")
+    rows = []
+    for month, mdf in df.groupby("month", sort=True):
+        medio_vec = {medio: dict(zip(sdf["entity_canon"], sdf["count"])) for medio, sdf in mdf.groupby("Medio")}
+        refs = [mdf.groupby("entity_canon")["count"].sum().to_dict()]
+        for g in groups:
+            sub = mdf[mdf["country_group"] == g]
+            refs.append(sub.groupby("entity_canon")["count"].sum().to_dict() if len(sub) else {})
+        for medio, v in medio_vec.items():
+            row = {"month": month, "Medio": medio}
+            for col, r in zip(["dist_to_global_mean"] + [group_column(g) for g in groups], refs):
+                row[col] = cosine_distance_from_dicts(v, r) if r else np.nan
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def month_matrices(df: pd.DataFrame):
+    """(month, medios, X) por mes: lo mismo que entrega monthly_tensor, armado en memoria."""
+    ent_codes, _ = pd.factorize(df["entity_canon"])
+    df = df.assign(_e=ent_codes)
+    n_ent = int(ent_codes.max()) + 1 if len(df) else 0
+    for month, mdf in df.groupby("month", sort=True):
+        rows, medios = pd.factorize(mdf["Medio"], sort=True)
+        X = csr_matrix((mdf["count"].to_numpy(np.float64), (rows, mdf["_e"].to_numpy())),
+                       shape=(len(medios), n_ent))
+        yield month, np.asarray(medios, dtype=object), X
+
+
+def vectorized(mats, meta: pd.DataFrame, groups) -> pd.DataFrame:
+    group_of = dict(zip(meta["Medio"], meta["country_group"]))
+    cols = ["dist_to_global_mean"] + [group_column(g) for g in groups]
+    parts = []
+    for month, medios, X in mats:
+        part = pd.DataFrame(centroid_distances(X, [group_of.get(m) for m in medios], groups), columns=cols)
+        part.insert(0, "Medio", medios)
+        part.insert(0, "month", month)
+        parts.append(part)
+    return pd.concat(parts, ignore_index=True)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--path", default=None, help="tabla de conteos mensuales real (en vez de sintética)")
+    ap.add_argument("--meta", default=META)
+    ap.add_argument("--rows", type=int, default=3_000_000)
+    ap.add_argument("--medios", type=int, default=40)
+    ap.add_argument("--groups", nargs="+", default=None)
+    args = ap.parse_args()
+
+    if args.path:
+        df = storage.read_table(args.path, columns=["month", "Medio", "entity_canon", "count"])
+        meta = storage.read_table(args.meta)
+        groups = args.groups or default_groups(meta["country_group"].dropna())
+    else:
+        groups = args.groups or ["MX", "US"]
+        df, meta = synthetic_counts(args.rows, args.medios, groups)
+    print(f"rows: {len(df):,} | months: {df['month'].nunique()} | medios: {df['Medio'].nunique()} | groups: {groups}")
+
+    t0 = time.perf_counter()
+    ref = reference(df, meta, groups)
+    t_ref = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    mats = list(month_matrices(df))
+    t_prep = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    got = vectorized(mats, meta, groups)
+    t_new = time.perf_counter() - t0
+
+    print(f"dicts per medio      : {t_ref:7.2f}s")
+    print(f"sparse (CSR por mes) : {t_prep:7.2f}s build + {t_new:.2f}s distances ({t_ref / t_new:.0f}x distances only)")
+
+    a = ref.sort_values(["month", "Medio"]).reset_index(drop=True)
+    b = got.sort_values(["month", "Medio"]).reset_index(drop=True)
+    cols = [c for c in a.columns if c.startswith("dist_to_")]
+    same_keys = a[["month", "Medio"]].astype(str).equals(b[["month", "Medio"]].astype(str))
+    same_nan = np.array_equal(np.isnan(a[cols].to_numpy(float)), np.isnan(b[cols].to_numpy(float)))
+    diff = np.nanmax(np.abs(a[cols].to_numpy(float) - b[cols].to_numpy(float))) if len(a) else 0.0
+    if not (same_keys and same_nan and diff < 1e-12):
+        print(f"[FAIL] keys={same_keys} nan_pattern={same_nan} max_abs_diff={diff:.3g}")
+        sys.exit(1)
+    print(f"[OK] identical distances (max abs diff {diff:.1e})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark: entities_long (iterrows legacy vs explode columnar) sobre un corpus sintético.
+
+Uso:
+    python scripts/bench_entities_long.py --articles 200000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from build_dataset import ENTITY_COLS, ENTITY_KEEP_COLS, build_entities_long  # noqa: E402
+from utils import normalize_entity_item  # noqa: E402
+
+
+def entities_long_iterrows(df: pd.DataFrame) -> pd.DataFrame:
+    """Implementación original (iterrows + dict por entidad), como referencia."""
+    rows = []
+    for _, r in df[ENTITY_KEEP_COLS].iterrows():
+        ents = r["Entidades"]
+        if not isinstance(ents, list) or len(ents) == 0:
+            continue
+        for ent in ents:
+            name, etype = normalize_entity_item(ent)
+            if not name:
+                continue
+            rows.append({
+                "URL": r["URL"],
+                "Medio": r["Medio"],
+                "Seccion": r["Seccion"],
+                "fecha_real": r["fecha_real"],
+                "Titulo": r["Titulo"],
+                "predict_emotion": r["predict_emotion"],
+                "intensity": r["intensity"],
+                "polarity": r["polarity"],
+                "entity": name,
+                "entity_type": etype
+            })
+    return pd.DataFrame(rows, columns=ENTITY_COLS)
+
+
+def synthetic_articles(n: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    vocab = [[f"Entidad {i}", t] for i, t in zip(range(5000), np.resize(["PER", "ORG", "LOC", "MISC"], 5000))]
+    # algo de ruido como en Mongo: items vacíos, strings sueltos, listas cortas
+    vocab += [["", "MISC"], [" Trump ", "PER"], "suelto", ["solo"]]
+    n_ents = rng.poisson(12, size=n)
+    ents = [[vocab[j] for j in rng.integers(0, len(vocab), size=k)] for k in n_ents]
+    ents[::50] = [None] * len(ents[::50])
+    return pd.DataFrame({
+        "URL": [f"https://medio.mx/nota/{i}" for i in range(n)],
+        "Medio": rng.choice(["El Universal", "Infobae", "Proceso", "The New York Times"], size=n),
+        "Seccion": "politica",
+        "fecha_real": "2024-05-01",
+        "Titulo": [f"titulo {i}" for i in range(n)],
+        "predict_emotion": rng.choice(["joy", "anger", "others"], size=n),
+        "intensity": rng.random(n),
+        "polarity": rng.random(n),
+        "Entidades": ents,
+    })
+
+
+def timed(fn, df):
+    t0 = time.perf_counter()
+    out = fn(df)
+    return out, time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--articles", type=int, default=100_000)
+    args = ap.parse_args()
+
+    df = synthetic_articles(args.articles)
+    print("[INFO] synthetic articles:", len(df))
+
+    old, t_old = timed(entities_long_iterrows, df)
+    new, t_new = timed(build_entities_long, df)
+
+    pd.testing.assert_frame_equal(old, new)
+    print("[OK] outputs identical, rows:", len(new))
+
+    print(f"iterrows : {t_old:8.2f}s | {len(old) / t_old:>12,.0f} rows/sec")
+    print(f"explode  : {t_new:8.2f}s | {len(new) / t_new:>12,.0f} rows/sec")
+    print(f"speedup  : {t_old / t_new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
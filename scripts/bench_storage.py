@@ -0,0 +1,102 @@
+"""
+Benchmark: CSV vs Parquet (storage.py) en tiempo de lectura y tamaño en disco.
+
+Uso:
+    python scripts/bench_storage.py data/processed/entities_long_clean.csv data/bi/agenda_counts_stage3_monthly.csv
+    python scripts/bench_storage.py --synthetic 2000000     # tabla tipo entities_long sintética
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import storage  # noqa: E402
+
+
+def synthetic_entities(n: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    medios = ["Animal Politico", "El Universal", "Infobae", "La Jornada", "Proceso",
+              "The New York Times", "The Washington Post", "Los Angeles Times"]
+    days = pd.date_range("2024-01-01", "2025-06-30", freq="D").strftime("%Y-%m-%d").to_numpy()
+    ents = np.array([f"entidad {i}" for i in range(50_000)])
+    return pd.DataFrame({
+        "URL": np.char.add("https://medio.mx/nota/", rng.integers(0, n // 10, n).astype(str)),
+        "Medio": rng.choice(medios, n),
+        "Seccion": rng.choice(["politica", "economia", "mundo"], n),
+        "fecha_real": rng.choice(days, n),
+        "predict_emotion": rng.choice(["others", "joy", "anger", "sadness", "fear"], n),
+        "intensity": rng.random(n),
+        "polarity": rng.random(n),
+        "entity_type": rng.choice(["PER", "ORG", "LOC", "MISC"], n),
+        "entity": ents[rng.zipf(1.3, n) % len(ents)],
+        "entity_canon": ents[rng.zipf(1.3, n) % len(ents)],
+    })
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def bench(path: str) -> None:
+    print(f"\n=== {path} ===")
+    if not storage.has_parquet(path):
+        _, t = timed(lambda: storage.csv_to_parquet(path))
+        print(f"[INFO] csv -> parquet: {t:.2f}s")
+
+    header = pd.read_csv(path, nrows=0).columns.tolist()
+    proj = [c for c in ["Medio", "entity_canon", "count"] if c in header][:2] or header[:2]
+
+    df_csv, t_csv = timed(lambda: pd.read_csv(path))
+    df_pq, t_pq = timed(lambda: storage.read_table(path))
+    _, t_csv_proj = timed(lambda: pd.read_csv(path, usecols=proj))
+    _, t_pq_proj = timed(lambda: storage.read_table(path, columns=proj))
+
+    month = None
+    if "month" in header:
+        month = str(df_pq["month"].iloc[len(df_pq) // 2])
+    elif "fecha_real" in header:
+        month = str(pd.to_datetime(df_pq["fecha_real"].iloc[len(df_pq) // 2]).strftime("%Y-%m"))
+    if month:
+        sub, t_pq_month = timed(lambda: storage.read_table(path, columns=proj, months=[month]))
+
+    size = storage.disk_size(path)
+    print(f"rows: {len(df_csv):,} | rows parquet: {len(df_pq):,}")
+    print(f"disk  csv: {size['csv'] / 1e6:9.1f} MB | parquet: {size['parquet'] / 1e6:9.1f} MB "
+          f"({size['parquet'] / max(size['csv'], 1):.2f}x)")
+    print(f"read full      csv: {t_csv:7.2f}s | parquet: {t_pq:7.2f}s ({t_csv / t_pq:.1f}x)")
+    print(f"read {proj} csv: {t_csv_proj:7.2f}s | parquet: {t_pq_proj:7.2f}s ({t_csv_proj / t_pq_proj:.1f}x)")
+    if month:
+        print(f"read month={month} (pushdown) parquet: {t_pq_month:7.2f}s | rows: {len(sub):,}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("paths", nargs="*")
+    ap.add_argument("--synthetic", type=int, default=0, help="filas de una tabla entities_long sintética")
+    args = ap.parse_args()
+
+    paths = list(args.paths)
+    tmp = None
+    if args.synthetic:
+        tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(tmp.name, "entities_long_synthetic.csv")
+        synthetic_entities(args.synthetic).to_csv(path, index=False)
+        paths.append(path)
+
+    if not paths:
+        ap.error("pasa rutas CSV o --synthetic N")
+
+    for p in paths:
+        bench(p)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Dedup global (URL, entity_canon): HashSet64 / modo externo vs drop_duplicates
+sobre la tabla completa, más conteo de duplicados entre chunks que deja pasar
+la ruta por-chunk anterior.
+
+Uso:
+    python scripts/check_dedup.py --rows 2000000 --chunk 200000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from dedup import HashSet64, PairDeduper  # noqa: E402
+
+
+def synthetic_pairs(n: int, seed: int = 0) -> pd.DataFrame:
+    """Filas ordenadas por URL con repeticiones; algunas URLs reaparecen más adelante."""
+    rng = np.random.default_rng(seed)
+    n_urls = max(n // 8, 1)
+    url_id = np.sort(rng.integers(0, n_urls, n))
+    # ~2% de filas re-emitidas lejos (p.ej. la misma nota en dos batches de ingesta)
+    late = rng.random(n) < 0.02
+    url_id[late] = rng.integers(0, n_urls, int(late.sum()))
+    ent_id = rng.zipf(1.5, n) % 5_000
+    return pd.DataFrame({
+        "URL": np.char.add("https://medio.mx/nota/", url_id.astype(str)),
+        "entity_canon": np.char.add("entidad ", ent_id.astype(str)),
+        "row": np.arange(n),
+    })
+
+
+def run(df: pd.DataFrame, chunk: int, mode: str, max_bytes=None) -> tuple:
+    kw = {} if max_bytes is None else {"max_bytes": max_bytes}
+    d = PairDeduper(mode=mode, **kw)
+    parts = []
+    t0 = time.perf_counter()
+    for start in range(0, len(df), chunk):
+        out = d.filter(df.iloc[start:start + chunk])
+        if out is not None:
+            parts.append(out)
+    parts.extend(d.finish())
+    dt = time.perf_counter() - t0
+    return pd.concat(parts, ignore_index=True), d, dt
+
+
+def check_hashset(n: int) -> None:
+    rng = np.random.default_rng(1)
+    keys = rng.integers(0, n // 2, n).astype(np.uint64)   # repetidos + el 0 (slot vacío)
+    hs, ref = HashSet64(capacity=16), set()
+    for start in range(0, n, 10_007):
+        batch = keys[start:start + 10_007]
+        got = hs.add(batch)
+        exp = []
+        for k in batch.tolist():
+            exp.append(k not in ref)
+            ref.add(k)
+        assert np.array_equal(got, np.array(exp)), "HashSet64 != set()"
+    assert hs.size + hs.has_zero == len(ref)
+    print(f"[OK] HashSet64 == set() on {n:,} keys ({len(ref):,} distinct, table {hs.nbytes / 1e6:.1f} MB)")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=2_000_000)
+    ap.add_argument("--chunk", type=int, default=200_000)
+    args = ap.parse_args()
+
+    check_hashset(min(args.rows, 500_000))
+
+    df = synthetic_pairs(args.rows)
+    t0 = time.perf_counter()
+    ref = df.drop_duplicates(subset=["URL", "entity_canon"]).reset_index(drop=True)
+    t_ref = time.perf_counter() - t0
+    print(f"\nrows: {len(df):,} | unique pairs: {len(ref):,} | drop_duplicates (full table): {t_ref:.2f}s")
+
+    legacy, _, _ = run(df, args.chunk, "chunk")
+    _, rep, _ = run(df, args.chunk, "report")
+    print(f"per-chunk dedup keeps {len(legacy) - len(ref):,} cross-chunk duplicates "
+          f"(report mode: {rep.cross_dups:,})")
+    assert rep.cross_dups == len(legacy) - len(ref)
+
+    ok = True
+    for name, mode, mb in [("global", "global", None), ("external", "external", None),
+                           ("global -> external", "global", 1 << 16)]:
+        got, d, dt = run(df, args.chunk, mode, mb)
+        same = got["row"].to_numpy().tolist() == ref["row"].to_numpy().tolist()
+        ok &= same
+        print(f"{name:20s} {dt:6.2f}s ({len(df) / dt:,.0f} rows/s) | out {len(got):,} | "
+              f"{'OK' if same else 'MISMATCH'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
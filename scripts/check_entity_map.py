@@ -0,0 +1,103 @@
+"""
+Equivalencia: store de mapping actualizado incrementalmente (entity_map.update_store
+sobre el store de la corrida anterior) vs reconstrucción desde cero con los conteos
+acumulados.
+
+Escenarios donde ambos deben coincidir:
+  - obrador: corrida 1 {obrador: 5000, obradorr: 900} absorbe obradorr en obrador;
+    corrida 2 agrega "obradorrs" (base obradorr por plural) -> debe ir a obrador.
+  - sintético: corrida 2 agrega variantes plurales (conteo 1) de entidades ya
+    decididas + entidades raras nuevas (debajo de min_global); el orden por volumen
+    no cambia, así que el greedy completo da lo mismo.
+
+Uso:
+    python scripts/check_entity_map.py --n 2000
+"""
+import argparse
+import os
+import random
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from entity_consolidation_hybrid import FUZZY_LIMIT, FUZZY_THRESHOLD, explain_base  # noqa: E402
+from entity_map import empty_store, entity_map_series, update_store  # noqa: E402
+
+META0 = {"version": 0, "history": []}
+
+
+def counts_frame(d: dict) -> pd.DataFrame:
+    return pd.DataFrame({"entity_canon": list(d), "count": list(d.values())})
+
+
+def run(counts: pd.DataFrame, min_global: int, store=None, meta=None):
+    store, meta = update_store(empty_store() if store is None else store, meta or META0, counts,
+                               explain_base, min_global, FUZZY_THRESHOLD, FUZZY_LIMIT)
+    return store, meta
+
+
+def compare(name: str, run1: dict, run2: dict, min_global: int) -> bool:
+    c1 = counts_frame(run1)
+    c12 = pd.concat([c1, counts_frame(run2)], ignore_index=True)
+    store, meta = run(c1, min_global)
+    inc, _ = run(c12, min_global, store, meta)
+    full, _ = run(c12, min_global)
+
+    a = entity_map_series(inc).sort_index()
+    b = entity_map_series(full).reindex(a.index)
+    diff = a[a != b]
+    fuzzy_diff = (inc.set_index("entity_canon")["fuzzy"].sort_index()
+                  != full.set_index("entity_canon")["fuzzy"].reindex(a.index))
+    ok = diff.empty and not fuzzy_diff.any()
+    print(f"[{'OK' if ok else 'FAIL'}] {name}: {len(a):,} canon | mapping diffs: {len(diff)} | "
+          f"fuzzy flag diffs: {int(fuzzy_diff.sum())}")
+    if not ok:
+        print(pd.DataFrame({"incremental": diff, "rebuild": b[diff.index]}).head(10))
+    return ok
+
+
+def synthetic(n: int, min_global: int, seed: int = 5):
+    """Corrida 1: bases con typos y volúmenes separados; corrida 2: plurales + raras."""
+    rng = random.Random(seed)
+    words = ("obrador sheinbaum trump biden harris mexico morena senado guardia hacienda "
+             "banco casa blanca corte justicia estado gobierno ciudad juarez").split()
+    vals = set()
+    while len(vals) < n:
+        w = rng.choice(words)
+        s = list(w)
+        for _ in range(rng.randint(0, 1)):
+            s.insert(rng.randrange(len(s)), rng.choice("aeiou"))
+        extra = rng.choice(words) if rng.random() < .5 else ""
+        vals.add(("".join(s) + " " + extra).strip())
+    vals = sorted(vals)
+    rng.shuffle(vals)
+    # volúmenes distintos con margen (una variante de conteo 1 no reordena)
+    run1 = {v: min_global + 10 * (len(vals) - i) if i < n // 2 else 1 + i % (min_global // 2)
+            for i, v in enumerate(vals)}
+    run2 = {}
+    for v in vals[: n // 2]:
+        if " " not in v and not v.endswith("s"):
+            run2[v + "s"] = 1
+    for i in range(n // 4):
+        run2[f"nueva entidad rara {i}"] = 1 + i % 5
+    run2 = {k: c for k, c in run2.items() if k not in run1}
+    return run1, run2
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=2000)
+    ap.add_argument("--min-global", type=int, default=800)
+    args = ap.parse_args()
+
+    ok = compare("obrador", {"obrador": 5000, "obradorr": 900}, {"obradorrs": 50}, args.min_global)
+    run1, run2 = synthetic(args.n, args.min_global)
+    ok &= compare(f"synthetic n={args.n}", run1, run2, args.min_global)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Equivalencia + benchmark: fuzzy anchor-absorption por bloques (cdist) vs el loop
+original con process.extract de entity_consolidation_hybrid.
+
+Uso:
+    python scripts/check_fuzzy_consolidation.py --n 3000 --n-large 40000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from fuzzy_consolidation import fuzzy_clusters, fuzzy_clusters_reference, score_pairs  # noqa: E402
+
+BASE = [
+    "donald trump", "claudia sheinbaum", "estados unidos", "mexico", "democrat", "republican",
+    "andres manuel lopez obrador", "la casa blanca", "ine", "morena", "t mec", "joe biden",
+    "kamala harris", "united states", "suprema corte de justicia de la nacion", "banco de mexico",
+]
+WORDS = ("de la el los trump biden mexico casa blanca partido nacional estado gobierno ciudad "
+         "juarez norte sur banco secretaria salud hacienda guardia senado camara").split()
+
+
+def synthetic_entities(n: int, seed: int = 3) -> list:
+    """Variantes con typos de entidades base (más de 50 por base: ejercita limit=50) + ruido."""
+    rng = random.Random(seed)
+    vals = set()
+    for b in BASE:
+        vals.add(b)
+        for _ in range(max(n // 40, 60)):
+            s = list(b)
+            for _ in range(rng.randint(0, 2)):
+                i = rng.randrange(len(s))
+                op = rng.random()
+                if op < .4:
+                    s[i] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+                elif op < .7:
+                    s.insert(i, rng.choice("aeiou"))
+                else:
+                    del s[i]
+            vals.add(" ".join("".join(s).split()))
+    while len(vals) < n:
+        vals.add(" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 5))))
+    vals = sorted(v for v in vals if v)
+    rng.shuffle(vals)   # orden "por volumen"
+    return vals[:n]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=3000, help="entidades frecuentes para la equivalencia")
+    ap.add_argument("--n-large", type=int, default=40000, help="escala ~MIN_GLOBAL/10 (solo bloques)")
+    ap.add_argument("--workers", type=int, default=-1)
+    args = ap.parse_args()
+
+    vals = synthetic_entities(args.n)
+    t0 = time.perf_counter()
+    ref = fuzzy_clusters_reference(vals)
+    t_ref = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    got = fuzzy_clusters(vals, workers=args.workers)
+    t_new = time.perf_counter() - t0
+
+    print(f"n={len(vals):,} | absorbed ref={len(ref):,} blocked={len(got):,}")
+    print(f"process.extract loop: {t_ref:7.2f}s | blocked cdist: {t_new:7.2f}s ({t_ref / t_new:.1f}x)")
+    if ref != got:
+        diff = [(k, ref.get(k), got.get(k)) for k in set(ref) | set(got) if ref.get(k) != got.get(k)]
+        print("[FAIL] mismatches:", len(diff), diff[:10])
+        sys.exit(1)
+    print("[OK] identical mapping")
+
+    if args.n_large:
+        vals = synthetic_entities(args.n_large)
+        t0 = time.perf_counter()
+        pi, _, _ = score_pairs(vals, workers=args.workers)
+        t_pairs = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        got = fuzzy_clusters(vals, workers=args.workers)
+        t_new = time.perf_counter() - t0
+        est_ref = t_ref * (len(vals) / args.n) ** 2
+        print(f"\nn={len(vals):,} | pairs >= 93: {len(pi):,} (score {t_pairs:.1f}s) | "
+              f"blocked total: {t_new:.1f}s | absorbed: {len(got):,} | "
+              f"extract loop est.: ~{est_ref / 60:.0f} min")
+
+
+if __name__ == "__main__":
+    main()
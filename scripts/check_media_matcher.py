@@ -0,0 +1,123 @@
+"""
+Equivalencia + throughput: MediaMatcher (Aho-Corasick) vs heurística original
+(match_scalar: loop por patrón) con los sets de clean_entities y clean_entities_pro.
+
+Uso:
+    python scripts/check_media_matcher.py --rows 1000000 --unique 200000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from canon import canon  # noqa: E402
+from media_matcher import MediaMatcher, match_scalar  # noqa: E402
+
+MEDIA_META = os.path.join(os.path.dirname(__file__), "..", "data", "bi", "media_metadata.csv")
+
+PREFIXES = ["diario", "periodico", "revista", "agencia", "portal"]
+SUFFIXES = ["mx", "mexico", "com", "online", "digital", "news"]
+
+AGENCIES_CLEAN = {
+    "reuters", "agencia reuters", "associated press", "the associated press", "ap",
+    "afp", "agence france presse", "france presse", "efe", "agencia efe",
+    "dpa", "deutsche presse agentur", "ani", "tass", "cnn", "bbc",
+}
+AGENCIES_PRO = AGENCIES_CLEAN | {"fox news", "msnbc", "al jazeera"}
+TOKENS_CLEAN = {"reuters", "afp", "efe", "ap", "bbc", "cnn"}
+TOKENS_PRO = {"reuters", "afp", "efe", "ap", "cnn", "bbc", "fox", "msnbc", "aljazeera"}
+
+
+def media_variants(medios):
+    bases = {canon(m) for m in medios}
+    out = set(bases)
+    for b in bases:
+        out.update(f"{p} {b}" for p in PREFIXES)
+        out.update(f"{b} {s}" for s in SUFFIXES)
+        for art in ("el ", "la ", "the "):
+            if b.startswith(art):
+                out.add(b[len(art):])
+    return out
+
+
+def synthetic_entities(media_set, agency_set, n_unique, seed=0):
+    """Mezcla de entidades normales, medios exactos, frases con medios y casos de borde."""
+    rng = np.random.default_rng(seed)
+    words = np.array([
+        "trump", "sheinbaum", "mexico", "estados", "unidos", "ine", "morena", "senado", "stefen",
+        "apple", "capital", "tassel", "cannes", "reutersx", "el", "la", "de", "universal", "jornada",
+        "times", "post", "presse", "news", "fox", "bbc", "ap", "efe", "banco", "ciudad", "juarez",
+        "ñandu", "zocalo", "1", "2024", "ani", "dani", "diana", "proceso", "milenio", "infobaex",
+    ])
+    pats = np.array(sorted(media_set | agency_set))
+    out = set()
+    while len(out) < n_unique:
+        k = int(rng.integers(1, 5))
+        toks = list(rng.choice(words, k))
+        r = rng.random()
+        if r < 0.05:
+            toks = [str(rng.choice(pats))]
+        elif r < 0.15:
+            toks.insert(int(rng.integers(0, len(toks) + 1)), str(rng.choice(pats)))
+        out.add(" ".join(toks))
+    return list(out)
+
+
+def check(name, media_set, agency_set, tokens, empty, values, rows):
+    t0 = time.perf_counter()
+    matcher = MediaMatcher(media_set, agency_set, tokens, empty=empty)
+    t_build = time.perf_counter() - t0
+
+    col = pd.Series(np.asarray(values, dtype=object)[rows])
+
+    t0 = time.perf_counter()
+    ref = col.map(lambda e: match_scalar(e, media_set, agency_set, tokens) if e else empty).to_numpy()
+    t_ref = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    got = matcher.flag(col)
+    t_new = time.perf_counter() - t0
+
+    mism = np.flatnonzero(ref != got)
+    print(f"\n=== {name} ===")
+    print(f"patterns: media={len(media_set)} agency={len(agency_set)} | states={len(matcher.accept)} "
+          f"| build {t_build * 1e3:.1f} ms")
+    print(f"rows: {len(col):,} | unique: {len(values):,} | flagged: {int(got.sum()):,}")
+    print(f"scalar loop : {t_ref:7.2f}s ({len(col) / t_ref:,.0f} rows/s)")
+    print(f"automaton   : {t_new:7.2f}s ({len(col) / t_new:,.0f} rows/s) -> {t_ref / t_new:.1f}x")
+    if len(mism):
+        print("[FAIL] mismatches:", len(mism), col.iloc[mism[:10]].tolist())
+        return False
+    # ruta escalar del autómata
+    assert all(matcher.match(v) == bool(f) for v, f in zip(values[:2000], matcher.flag_values(values[:2000])))
+    print("[OK] identical flags")
+    return True
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--unique", type=int, default=200_000)
+    args = ap.parse_args()
+
+    medios = pd.read_csv(MEDIA_META)["Medio"].tolist()
+    media_set = media_variants(medios)
+    agency_clean = {canon(a) for a in AGENCIES_CLEAN}
+    agency_pro = {canon(a) for a in AGENCIES_PRO}
+
+    values = synthetic_entities(media_set, agency_pro, args.unique) + [""]
+    rng = np.random.default_rng(1)
+    rows = rng.zipf(1.2, args.rows) % len(values)
+
+    ok = check("clean_entities", media_set, agency_clean, TOKENS_CLEAN, True, values, rows)
+    ok &= check("clean_entities_pro", media_set, agency_pro, TOKENS_PRO, False, values, rows)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Equivalencia: storage.replace_partitions (lo que usan los builders --touched-only
+vía incremental.replace_months) vs reescribir la tabla completa con write_table.
+
+Escenarios (tabla de data/bi, así también se compara el export CSV):
+  - todos los meses: los meses tocados cubren todas las particiones existentes
+    (primer --incremental); el esquema tiene que sobrevivir.
+  - parcial: se reemplaza un mes y los demás quedan igual.
+  - mes nuevo: `fresh` trae un mes que no existía.
+  - mes vaciado: un mes tocado sin filas en `fresh` desaparece.
+  - falla al escribir: `fresh` incompatible con el esquema -> el dataset queda
+    como estaba y no quedan directorios de staging.
+
+Uso:
+    python scripts/check_replace_partitions.py
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import storage  # noqa: E402
+
+KEY = ["month", "Medio", "entity_canon"]
+
+
+def counts(months, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    rows = [(m, medio, ent) for m in months for medio in ("Milenio", "Infobae", "NYT")
+            for ent in ("trump", "sheinbaum", "t-mec")]
+    df = pd.DataFrame(rows, columns=KEY)
+    df["count"] = rng.integers(1, 100, len(df))
+    return df
+
+
+def canon(df: pd.DataFrame) -> pd.DataFrame:
+    if not set(KEY) <= set(df.columns):
+        return df  # columnas perdidas: la comparación falla
+    return df.sort_values(KEY).reset_index(drop=True)
+
+
+def compare(name: str, base: pd.DataFrame, fresh: pd.DataFrame, months, tmp: str) -> bool:
+    path = os.path.join(tmp, name.replace(" ", "_"), "data", "bi", "agenda.csv")
+    ref_path = os.path.join(tmp, name.replace(" ", "_") + "_ref", "data", "bi", "agenda.csv")
+    storage.write_table(base, path)
+
+    total = storage.replace_partitions(path, fresh, months)
+    expected = pd.concat([base[~base["month"].isin(months)], fresh], ignore_index=True)
+    storage.write_table(expected, ref_path)
+
+    got, ref = canon(storage.read_table(path)), canon(storage.read_table(ref_path))
+    got_csv, ref_csv = canon(pd.read_csv(path)), canon(pd.read_csv(ref_path))
+    ok = (list(got.columns) == list(ref.columns) and got.equals(ref) and got_csv.equals(ref_csv)
+          and total == len(expected) and storage.list_months(path) == storage.list_months(ref_path))
+    print(f"[{'OK' if ok else 'FAIL'}] {name}: rows={total:,} (esperado {len(expected):,}) | "
+          f"cols={list(got.columns)} | months={storage.list_months(path)}")
+    return ok
+
+
+def check_failure(tmp: str) -> bool:
+    path = os.path.join(tmp, "failure", "data", "bi", "agenda.csv")
+    base = counts(["2024-01", "2024-02"], 0)
+    storage.write_table(base, path)
+    before = canon(storage.read_table(path))
+
+    bad = counts(["2024-02"], 1)
+    bad["count"] = "no-numerico"
+    try:
+        storage.replace_partitions(path, bad, ["2024-02"])
+        raised = False
+    except Exception as e:  # noqa: BLE001
+        raised = True
+        print(f"[INFO] failure: {type(e).__name__}: {e}")
+    leftovers = [n for n in os.listdir(os.path.dirname(storage.parquet_path(path))) if ".staging-" in n or ".old-" in n]
+    ok = raised and canon(storage.read_table(path)).equals(before) and not leftovers
+    print(f"[{'OK' if ok else 'FAIL'}] failure: dataset intacto | sobrantes={leftovers}")
+    return ok
+
+
+def main():
+    base = counts(["2024-01", "2024-02", "2024-03"], 0)
+    with tempfile.TemporaryDirectory() as tmp:
+        ok = compare("all months", base, counts(["2024-01", "2024-02", "2024-03"], 1),
+                     ["2024-01", "2024-02", "2024-03"], tmp)
+        ok &= compare("partial", base, counts(["2024-02"], 2), ["2024-02"], tmp)
+        ok &= compare("new month", base, counts(["2024-03", "2024-04"], 3), ["2024-03", "2024-04"], tmp)
+        ok &= compare("emptied month", base, counts(["2024-03"], 4), ["2024-02", "2024-03"], tmp)
+        ok &= check_failure(tmp)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
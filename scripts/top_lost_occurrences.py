@@ -1,10 +1,15 @@
-import pandas as pd
+import os
+import sys
 
-base = pd.read_csv("data/processed/entities_long.csv",
-                   usecols=["entity","entity_type"], dtype=str, low_memory=False)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
 
-clean = pd.read_csv("data/processed/entities_long_clean.csv",
-                    usecols=["entity","entity_type"], dtype=str, low_memory=False)
+import storage  # noqa: E402
+
+base = storage.read_table("data/processed/entities_long.csv",
+                          columns=["entity","entity_type"], dtype=str)
+
+clean = storage.read_table("data/processed/entities_long_clean.csv",
+                           columns=["entity","entity_type"], dtype=str)
 
 b = base.groupby(["entity_type","entity"]).size().reset_index(name="base_n")
 c = clean.groupby(["entity_type","entity"]).size().reset_index(name="clean_n")
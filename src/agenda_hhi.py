@@ -1,9 +1,11 @@
 import pandas as pd
 import numpy as np
 
+import storage
+
 DATA = "data/processed/agenda_counts_non_media.csv"
 
-df = pd.read_csv(DATA)
+df = storage.read_table(DATA)
 
 # total por medio
 totals = df.groupby("Medio")["count"].sum().reset_index(name="total")
@@ -18,6 +20,6 @@ hhi = (
       .sort_values("HHI", ascending=False)
 )
 
-hhi.to_csv("data/processed/agenda_hhi_by_medio.csv", index=False)
+storage.write_table(hhi, "data/processed/agenda_hhi_by_medio.csv")
 
 print(hhi.head(10))
@@ -1,10 +1,12 @@
 import pandas as pd
 import numpy as np
 
+import storage
+
 DATA = "data/processed/agenda_counts_non_media_cons.csv"
 OUT  = "data/processed/agenda_hhi_by_medio_cons.csv"
 
-df = pd.read_csv(DATA)
+df = storage.read_table(DATA)
 
 totals = df.groupby("Medio")["count"].sum().reset_index(name="total")
 df = df.merge(totals, on="Medio")
@@ -17,6 +19,6 @@ hhi = (
       .sort_values("HHI", ascending=False)
 )
 
-hhi.to_csv(OUT, index=False)
+storage.write_table(hhi, OUT)
 print("[OK] wrote:", OUT)
 print(hhi.head(10))
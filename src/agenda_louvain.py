@@ -1,27 +1,27 @@
+import argparse
+
 import pandas as pd
-import networkx as nx
 import community as community_louvain
 
+import storage
+from similarity_graph import build_graph, edges_from_matrix
+
 SIM_PATH = "data/processed/similarity_cosine.csv"
 OUT_COMM = "data/processed/louvain_communities.csv"
 
 THRESHOLD = 0.45  # puedes ajustar
 
+ap = argparse.ArgumentParser()
+ap.add_argument("--threshold", type=float, default=THRESHOLD)
+ap.add_argument("--top-k", type=int, default=None, help="solo las k aristas más fuertes por medio")
+args = ap.parse_args()
+
 print("[INFO] reading similarity matrix...")
 sim = pd.read_csv(SIM_PATH, index_col=0)
 
-medios = sim.index.tolist()
-
-# construir grafo
-G = nx.Graph()
-
-for i in medios:
-    for j in medios:
-        if i == j:
-            continue
-        weight = sim.loc[i, j]
-        if weight >= THRESHOLD:
-            G.add_edge(i, j, weight=weight)
+# construir grafo (máscara sobre el triángulo superior, aristas en bloque)
+u, v, w = edges_from_matrix(sim, threshold=args.threshold, top_k=args.top_k)
+G = build_graph(u, v, w)
 
 print("[INFO] nodes:", G.number_of_nodes())
 print("[INFO] edges:", G.number_of_edges())
@@ -40,7 +40,7 @@ comm_df = pd.DataFrame({
     "Community": list(partition.values())
 }).sort_values("Community")
 
-comm_df.to_csv(OUT_COMM, index=False)
+storage.write_table(comm_df, OUT_COMM)
 
 print("\nCommunities detected:")
 print(comm_df)
@@ -0,0 +1,60 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+import community as community_louvain
+
+import storage
+from monthly_tensor import load_tensor
+from similarity_graph import build_graph, knn_edges
+from vocab import entity_vocab
+
+INP = "data/bi/agenda_counts_stage3_monthly.csv"
+TOP = "data/bi/top500_stage3.csv"
+OUT = "data/processed/louvain_communities_entities.csv"
+
+K = 10      # vecinos por entidad (grafo kNN disperso)
+SEED = 42
+
+ap = argparse.ArgumentParser()
+ap.add_argument("--k", type=int, default=K)
+ap.add_argument("--threshold", type=float, default=None, help="coseno mínimo por arista")
+ap.add_argument("--top-n", type=int, default=None,
+                help="las N entidades con más menciones (default: top500_stage3)")
+ap.add_argument("--mutual", action="store_true", help="arista solo si es top-k de ambos extremos")
+ap.add_argument("--seed", type=int, default=SEED)
+args = ap.parse_args()
+
+# perfil de cada entidad = conteos sobre las celdas (month, Medio) del tensor;
+# entidades parecidas = aparecen en los mismos medios y meses
+tensor = load_tensor(INP)
+XT = tensor.stacked().X.T.tocsr()
+totals = np.asarray(XT.sum(axis=1)).ravel()
+if args.top_n:
+    ids = np.argsort(-totals, kind="stable")[:args.top_n]
+    ids = ids[totals[ids] > 0]
+else:
+    ids = np.flatnonzero(tensor.names_mask(storage.read_table(TOP)["entity_canon"]))
+names = entity_vocab().values[ids]
+
+u, v, w = knn_edges(XT[ids], names, k=args.k, threshold=args.threshold, mutual=args.mutual)
+G = build_graph(u, v, w)
+
+print("[INFO] nodes:", G.number_of_nodes())
+print("[INFO] edges:", G.number_of_edges())
+
+if G.number_of_edges() == 0:
+    raise SystemExit("Grafo vacío. Sube --k o baja --threshold.")
+
+part = community_louvain.best_partition(G, weight="weight", random_state=args.seed)
+mod = community_louvain.modularity(part, G, weight="weight")
+
+mentions = pd.Series(totals[ids], index=names)
+out = pd.DataFrame(sorted(part.items()), columns=["entity_canon", "Community"])
+out["mentions"] = mentions.reindex(out["entity_canon"]).to_numpy(dtype=np.int64)
+out = out.sort_values(["Community", "mentions"], ascending=[True, False])
+storage.write_table(out, OUT)
+
+print("[INFO] modularity:", mod)
+print("[OK] wrote:", OUT)
+print(out.groupby("Community").head(3).to_string(index=False))
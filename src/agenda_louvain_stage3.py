@@ -1,5 +1,9 @@
+import argparse
+
 import pandas as pd
-import networkx as nx
+
+import storage
+from similarity_graph import build_graph, edges_from_pairs
 
 try:
     import community as community_louvain  # python-louvain
@@ -11,23 +15,25 @@ OUT = "data/processed/louvain_communities_stage3.csv"
 
 THRESH = 0.70  # tuned
 
-df = pd.read_csv(INP)
+ap = argparse.ArgumentParser()
+ap.add_argument("--threshold", type=float, default=THRESH)
+ap.add_argument("--top-k", type=int, default=None, help="solo las k aristas más fuertes por medio")
+args = ap.parse_args()
+
+df = storage.read_table(INP)
 
-G = nx.Graph()
-for _, r in df.iterrows():
-    w = float(r["cosine"])
-    if w >= THRESH:
-        G.add_edge(r["Medio_A"], r["Medio_B"], weight=w)
+u, v, w = edges_from_pairs(df, threshold=args.threshold, top_k=args.top_k)
+G = build_graph(u, v, w)
 
 print("[INFO] nodes:", G.number_of_nodes())
 print("[INFO] edges:", G.number_of_edges())
 
 if G.number_of_nodes() == 0:
-    raise SystemExit("Grafo vacío. Baja THRESH.")
+    raise SystemExit("Grafo vacío. Baja --threshold.")
 
 part = community_louvain.best_partition(G, weight="weight")
 out = pd.DataFrame(sorted(part.items()), columns=["Medio", "Community"])
-out.to_csv(OUT, index=False)
+storage.write_table(out, OUT)
 
 # modularidad (extra útil)
 mod = community_louvain.modularity(part, G, weight="weight")
@@ -1,9 +1,11 @@
 import pandas as pd
 
+import storage
+
 DATA = "data/processed/entities_long_pro_strict.csv"
 
 use = ["Medio","entity_canon","is_media_like"]
-df = pd.read_csv(DATA, usecols=use)
+df = storage.read_table(DATA, columns=use)
 
 # excluir medios/agencias
 df = df[df["is_media_like"] == 0]
@@ -15,7 +17,7 @@ counts = (
       .reset_index(name="count")
 )
 
-counts.to_csv("data/processed/agenda_counts_non_media.csv", index=False)
+storage.write_table(counts, "data/processed/agenda_counts_non_media.csv")
 
 print("Rows:", len(counts))
 print("Medios:", counts["Medio"].nunique())
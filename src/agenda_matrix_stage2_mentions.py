@@ -1,9 +1,11 @@
 import pandas as pd
 
+import storage
+
 INP = "data/processed/mentions_counts_by_medio.csv"
 OUT = "data/processed/agenda_counts_stage2_mentions.csv"
 
-df = pd.read_csv(INP, dtype={"Medio":"string","entity":"string","count":"int64"})
+df = storage.read_table(INP, dtype={"Medio":"string","entity":"string","count":"int64"})
 
 # filtro global mínimo para eliminar ruido
 MIN_COUNT_GLOBAL = 100  # un poco más alto que Stage 3
@@ -13,7 +15,7 @@ keep = set(global_counts[global_counts >= MIN_COUNT_GLOBAL].index)
 
 df = df[df["entity"].isin(keep)].copy()
 
-df.to_csv(OUT, index=False)
+storage.write_table(df, OUT)
 
 print("[OK] wrote:", OUT)
 print("Rows:", len(df))
@@ -1,9 +1,11 @@
 import pandas as pd
 
+import storage
+
 INP = "data/processed/doc_presence_counts_by_medio.csv"
 OUT = "data/processed/agenda_counts_stage3.csv"
 
-df = pd.read_csv(INP, dtype={"Medio":"string","entity_canon":"string","count":"int64"})
+df = storage.read_table(INP, dtype={"Medio":"string","entity_canon":"string","count":"int64"})
 
 # opcional: filtra entidades demasiado raras (ruido)
 MIN_COUNT_GLOBAL = 50
@@ -13,7 +15,7 @@ keep = set(global_counts[global_counts >= MIN_COUNT_GLOBAL].index)
 
 df = df[df["entity_canon"].isin(keep)].copy()
 
-df.to_csv(OUT, index=False)
+storage.write_table(df, OUT)
 print("[OK] wrote:", OUT)
 print("Rows:", len(df))
 print("Unique medios:", df["Medio"].nunique())
@@ -1,78 +1,75 @@
+import argparse
+
 import pandas as pd
 import numpy as np
-from scipy import sparse
-from sklearn.feature_extraction.text import TfidfTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+
+import storage
+from similarity_engine import DROP_SELF, load_matrix, sim_cosine, weight_tfidf
 
 DATA = "data/processed/agenda_counts_non_media_cons.csv"
 OUT_SIM = "data/processed/similarity_cosine.csv"
 OUT_NN  = "data/processed/nearest_neighbors.csv"
 
 # Control de tamaño: usa las entidades más frecuentes globalmente
-TOPK_ENTITIES = 50000  # si quieres más fino: 100k (más RAM/tiempo)
-
-# Opcional: remover self-entities obvias (si no las consolidaste a "")
-DROP_SELF = set([
-    "the new york times",
-    "the washington post",
-    "el universal",
-    "infobae",
-    "reuters",
-    "efe",
-    "afp",
-    "associated press",
-    "the associated press",
-])
-
-print("[INFO] reading counts...")
-df = pd.read_csv(DATA)
-
-# filtra self entities opcional
-df = df[~df["entity_canon"].isin(DROP_SELF)]
-
-# topK entidades por volumen global (para limitar vocabulario)
-global_top = (df.groupby("entity_canon")["count"].sum()
-                .sort_values(ascending=False)
-                .head(TOPK_ENTITIES)
-                .index)
-
-df = df[df["entity_canon"].isin(global_top)].copy()
-
-medios = sorted(df["Medio"].unique().tolist())
-entities = sorted(df["entity_canon"].unique().tolist())
-
-medio_index = {m:i for i,m in enumerate(medios)}
-ent_index = {e:i for i,e in enumerate(entities)}
-
-rows = df["Medio"].map(medio_index).to_numpy()
-cols = df["entity_canon"].map(ent_index).to_numpy()
-vals = df["count"].to_numpy(dtype=np.float64)
-
-X = sparse.csr_matrix((vals, (rows, cols)), shape=(len(medios), len(entities)))
+TOPK_ENTITIES = 50000  # si quieres más fino: 100k (más RAM/tiempo); --full-vocab = sin tope
+N_NEIGHBORS = 5
+CHUNK = 1_000_000
+
+ap = argparse.ArgumentParser()
+ap.add_argument("--full-vocab", action="store_true", help="todas las entidades (sin tope TOPK_ENTITIES)")
+ap.add_argument("--topk", type=int, default=TOPK_ENTITIES)
+ap.add_argument("--chunk", type=int, default=CHUNK, help="filas por chunk al leer los conteos")
+args = ap.parse_args()
+
+# matriz medio × entidad cacheada (similarity_engine): lectura por chunks la
+# primera vez (memoria ~ nnz + un chunk), después se reutiliza
+am = load_matrix(DATA, chunksize=args.chunk)
+
+# filtra self entities opcional (DROP_SELF en similarity_engine)
+am = am.drop_entities(DROP_SELF)
+
+# topK entidades por volumen global (para limitar vocabulario): máscara de
+# columnas (mismo orden/desempate que antes: groupby por nombre -> sort_values -> head)
+if not args.full_vocab:
+    totals = np.asarray(am.X.sum(axis=0)).ravel()
+    present = np.flatnonzero(np.diff(am.X.tocsc().indptr) > 0)
+    by_name = pd.Series(totals[present], index=am.entities[present]).sort_index()
+    global_top = by_name.sort_values(ascending=False).head(args.topk).index
+    am = am.drop_entities(np.setdiff1d(am.entities[present], global_top.to_numpy(dtype=object)))
+
+# filas = medios presentes, en orden alfabético. Las columnas fuera del vocabulario
+# usado quedan en cero y no cambian ni el idf de las demás ni el coseno.
+am = am.nonempty_rows()
+X = am.X
+medios = am.medios.tolist()
 
 print("[INFO] matrix shape:", X.shape, "nnz:", X.nnz)
 
-# TF-IDF sobre counts
-tfidf = TfidfTransformer(norm="l2", use_idf=True, smooth_idf=True, sublinear_tf=True)
-X_tfidf = tfidf.fit_transform(X)
+# TF-IDF sobre counts (sublineal; otras ponderaciones/métricas en agenda_similarity_methods.py)
+X_tfidf = weight_tfidf(X)
 
-# Cosine similarity entre medios (18x18)
-S = cosine_similarity(X_tfidf)
+# Cosine similarity entre medios (X Xᵀ disperso; medios × medios)
+S = sim_cosine(X_tfidf)
 
 sim_df = pd.DataFrame(S, index=medios, columns=medios)
 sim_df.to_csv(OUT_SIM)
 print("[OK] wrote:", OUT_SIM)
 
-# Nearest neighbors (top 5, excluyendo sí mismo)
+# Nearest neighbors (top N, excluyendo sí mismo): argpartition por fila y orden
+# solo de los N candidatos (score desc, luego índice)
+k = min(N_NEIGHBORS, len(medios) - 1)
 rows_out = []
-for i, m in enumerate(medios):
-    sims = list(enumerate(S[i]))
-    sims = sorted(sims, key=lambda t: t[1], reverse=True)
-    for j, score in sims[1:6]:
-        rows_out.append({"Medio": m, "Neighbor": medios[j], "cosine": float(score)})
-
-nn_df = pd.DataFrame(rows_out)
-nn_df.to_csv(OUT_NN, index=False)
+if k > 0:
+    scores = S.copy()
+    np.fill_diagonal(scores, -np.inf)
+    cand = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    cand_scores = np.take_along_axis(scores, cand, axis=1)
+    for i, m in enumerate(medios):
+        for t in np.lexsort((cand[i], -cand_scores[i])):
+            rows_out.append({"Medio": m, "Neighbor": medios[cand[i, t]], "cosine": float(cand_scores[i, t])})
+
+nn_df = pd.DataFrame(rows_out, columns=["Medio", "Neighbor", "cosine"])
+storage.write_table(nn_df, OUT_NN)
 print("[OK] wrote:", OUT_NN)
 
 # imprime preview
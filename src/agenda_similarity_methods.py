@@ -0,0 +1,59 @@
+"""
+Similitud entre medios con varias ponderaciones × métricas en una sola corrida,
+sobre la matriz Medio × entidad cacheada (similarity_engine.load_matrix).
+
+Salida long-form (Medio_A, Medio_B, raw_cosine, raw_js, ..., ppmi_hellinger):
+comparar métodos no requiere volver a correr el pipeline.
+
+Uso:
+    python src/agenda_similarity_methods.py                       # non_media_cons, todo
+    python src/agenda_similarity_methods.py --source stage3 --weightings tfidf bm25 --metrics cosine js
+"""
+import argparse
+
+import pandas as pd
+
+import storage
+from similarity_engine import DROP_SELF, METRICS, WEIGHTINGS, all_similarities, load_matrix, pairs_frame
+
+SOURCES = {
+    "non_media_cons": ("data/processed/agenda_counts_non_media_cons.csv", "entity_canon"),
+    "stage3": ("data/processed/agenda_counts_stage3.csv", "entity_canon"),
+    "stage2_mentions": ("data/processed/agenda_counts_stage2_mentions.csv", "entity"),
+}
+OUT = "data/processed/similarity_methods_{source}.csv"
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--source", choices=list(SOURCES), default="non_media_cons")
+    ap.add_argument("--weightings", nargs="+", choices=list(WEIGHTINGS), default=list(WEIGHTINGS))
+    ap.add_argument("--metrics", nargs="+", choices=list(METRICS), default=list(METRICS))
+    ap.add_argument("--keep-self", action="store_true", help="no quitar las self-entities de medios")
+    ap.add_argument("--rebuild", action="store_true", help="reconstruye la matriz cacheada")
+    args = ap.parse_args()
+
+    src, entity_col = SOURCES[args.source]
+    am = load_matrix(src, entity_col=entity_col, rebuild=args.rebuild)
+    if not args.keep_self:
+        am = am.drop_entities(DROP_SELF)
+    am = am.nonempty_rows()
+    print("[INFO] matrix shape:", am.X.shape, "nnz:", am.X.nnz)
+
+    sims = all_similarities(am.X, args.weightings, args.metrics)
+    out = pairs_frame(am.medios, sims)
+    path = OUT.format(source=args.source)
+    storage.write_table(out, path)
+
+    print("[OK] wrote:", path)
+    print("Pairs:", len(out), "| methods:", len(sims))
+
+    # resumen: promedio por método y correlación de rangos con tfidf_cosine (la histórica)
+    summary = pd.DataFrame({"mean": out[list(sims)].mean(), "std": out[list(sims)].std()})
+    if "tfidf_cosine" in sims:
+        summary["spearman_vs_tfidf_cosine"] = out[list(sims)].corr(method="spearman")["tfidf_cosine"]
+    print(summary.round(4).to_string())
+
+
+if __name__ == "__main__":
+    main()
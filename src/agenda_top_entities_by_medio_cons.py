@@ -1,9 +1,11 @@
 import pandas as pd
 
+import storage
+
 DATA = "data/processed/agenda_counts_non_media_cons.csv"
 OUT  = "data/processed/agenda_top50_by_medio_cons.csv"
 
-df = pd.read_csv(DATA)
+df = storage.read_table(DATA)
 
 top = (
     df.sort_values(["Medio","count"], ascending=[True, False])
@@ -11,7 +13,7 @@ top = (
       .head(50)
 )
 
-top.to_csv(OUT, index=False)
+storage.write_table(top, OUT)
 
 print("[OK] wrote:", OUT)
 print("rows:", len(top))
@@ -1,7 +1,9 @@
 import pandas as pd
 
-df = pd.read_csv("data/processed/articles_emotions.csv")
-ents = pd.read_csv("data/processed/entities_long.csv")
+import storage
+
+df = storage.read_table("data/processed/articles_emotions.csv")
+ents = storage.read_table("data/processed/entities_long.csv")
 
 print("articles:", df.shape)
 print("entities:", ents.shape)
@@ -1,26 +1,42 @@
-import pandas as pd
+import argparse
+
+import storage
+from count_accumulator import KeyCounter
+from incremental import replace_months, touched_months
+from months import to_month
 
 INP = "data/processed/entities_long.csv"
 OUT = "data/bi/agenda_counts_stage2_mentions_monthly.csv"
 CHUNK = 300_000
 
-first = True
-total = 0
+ap = argparse.ArgumentParser()
+ap.add_argument("--touched-only", action="store_true",
+                help="Recalcula solo los meses tocados por la última ingesta incremental")
+args = ap.parse_args()
 
-def to_month(s):
-    dt = pd.to_datetime(s, errors="coerce")
-    return dt.dt.to_period("M").astype("string")
+months = set(touched_months()) if args.touched_only else None
+# una sola tabla sin llaves repetidas: los conteos se acumulan entre chunks
+acc = KeyCounter(["month","Medio","entity"])
 
-for chunk in pd.read_csv(INP, usecols=["Medio","fecha_real","entity"], dtype=str, chunksize=CHUNK):
+for chunk in storage.iter_table(INP, columns=["Medio","fecha_real","entity"], dtype=str,
+                                   months=sorted(months) if months is not None else None,
+                                   chunksize=CHUNK):
     chunk = chunk.dropna(subset=["Medio","fecha_real","entity"])
     chunk["month"] = to_month(chunk["fecha_real"])
     chunk = chunk.dropna(subset=["month"])
-    g = (chunk.groupby(["month","Medio","entity"])
-              .size()
-              .reset_index(name="count"))
-    g.to_csv(OUT, mode="w" if first else "a", index=False, header=first)
-    first = False
-    total += len(g)
+    if months is not None:
+        chunk = chunk[chunk["month"].isin(months)]
+    acc.add(chunk)
+
+if months is None:
+    with storage.TableWriter(OUT) as writer:
+        for g in acc.iter_frames():
+            writer.write(g)
+    total = writer.rows
+else:
+    fresh = acc.to_frame()
+    total = replace_months(OUT, fresh, months)
+    print("[INFO] months recomputed:", sorted(months), "| rows:", len(fresh))
 
 print("[OK] wrote:", OUT)
-print("Appended rows:", total)
+print("Rows:", total, "| input rows:", acc.rows_in)
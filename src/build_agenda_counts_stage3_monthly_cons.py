@@ -0,0 +1,125 @@
+"""
+Consolidación mensual: aplica el mapping de entity_consolidation_hybrid.py
+(store persistente en data/processed/entity_map_store) al grano
+(month, Medio, entity_canon) y re-agrega, sin volver a correr el fuzzy por mes.
+
+    agenda_counts_stage3_monthly  ->  agenda_counts_stage3_monthly_cons
+
+La salida conserva el esquema (entity_canon = entidad consolidada), así que los
+builders de share/HHI/distancia la leen con --cons. Como el mapping es
+muchos-a-uno, la re-agregación se hace por mes completo (partición Parquet);
+si solo existe el CSV se agregan parciales por chunk y se combinan al final.
+
+entity_canon que no están en el store (p. ej. de meses ingestados después de
+la última consolidación) pasan por reglas + plural (base_consolidate) y quedan
+fuera del fuzzy hasta la siguiente corrida del hybrid.
+
+Uso:
+    python src/entity_consolidation_hybrid.py            # actualiza el store
+    python src/build_agenda_counts_stage3_monthly_cons.py [--touched-only]
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import storage
+from entity_consolidation_hybrid import base_consolidate, map_signature
+from entity_map import ENTITY_MAP, entity_map_series, load_store
+from incremental import replace_months, touched_months
+
+INP = "data/bi/agenda_counts_stage3_monthly.csv"
+OUT = "data/bi/agenda_counts_stage3_monthly_cons.csv"
+KEYS = ["month","Medio","entity_canon"]
+CHUNK = 1_000_000
+
+class MonthlyConsolidator:
+    """Mapping del store + fallback (reglas/plural) memoizado para entity_canon nuevos."""
+
+    def __init__(self, mapping: pd.Series):
+        self.mapping = mapping
+        self.extra = {}
+        self.rows_in = 0
+        self.rows_out = 0
+        self.rows_fallback = 0
+
+    def consolidate(self, df: pd.DataFrame) -> pd.DataFrame:
+        values = df["entity_canon"].to_numpy()
+        pos = self.mapping.index.get_indexer(values)
+        miss = pos < 0
+        out = np.where(miss, values, self.mapping.to_numpy()[np.maximum(pos, 0)] if len(self.mapping) else values)
+        if miss.any():
+            for v in pd.unique(values[miss]):
+                if v not in self.extra:
+                    self.extra[v] = base_consolidate(v)
+            out[miss] = pd.Series(values[miss]).map(self.extra).to_numpy()
+            self.rows_fallback += int(miss.sum())
+
+        df = df.assign(entity_canon=out)
+        df = df[df["entity_canon"] != ""]
+        g = df.groupby(KEYS, as_index=False, sort=False)["count"].sum()
+        self.rows_in += len(values)
+        self.rows_out += len(g)
+        return g
+
+def iter_months(path: str, months=None):
+    """Un DataFrame por mes completo (Parquet) o por chunk (CSV, requiere recombinar)."""
+    cols = KEYS + ["count"]
+    dtype = {"month":"string","Medio":"string","entity_canon":"string","count":"int64"}
+    if storage.list_months(path):
+        for m in storage.list_months(path):
+            if months is None or m in months:
+                yield storage.read_table(path, columns=cols, months=[m], dtype=dtype), True
+        return
+    for chunk in storage.iter_table(path, columns=cols, dtype=dtype,
+                                    months=sorted(months) if months is not None else None,
+                                    chunksize=CHUNK):
+        yield chunk, False
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--touched-only", action="store_true",
+                    help="Recalcula solo los meses tocados por la última ingesta incremental")
+    args = ap.parse_args()
+
+    if not storage.exists(ENTITY_MAP):
+        raise SystemExit(f"[ERROR] No existe {ENTITY_MAP}. Corre entity_consolidation_hybrid.py primero.")
+    store, meta = load_store()
+    if meta.get("signature") != map_signature():
+        print("[WARN] el store no corresponde a las reglas/umbral actuales; "
+              "corre entity_consolidation_hybrid.py para reconstruirlo")
+    cons = MonthlyConsolidator(entity_map_series(store))
+
+    months = set(touched_months()) if args.touched_only else None
+    writer = None if months is not None else storage.TableWriter(OUT)
+    parts = []
+    for df, whole_month in iter_months(INP, months):
+        g = cons.consolidate(df)
+        if whole_month and writer is not None:
+            writer.write(g)
+        else:
+            parts.append(g)
+
+    fresh = (pd.concat(parts, ignore_index=True)
+               .groupby(KEYS, as_index=False)["count"]
+               .sum()) if parts else None
+
+    if writer is not None:
+        if fresh is not None:
+            writer.write(fresh)
+        writer.close()
+        total = writer.rows
+    else:
+        if fresh is None:
+            fresh = pd.DataFrame(columns=KEYS + ["count"])
+        total = replace_months(OUT, fresh, months)
+        print("[INFO] months recomputed:", sorted(months), "| rows:", len(fresh))
+
+    print(f"[INFO] entity map v{meta.get('version', 0)} | rows in={cons.rows_in} -> "
+          f"consolidated={cons.rows_out} | not in store (rules/plural only)={cons.rows_fallback} "
+          f"({len(cons.extra)} entities)")
+    print("[OK] wrote:", OUT)
+    print("Rows:", total)
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,19 @@
 import pandas as pd
 
+import storage
+
 COUNTS = "data/bi/agenda_counts_stage3_monthly.csv"
 TOP = "data/bi/top500_stage3.csv"
 OUT = "data/bi/agenda_counts_stage3_top500_monthly.csv"
 
-df = pd.read_csv(COUNTS)
-top = pd.read_csv(TOP)
+df = storage.read_table(COUNTS)
+top = storage.read_table(TOP)
 
 keep = set(top["entity_canon"])
 
 df = df[df["entity_canon"].isin(keep)].copy()
 
-df.to_csv(OUT, index=False)
+storage.write_table(df, OUT)
 
 print("[OK] wrote:", OUT)
 print("Rows:", len(df))
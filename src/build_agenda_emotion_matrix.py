@@ -1,9 +1,11 @@
 import pandas as pd
 
+import storage
+
 ENTS = "data/processed/entities_long_clean.csv"
 OUT  = "data/processed/agenda_emotion_by_medio.csv"
 
-df = pd.read_csv(ENTS, usecols=["Medio","entity_canon","predict_emotion"], dtype=str)
+df = storage.read_table(ENTS, columns=["Medio","entity_canon","predict_emotion"], dtype=str)
 
 agg = (
     df.groupby(["Medio","entity_canon","predict_emotion"])
@@ -11,7 +13,7 @@ agg = (
       .reset_index(name="count")
 )
 
-agg.to_csv(OUT, index=False)
+storage.write_table(agg, OUT)
 
 print("[OK] agenda-emotion matrix built")
 print("Rows:", len(agg))
@@ -1,14 +1,30 @@
-import pandas as pd
+import argparse
+
+import storage
+from monthly_tensor import load_tensor
 
 INP = "data/bi/agenda_counts_stage3_monthly.csv"
 OUT = "data/bi/agenda_share_stage3_monthly.csv"
+INP_CONS = "data/bi/agenda_counts_stage3_monthly_cons.csv"
+OUT_CONS = "data/bi/agenda_share_stage3_monthly_cons.csv"
+
+ap = argparse.ArgumentParser()
+ap.add_argument("--cons", action="store_true",
+                help="usa los conteos con entidades consolidadas (build_agenda_counts_stage3_monthly_cons.py)")
+args = ap.parse_args()
+if args.cons:
+    INP, OUT = INP_CONS, OUT_CONS
 
-df = pd.read_csv(INP, dtype={"month":"string","Medio":"string","entity_canon":"string","count":"int64"})
+# tensor month × Medio × entity (monthly_tensor.py): total y share por fila del CSR de cada mes
+tensor = load_tensor(INP)
 
-tot = (df.groupby(["month","Medio"])["count"].sum().reset_index(name="total_medio_month"))
-df = df.merge(tot, on=["month","Medio"], how="left")
-df["share_within_medio_month"] = df["count"] / df["total_medio_month"]
+with storage.TableWriter(OUT) as writer:
+    for mm in tensor:
+        tot = mm.totals()[mm.row_of_nnz]
+        writer.write(mm.long_frame({
+            "total_medio_month": tot.astype("int64"),
+            "share_within_medio_month": mm.X.data / tot,
+        }))
 
-df.to_csv(OUT, index=False)
 print("[OK] wrote:", OUT)
-print("Rows:", len(df))
+print("Rows:", writer.rows)
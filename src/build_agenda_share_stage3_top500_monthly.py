@@ -1,15 +1,22 @@
-import pandas as pd
+import storage
+from monthly_tensor import load_tensor
 
-INP = "data/bi/agenda_counts_stage3_top500_monthly.csv"
+INP = "data/bi/agenda_counts_stage3_monthly.csv"
+TOP = "data/bi/top500_stage3.csv"
 OUT = "data/bi/agenda_share_stage3_top500_monthly.csv"
 
-df = pd.read_csv(INP)
+# = agenda_counts_stage3_top500_monthly con share dentro del top500: columnas top500 del tensor
+tensor = load_tensor(INP)
+top = tensor.names_mask(storage.read_table(TOP)["entity_canon"])
 
-df["total_medio_month"] = df.groupby(["month","Medio"])["count"].transform("sum")
-
-df["share_within_medio_month"] = df["count"] / df["total_medio_month"]
-
-df.to_csv(OUT, index=False)
+with storage.TableWriter(OUT) as writer:
+    for mm in tensor:
+        mm = mm.columns(top)
+        tot = mm.totals()[mm.row_of_nnz]
+        writer.write(mm.long_frame({
+            "total_medio_month": tot.astype("int64"),
+            "share_within_medio_month": mm.X.data / tot,
+        }))
 
 print("[OK] wrote:", OUT)
-print("Rows:", len(df))
+print("Rows:", writer.rows)
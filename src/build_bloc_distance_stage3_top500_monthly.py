@@ -1,11 +1,13 @@
 import pandas as pd
 
+import storage
+
 INP = "data/bi/distance_stage3_top500_monthly.csv"
 META = "data/bi/media_metadata.csv"
 OUT = "data/bi/bloc_distance_stage3_top500_monthly.csv"
 
-dist = pd.read_csv(INP)
-meta = pd.read_csv(META)
+dist = storage.read_table(INP)
+meta = storage.read_table(META)
 
 # --- detect country column ---
 cols = set(meta.columns)
@@ -57,7 +59,7 @@ for month, sub in dist.groupby("month", sort=True):
     })
 
 out = pd.DataFrame(rows)
-out.to_csv(OUT, index=False)
+storage.write_table(out, OUT)
 
 print("[OK] wrote:", OUT)
 print("Months:", len(out))
@@ -1,10 +1,21 @@
 from __future__ import annotations
 
+import argparse
+import multiprocessing as mp
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
 from pymongo import MongoClient
 import pandas as pd
 from tqdm import tqdm
 
-from utils import load_env, must_getenv, safe_literal_list, normalize_entity_item, is_probably_landing_url
+import storage
+from incremental import delta_query, load_watermark, months_of, save_watermark, snapshot_watermark, upsert_by_url
+from utils import load_env, must_getenv, safe_literal_list, is_probably_landing_url
 
 
 FIELDS = {
@@ -37,40 +48,31 @@ FIELDS = {
     "PalabrasClave": 1,
 }
 
+OUT_ARTICLES = "data/processed/articles_emotions.csv"
+OUT_ENTITIES = "data/processed/entities_long.csv"
+PARTS_DIR = "data/processed/parts"  # part files temporales del modo --workers
 
-def main() -> None:
-    load_env()
-    uri = must_getenv("MONGO_URI")
-    db_name = must_getenv("MONGO_DB")
-    coll_name = must_getenv("MONGO_COLLECTION")
+# Columnas fijas del modo streaming: cada batch se alinea a este orden para
+# que los appends al CSV sean consistentes aunque falten campos en algunos docs.
+ARTICLE_COLS = list(FIELDS) + ["intensity", "polarity", "entity_count", "keyword_count"]
 
-    client = MongoClient(uri)
-    db = client[db_name]
-    coll = db[coll_name]
+# Keep only needed columns for speed
+ENTITY_KEEP_COLS = ["URL", "Medio", "Seccion", "fecha_real", "Titulo", "predict_emotion", "intensity", "polarity", "Entidades"]
+ENTITY_COLS = ENTITY_KEEP_COLS[:-1] + ["entity", "entity_type"]
 
-    # Query: only docs with fecha_real
-    query = {"fecha_real": {"$ne": None}}
+EMOTION_COLS = ["anger", "sadness", "fear", "disgust", "joy", "surprise", "others"]
 
-    print(f"[INFO] Reading from {db_name}.{coll_name} ...")
-    cursor = coll.find(query, FIELDS, no_cursor_timeout=True).batch_size(2000)
+STREAM_BATCH = 20_000  # docs por batch en modo --stream (memoria acotada)
 
-    data = []
-    try:
-        for doc in tqdm(cursor, desc="mongo->list"):
-            data.append(doc)
-    finally:
-        cursor.close()
-
-    df = pd.DataFrame(data)
-    print("[INFO] Raw rows:", len(df))
 
+def prepare_articles(df: pd.DataFrame) -> pd.DataFrame:
+    """Landing-url filter, list parsing and derived metrics for a block of docs."""
     # Drop Mongo's internal _id to avoid confusion
     if "_id" in df.columns:
         df = df.drop(columns=["_id"])
 
     # Filter landing URLs
     df = df[~df["URL"].apply(is_probably_landing_url)].copy()
-    print("[INFO] After landing-url filter:", len(df))
 
     # Parse serialized lists
     df["Entidades"] = df["Entidades"].apply(safe_literal_list)
@@ -78,52 +80,355 @@ def main() -> None:
 
     # Derived metrics
     # intensity: "negative-ish" affect load (you can revise later)
-    for col in ["anger", "sadness", "fear", "disgust", "joy", "surprise", "others"]:
+    for col in EMOTION_COLS:
         if col not in df.columns:
             df[col] = 0.0
     df["intensity"] = df[["anger", "sadness", "fear", "disgust"]].sum(axis=1)
     df["polarity"] = (df["anger"] - df["joy"]).abs()
     df["entity_count"] = df["Entidades"].apply(lambda x: len(x) if isinstance(x, list) else 0)
     df["keyword_count"] = df["PalabrasClave"].apply(lambda x: len(x) if isinstance(x, list) else 0)
+    return df
 
-    # Save articles table
-    out_articles = "data/processed/articles_emotions.csv"
-    df.to_csv(out_articles, index=False)
-    print("[OK] wrote:", out_articles, "shape=", df.shape)
 
-    # Build entities long table
-    rows = []
-    # Keep only needed columns for speed
-    keep_cols = ["URL", "Medio", "Seccion", "fecha_real", "Titulo", "predict_emotion", "intensity", "polarity", "Entidades"]
-    missing = [c for c in keep_cols if c not in df.columns]
+def build_entities_long(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per (article, entity) with the article columns repeated.
+
+    Columnar: explode de las listas de `Entidades`, split nombre/tipo con la
+    misma semántica que utils.normalize_entity_item (solo list/tuple con >= 2
+    elementos, str().strip(), se descartan nombres vacíos) y broadcast de las
+    columnas del artículo por posición.
+    """
+    missing = [c for c in ENTITY_KEEP_COLS if c not in df.columns]
     if missing:
         raise RuntimeError(f"Missing expected columns: {missing}")
 
-    for _, r in tqdm(df[keep_cols].iterrows(), total=len(df), desc="entities_long"):
-        ents = r["Entidades"]
-        if not isinstance(ents, list) or len(ents) == 0:
-            continue
-        for ent in ents:
-            name, etype = normalize_entity_item(ent)
-            if not name:
-                continue
-            rows.append({
-                "URL": r["URL"],
-                "Medio": r["Medio"],
-                "Seccion": r["Seccion"],
-                "fecha_real": r["fecha_real"],
-                "Titulo": r["Titulo"],
-                "predict_emotion": r["predict_emotion"],
-                "intensity": r["intensity"],
-                "polarity": r["polarity"],
-                "entity": name,
-                "entity_type": etype
-            })
-
-    entities_df = pd.DataFrame(rows)
-    out_entities = "data/processed/entities_long.csv"
-    entities_df.to_csv(out_entities, index=False)
-    print("[OK] wrote:", out_entities, "shape=", entities_df.shape)
+    base = df[ENTITY_KEEP_COLS].reset_index(drop=True)
+
+    # no-listas cuentan como lista vacía (explode las deja como NaN)
+    ents = base["Entidades"].map(lambda x: x if isinstance(x, list) else [])
+    items = ents.explode()
+
+    items = items[items.map(lambda x: isinstance(x, (list, tuple))).to_numpy()]
+    if items.empty:
+        return pd.DataFrame(columns=ENTITY_COLS)
+    items = items[(items.str.len() >= 2).to_numpy()]
+    names = items.str[0].astype(str).str.strip().to_numpy()
+    etypes = items.str[1].astype(str).str.strip().to_numpy()
+    pos = items.index.to_numpy()
+
+    keep = names != ""
+    out = base.drop(columns=["Entidades"]).take(pos[keep]).reset_index(drop=True)
+    out["entity"] = names[keep]
+    out["entity_type"] = etypes[keep]
+    return out[ENTITY_COLS]
+
+
+def iter_batches(cursor, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Agrupa los docs del cursor en listas de tamaño fijo."""
+    batch = []
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def run_full(coll, query: dict) -> None:
+    cursor = coll.find(query, FIELDS, no_cursor_timeout=True).batch_size(2000)
+
+    data = []
+    try:
+        for doc in tqdm(cursor, desc="mongo->list"):
+            data.append(doc)
+    finally:
+        cursor.close()
+
+    df = pd.DataFrame(data)
+    print("[INFO] Raw rows:", len(df))
+
+    df = prepare_articles(df)
+    print("[INFO] After landing-url filter:", len(df))
+
+    # Save articles table
+    df.to_csv(OUT_ARTICLES, index=False)
+    print("[OK] wrote:", OUT_ARTICLES, "shape=", df.shape)
+
+    # Build entities long table
+    entities_df = build_entities_long(df)
+    entities_df.to_csv(OUT_ENTITIES, index=False)
+    print("[OK] wrote:", OUT_ENTITIES, "shape=", entities_df.shape)
+
+
+def write_batch(df_articles: pd.DataFrame, df_entities: pd.DataFrame,
+                out_articles: str, out_entities: str, first: bool) -> None:
+    mode = "w" if first else "a"
+    df_articles.to_csv(out_articles, mode=mode, index=False, header=first)
+    df_entities.to_csv(out_entities, mode=mode, index=False, header=first)
+
+
+def process_batch(docs: List[Dict[str, Any]]):
+    """Convierte una lista de docs Mongo en (articles, entities) alineados a columnas fijas."""
+    df = pd.DataFrame(docs)
+    # campos ausentes en todo el batch -> NaN (las emociones las rellena prepare_articles)
+    for col in FIELDS:
+        if col not in df.columns and col not in EMOTION_COLS:
+            df[col] = None
+    df = prepare_articles(df)[ARTICLE_COLS]
+    ents = build_entities_long(df)
+    return df, ents
+
+
+def stream_to_csv(cursor, batch_size: int, out_articles: str, out_entities: str,
+                  desc: str = "mongo->csv (stream)") -> Tuple[int, int, int]:
+    """
+    Consume el cursor en batches de `batch_size` docs y hace append de cada
+    batch a articles/entities: la memoria queda acotada por el batch, no por
+    el tamaño de la colección. Devuelve (docs leídos, artículos, entidades).
+    """
+    first = True
+    n_raw = n_articles = n_entities = 0
+    try:
+        pbar = tqdm(desc=desc, unit="doc")
+        for docs in iter_batches(cursor, batch_size):
+            df, ents = process_batch(docs)
+            write_batch(df, ents, out_articles, out_entities, first)
+            first = False
+
+            n_raw += len(docs)
+            n_articles += len(df)
+            n_entities += len(ents)
+            pbar.update(len(docs))
+        pbar.close()
+    finally:
+        cursor.close()
+
+    if first:
+        # cursor vacío: deja los archivos con header
+        write_batch(pd.DataFrame(columns=ARTICLE_COLS), pd.DataFrame(columns=ENTITY_COLS),
+                    out_articles, out_entities, True)
+
+    return n_raw, n_articles, n_entities
+
+
+def report(n_raw: int, n_articles: int, n_entities: int, elapsed: float,
+           written: Optional[Sequence[Tuple[str, int]]] = None) -> None:
+    """written: (ruta, filas totales) de lo escrito; default = las salidas completas con n_articles/n_entities."""
+    rate = n_raw / elapsed if elapsed > 0 else float("nan")
+    print("[INFO] Raw rows:", n_raw)
+    print("[INFO] After landing-url filter:", n_articles)
+    if written is None:
+        written = [(OUT_ARTICLES, n_articles), (OUT_ENTITIES, n_entities)]
+    for path, rows in written:
+        print("[OK] wrote:", path, "rows=", rows)
+    print(f"[INFO] elapsed={elapsed:.1f}s | {rate:,.0f} docs/sec")
+
+
+def run_stream(coll, query: dict, batch_size: int) -> None:
+    cursor = coll.find(query, FIELDS, no_cursor_timeout=True).batch_size(min(batch_size, 2000))
+    t0 = time.perf_counter()
+    counts = stream_to_csv(cursor, batch_size, OUT_ARTICLES, OUT_ENTITIES)
+    report(*counts, time.perf_counter() - t0)
+
+
+# --- Extracción paralela por rangos de _id ---
+
+def open_collection(uri: str, db_name: str, coll_name: str):
+    """Cada worker abre su propio MongoClient (no se comparten entre procesos)."""
+    return MongoClient(uri)[db_name][coll_name]
+
+
+def shard_bounds(coll, query: dict, n_shards: int) -> List[Tuple[Any, Any]]:
+    """
+    Parte la query en `n_shards` rangos contiguos de _id [lo, hi) con ~igual
+    número de docs. lo=None / hi=None significan abierto por ese lado.
+    """
+    total = coll.count_documents(query)
+    if total == 0:
+        return []
+    step = -(-total // n_shards)
+
+    cuts = []
+    for k in range(1, n_shards):
+        if k * step >= total:
+            break
+        doc = next(iter(coll.find(query, {"_id": 1}).sort("_id", 1).skip(k * step).limit(1)), None)
+        if doc is not None:
+            cuts.append(doc["_id"])
+    cuts = sorted(set(cuts))
+
+    edges = [None] + cuts + [None]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def shard_query(query: dict, lo: Any, hi: Any) -> dict:
+    rng = {}
+    if lo is not None:
+        rng["$gte"] = lo
+    if hi is not None:
+        rng["$lt"] = hi
+    return {**query, "_id": rng} if rng else dict(query)
+
+
+def part_paths(parts_dir: str, k: int) -> Tuple[str, str]:
+    return (os.path.join(parts_dir, f"articles.part{k:04d}.csv"),
+            os.path.join(parts_dir, f"entities.part{k:04d}.csv"))
+
+
+def extract_shard(open_coll: Callable[[], Any], query: dict, k: int, lo: Any, hi: Any,
+                  batch_size: int, parts_dir: str) -> Tuple[int, int, int]:
+    """Worker: lee un rango de _id (ordenado) y escribe sus part files."""
+    coll = open_coll()
+    cursor = (coll.find(shard_query(query, lo, hi), FIELDS, no_cursor_timeout=True)
+                  .sort("_id", 1)
+                  .batch_size(min(batch_size, 2000)))
+    out_articles, out_entities = part_paths(parts_dir, k)
+    return stream_to_csv(cursor, batch_size, out_articles, out_entities, desc=f"shard {k}")
+
+
+def merge_parts(part_files: List[str], out_path: str) -> None:
+    """Concatena los part files en orden de shard (header solo del primero)."""
+    with open(out_path, "w", encoding="utf-8", newline="") as out:
+        for i, path in enumerate(part_files):
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                header = f.readline()
+                if i == 0:
+                    out.write(header)
+                shutil.copyfileobj(f, out)
+
+
+def run_parallel(open_coll: Callable[[], Any], query: dict, workers: int, n_shards: int,
+                 batch_size: int, parts_dir: str = PARTS_DIR) -> None:
+    """
+    Extracción en paralelo: `n_shards` rangos de _id repartidos en `workers`
+    procesos, cada uno con su propio cliente. El merge sigue el orden de _id,
+    así que la salida es determinista sin importar qué shard termina primero.
+    """
+    t0 = time.perf_counter()
+    bounds = shard_bounds(open_coll(), query, n_shards)
+    print(f"[INFO] shards: {len(bounds)} | workers: {workers}")
+
+    os.makedirs(parts_dir, exist_ok=True)
+    args = [(open_coll, query, k, lo, hi, batch_size, parts_dir) for k, (lo, hi) in enumerate(bounds)]
+
+    # spawn: no heredar sockets de pymongo vía fork
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as ex:
+        futures = [ex.submit(extract_shard, *a) for a in args]
+        results = [f.result() for f in futures]
+
+    parts = [part_paths(parts_dir, k) for k in range(len(bounds))]
+    if parts:
+        merge_parts([a for a, _ in parts], OUT_ARTICLES)
+        merge_parts([e for _, e in parts], OUT_ENTITIES)
+    else:
+        write_batch(pd.DataFrame(columns=ARTICLE_COLS), pd.DataFrame(columns=ENTITY_COLS),
+                    OUT_ARTICLES, OUT_ENTITIES, True)
+    for a, e in parts:
+        os.remove(a)
+        os.remove(e)
+
+    n_raw, n_articles, n_entities = (sum(col) for col in zip(*results)) if results else (0, 0, 0)
+    report(n_raw, n_articles, n_entities, time.perf_counter() - t0)
+
+
+# --- Ingesta incremental (delta sobre watermark) ---
+
+def run_incremental(coll, query: dict, batch_size: int, parts_dir: str = PARTS_DIR) -> None:
+    """
+    Lee solo docs posteriores al watermark (max _id / max fecha_real), hace
+    upsert por URL en articles/entities y guarda el nuevo watermark con los
+    meses tocados para que los builders mensuales recalculen solo esos.
+    """
+    t0 = time.perf_counter()
+    wm = load_watermark()
+    snap = snapshot_watermark(coll, query)
+    q = delta_query(query, wm)
+    print("[INFO] watermark:", {k: wm.get(k) for k in ("max_id", "max_fecha_real")} if wm else None)
+
+    os.makedirs(parts_dir, exist_ok=True)
+    delta_articles = os.path.join(parts_dir, "articles.delta.csv")
+    delta_entities = os.path.join(parts_dir, "entities.delta.csv")
+
+    cursor = coll.find(q, FIELDS, no_cursor_timeout=True).sort("_id", 1).batch_size(min(batch_size, 2000))
+    n_raw, n_articles, n_entities = stream_to_csv(cursor, batch_size, delta_articles, delta_entities,
+                                                  desc="mongo->csv (delta)")
+
+    touched = set()
+    written = []
+    print(f"[INFO] delta: articles={n_articles} entities={n_entities}")
+    if n_articles:
+        delta = pd.read_csv(delta_articles, usecols=["URL", "fecha_real"], dtype=str)
+        delta_urls = set(delta["URL"].dropna())
+        touched.update(months_of(delta["fecha_real"]).dropna())
+        for out, delta_path in ((OUT_ARTICLES, delta_articles), (OUT_ENTITIES, delta_entities)):
+            replaced, rows = upsert_by_url(out, delta_path, delta_urls)
+            touched.update(replaced)
+            written.append((out, rows))
+    else:
+        print("[INFO] sin docs nuevos: articles/entities sin cambios")
+
+    os.remove(delta_articles)
+    os.remove(delta_entities)
+
+    save_watermark({**snap, "touched_months": sorted(touched), "delta_docs": n_raw})
+    print("[INFO] touched months:", sorted(touched))
+    # entities_long_clean no se actualiza aquí: los builders --touched-only que la
+    # leen exigen que el limpiador se haya corrido después de este watermark
+    print("[NEXT] corre el limpiador (clean_entities.py o clean_entities_all.py) "
+          "antes de los builders mensuales --touched-only")
+    report(n_raw, n_articles, n_entities, time.perf_counter() - t0, written)
+
+
+def export_parquet() -> None:
+    """Copia columnar (Parquet particionado por mes) de las salidas para los builders downstream."""
+    for path in (OUT_ARTICLES, OUT_ENTITIES):
+        rows = storage.csv_to_parquet(path)
+        print("[OK] wrote:", storage.parquet_path(path), "rows=", rows)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--stream", action="store_true",
+                    help="Procesa el cursor por batches y escribe incrementalmente (memoria acotada)")
+    ap.add_argument("--batch-size", type=int, default=STREAM_BATCH)
+    ap.add_argument("--workers", type=int, default=0,
+                    help="> 1: extracción paralela por rangos de _id (implica --stream)")
+    ap.add_argument("--shards", type=int, default=None,
+                    help="Número de rangos de _id (default: 4 x workers)")
+    ap.add_argument("--incremental", action="store_true",
+                    help="Solo docs posteriores al watermark; upsert por URL en las tablas existentes")
+    args = ap.parse_args()
+    if args.incremental and args.workers > 1:
+        ap.error("--incremental no soporta --workers > 1 (el delta se lee en un solo cursor)")
+
+    load_env()
+    uri = must_getenv("MONGO_URI")
+    db_name = must_getenv("MONGO_DB")
+    coll_name = must_getenv("MONGO_COLLECTION")
+
+    # Query: only docs with fecha_real
+    query = {"fecha_real": {"$ne": None}}
+
+    print(f"[INFO] Reading from {db_name}.{coll_name} ...")
+    if args.workers > 1:
+        open_coll = partial(open_collection, uri, db_name, coll_name)
+        run_parallel(open_coll, query, args.workers, args.shards or 4 * args.workers, args.batch_size)
+        export_parquet()
+        return
+
+    client = MongoClient(uri)
+    db = client[db_name]
+    coll = db[coll_name]
+
+    if args.incremental:
+        run_incremental(coll, query, args.batch_size)
+    elif args.stream:
+        run_stream(coll, query, args.batch_size)
+    else:
+        run_full(coll, query)
+    export_parquet()
 
 
 if __name__ == "__main__":
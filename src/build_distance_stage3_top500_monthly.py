@@ -1,39 +1,45 @@
-import pandas as pd
-import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-
-INP = "data/bi/agenda_counts_stage3_top500_monthly.csv"
-OUT = "data/bi/distance_stage3_top500_monthly.csv"
-
-df = pd.read_csv(INP)
-
-rows_out = []
+import argparse
 
-for month, sub in df.groupby("month"):
-
-    pivot = sub.pivot_table(
-        index="Medio",
-        columns="entity_canon",
-        values="count",
-        fill_value=0
-    )
-
-    medios = pivot.index.tolist()
-    X = pivot.to_numpy(dtype=float)
-
-    S = cosine_similarity(X)
+import numpy as np
+import pandas as pd
 
-    for i in range(len(medios)):
-        for j in range(i+1, len(medios)):
-            rows_out.append({
-                "month": month,
-                "Medio_A": medios[i],
-                "Medio_B": medios[j],
-                "cosine": float(S[i,j])
-            })
+import storage
+from monthly_tensor import load_tensor
+from sparse_similarity import blockwise_cosine
 
-out = pd.DataFrame(rows_out)
-out.to_csv(OUT, index=False)
+INP = "data/bi/agenda_counts_stage3_monthly.csv"
+TOP = "data/bi/top500_stage3.csv"
+OUT = "data/bi/distance_stage3_top500_monthly.csv"
+OUT_ALL = "data/bi/distance_stage3_full_monthly.csv"
+
+ap = argparse.ArgumentParser()
+ap.add_argument("--all-entities", action="store_true",
+                help="vocabulario completo en vez del top500 (-> distance_stage3_full_monthly)")
+ap.add_argument("--no-csv", action="store_true", help="solo Parquet (sin export CSV para Looker)")
+args = ap.parse_args()
+if args.all_entities:
+    OUT = OUT_ALL
+
+# mismo filtro que agenda_counts_stage3_top500_monthly, como máscara de columnas del tensor
+tensor = load_tensor(INP)
+top = None if args.all_entities else tensor.names_mask(storage.read_table(TOP)["entity_canon"])
+
+# todas las filas (month, Medio) apiladas; similitud solo dentro de cada mes,
+# en un solo producto block-diagonal (sparse_similarity.blockwise_cosine)
+mm = tensor.stacked()
+if top is not None:
+    mm = mm.columns(top)
+mm = mm.nonempty_rows()
+i, j, cos = blockwise_cosine(mm.X, mm.row_month)
+
+months = np.asarray(tensor.months, dtype=object)
+out = pd.DataFrame({
+    "month": months[mm.row_month[i]],
+    "Medio_A": mm.medios[i],
+    "Medio_B": mm.medios[j],
+    "cosine": cos,
+})
+storage.write_table(out, OUT, csv_export=False if args.no_csv else None)
 
 print("[OK] wrote:", OUT)
 print("Rows:", len(out))
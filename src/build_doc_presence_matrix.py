@@ -1,9 +1,11 @@
 import pandas as pd
 
+import storage
+
 INPUT = "data/processed/entities_long_clean.csv"
 OUT   = "data/processed/doc_presence_counts_by_medio.csv"
 
-df = pd.read_csv(INPUT, usecols=["Medio","entity_canon"], dtype=str)
+df = storage.read_table(INPUT, columns=["Medio","entity_canon"], dtype=str)
 
 counts = (
     df.groupby(["Medio","entity_canon"])
@@ -11,7 +13,7 @@ counts = (
       .reset_index(name="count")
 )
 
-counts.to_csv(OUT, index=False)
+storage.write_table(counts, OUT)
 
 print("[OK] doc-presence matrix built")
 print("Rows:", len(counts))
@@ -1,14 +1,16 @@
 import pandas as pd
 
+import storage
+
 INP = "data/bi/top_entities_global_stage3.csv"
 OUT = "data/bi/entity_taxonomy_stage3.csv"
 
-df = pd.read_csv(INP)
+df = storage.read_table(INP)
 
 df["scope"] = ""
 df["notes"] = ""
 
-df.to_csv(OUT, index=False)
+storage.write_table(df, OUT)
 
 print("[OK] wrote taxonomy template:", OUT)
 print("Open and classify scope as:")
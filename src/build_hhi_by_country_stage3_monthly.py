@@ -7,6 +7,8 @@ from pathlib import Path
 from datetime import datetime
 import pandas as pd
 
+import storage
+
 PROCESSED_DIR = Path("data/processed")
 OUT = Path("data/bi/agenda_counts_stage3_monthly.csv")
 
@@ -22,7 +24,7 @@ CANDIDATES = [
 ]
 
 def _pick_existing(candidates):
-    return [p for p in candidates if p.exists()]
+    return [p for p in candidates if storage.exists(str(p))]
 
 def _standardize_cols(df: pd.DataFrame) -> pd.DataFrame:
     # Normaliza nombres por si vienen como "medio", "source", etc.
@@ -121,7 +123,7 @@ def main():
     last_err = None
     for path in existing:
         try:
-            df = pd.read_csv(path)
+            df = storage.read_table(str(path))
             df = _standardize_cols(df)
             out = _build_from_df(df)
 
@@ -137,7 +139,7 @@ def main():
                 OUT.replace(backup)
                 print(f"[BACKUP] {OUT} -> {backup}")
 
-            out.to_csv(OUT, index=False)
+            storage.write_table(out, str(OUT))
             print(f"[OK] wrote: {OUT}")
             print("Rows:", len(out))
             print(out.head(5))
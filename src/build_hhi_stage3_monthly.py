@@ -1,24 +1,35 @@
+import argparse
+
+import numpy as np
 import pandas as pd
 
-INP = "data/bi/agenda_share_stage3_monthly.csv"
+import storage
+from monthly_tensor import load_tensor
+
+INP = "data/bi/agenda_counts_stage3_monthly.csv"
 OUT = "data/bi/hhi_stage3_monthly.csv"
+INP_CONS = "data/bi/agenda_counts_stage3_monthly_cons.csv"
+OUT_CONS = "data/bi/hhi_stage3_monthly_cons.csv"
 
-df = pd.read_csv(INP, dtype={
-    "month":"string",
-    "Medio":"string",
-    "entity_canon":"string",
-    "share_within_medio_month":"float64"
-})
+ap = argparse.ArgumentParser()
+ap.add_argument("--cons", action="store_true", help="usa los conteos con entidades consolidadas")
+args = ap.parse_args()
+if args.cons:
+    INP, OUT = INP_CONS, OUT_CONS
 
-hhi = (
-    df.assign(hhi_term=df["share_within_medio_month"] ** 2)
-      .groupby(["month","Medio"], as_index=False)
-      .agg(
-          hhi=("hhi_term","sum"),
-          n_entities=("entity_canon","nunique")
-      )
-)
+# HHI = sum(share²) por fila del tensor; n_entities = nnz de la fila
+tensor = load_tensor(INP)
+parts = []
+for mm in tensor:
+    S = mm.shares()
+    parts.append(pd.DataFrame({
+        "month": mm.month,
+        "Medio": mm.medios,
+        "hhi": np.asarray(S.multiply(S).sum(axis=1)).ravel(),
+        "n_entities": np.diff(mm.X.indptr).astype("int64"),
+    }))
+hhi = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=["month","Medio","hhi","n_entities"])
 
-hhi.to_csv(OUT, index=False)
+storage.write_table(hhi, OUT)
 print("[OK] wrote:", OUT)
 print("Rows:", len(hhi), "| months:", hhi["month"].nunique(), "| medios:", hhi["Medio"].nunique())
@@ -1,17 +1,28 @@
+import numpy as np
 import pandas as pd
 
-INP = "data/bi/agenda_share_stage3_top500_monthly.csv"
+import storage
+from monthly_tensor import load_tensor
+
+INP = "data/bi/agenda_counts_stage3_monthly.csv"
+TOP = "data/bi/top500_stage3.csv"
 OUT = "data/bi/hhi_stage3_top500_monthly.csv"
 
-df = pd.read_csv(INP)
+tensor = load_tensor(INP)
+top = tensor.names_mask(storage.read_table(TOP)["entity_canon"])
 
-hhi = (
-    df.assign(hhi_term=df["share_within_medio_month"]**2)
-      .groupby(["month","Medio"], as_index=False)
-      .agg(hhi=("hhi_term","sum"))
-)
+parts = []
+for mm in tensor:
+    mm = mm.columns(top).nonempty_rows()
+    S = mm.shares()
+    parts.append(pd.DataFrame({
+        "month": mm.month,
+        "Medio": mm.medios,
+        "hhi": np.asarray(S.multiply(S).sum(axis=1)).ravel(),
+    }))
+hhi = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=["month","Medio","hhi"])
 
-hhi.to_csv(OUT, index=False)
+storage.write_table(hhi, OUT)
 
 print("[OK] wrote:", OUT)
 print("Rows:", len(hhi))
@@ -0,0 +1,44 @@
+import argparse
+
+import pandas as pd
+import community as community_louvain
+
+import storage
+from similarity_graph import build_graph, edges_from_pairs
+
+INP = "data/bi/distance_stage3_top500_monthly.csv"
+OUT = "data/bi/louvain_stage3_top500_monthly.csv"
+
+THRESH = 0.70
+SEED = 42
+
+ap = argparse.ArgumentParser()
+ap.add_argument("--threshold", type=float, default=THRESH)
+ap.add_argument("--top-k", type=int, default=None, help="solo las k aristas más fuertes por medio")
+ap.add_argument("--seed", type=int, default=SEED, help="random_state de Louvain")
+args = ap.parse_args()
+
+df = storage.read_table(INP)
+
+# un grafo por mes desde la tabla long-form de pares (aristas en bloque)
+parts = []
+for month, sub in df.groupby("month", sort=True):
+    u, v, w = edges_from_pairs(sub, threshold=args.threshold, top_k=args.top_k)
+    G = build_graph(u, v, w)
+    if G.number_of_edges() == 0:
+        continue
+    part = community_louvain.best_partition(G, weight="weight", random_state=args.seed)
+    mod = community_louvain.modularity(part, G, weight="weight")
+    parts.append(pd.DataFrame({
+        "month": month,
+        "Medio": list(part.keys()),
+        "Community": list(part.values()),
+        "modularity": mod,
+    }).sort_values(["Community", "Medio"]))
+
+out = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=["month","Medio","Community","modularity"])
+storage.write_table(out, OUT)
+
+print("[OK] wrote:", OUT)
+print("Rows:", len(out), "| months:", out["month"].nunique())
+print(out.groupby("month").agg(communities=("Community", "nunique"), modularity=("modularity", "first")).head(12))
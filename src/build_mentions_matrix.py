@@ -1,9 +1,11 @@
 import pandas as pd
 
+import storage
+
 INPUT = "data/processed/entities_long.csv"
 OUT   = "data/processed/mentions_counts_by_medio.csv"
 
-df = pd.read_csv(INPUT, usecols=["Medio","entity","entity_type"], dtype=str)
+df = storage.read_table(INPUT, columns=["Medio","entity","entity_type"], dtype=str)
 
 counts = (
     df.groupby(["Medio","entity"])
@@ -11,7 +13,7 @@ counts = (
       .reset_index(name="count")
 )
 
-counts.to_csv(OUT, index=False)
+storage.write_table(counts, OUT)
 
 print("[OK] mentions matrix built")
 print("Rows:", len(counts))
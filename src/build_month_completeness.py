@@ -1,20 +1,23 @@
 import pandas as pd
 
+import storage
+from months import DAY_NA, day_of_month, days_to_month_codes, default_cache, month_labels_of_codes
+
 INP = "data/processed/articles_emotions.csv"
 OUT = "data/bi/month_completeness.csv"
 
-df = pd.read_csv(INP, usecols=["fecha_real"], dtype=str)
-dt = pd.to_datetime(df["fecha_real"], errors="coerce").dropna()
+df = storage.read_table(INP, columns=["fecha_real"], dtype=str)
+# cada fecha_real distinta se parsea una vez (months.MonthCache)
+d = default_cache().days(df["fecha_real"])
+d = d[d != DAY_NA]
 
-tmp = pd.DataFrame({"date": dt})
-tmp["month"] = tmp["date"].dt.to_period("M").astype("string")
-tmp["day"] = tmp["date"].dt.day
+tmp = pd.DataFrame({"month": month_labels_of_codes(days_to_month_codes(d)), "day": day_of_month(d)})
 
 days = tmp.groupby("month")["day"].nunique().reset_index(name="unique_days_observed")
 
 # heurística: si tiene >= 25 días distintos, lo consideramos “casi completo”
 days["is_complete_month"] = (days["unique_days_observed"] >= 25).astype(int)
 
-days.to_csv(OUT, index=False)
+storage.write_table(days, OUT)
 print("[OK] wrote:", OUT)
 print(days.sort_values("month").to_string(index=False))
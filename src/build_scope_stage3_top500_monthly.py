@@ -1,14 +1,11 @@
+import numpy as np
 import pandas as pd
 
-INP = "data/bi/agenda_share_stage3_monthly.csv"
-OUT = "data/bi/scope_stage3_top500_monthly.csv"
+import storage
+from monthly_tensor import load_tensor
 
-df = pd.read_csv(INP, dtype={
-    "month":"string",
-    "Medio":"string",
-    "entity_canon":"string",
-    "share_within_medio_month":"float64"
-})
+INP = "data/bi/agenda_counts_stage3_monthly.csv"
+OUT = "data/bi/scope_stage3_top500_monthly.csv"
 
 # --- Diccionarios básicos ---
 
@@ -42,30 +39,25 @@ def classify_scope(e):
     
     return "international"
 
-df["scope"] = df["entity_canon"].map(classify_scope)
-
-agg = (
-    df.groupby(["month","Medio","scope"], as_index=False)
-      .agg(
-          total_share=("share_within_medio_month","sum")
-      )
-)
-
-pivot = (
-    agg.pivot(index=["month","Medio"],
-              columns="scope",
-              values="total_share")
-       .reset_index()
-)
+# clasificación una vez por entidad del vocabulario; share nacional = suma de
+# shares en esas columnas de cada fila del tensor
+tensor = load_tensor(INP)
+national = tensor.entity_mask(lambda e: classify_scope(e) == "national")
 
-pivot = pivot.fillna(0)
+parts = []
+for mm in tensor:
+    S = mm.shares()
+    nat = national[:S.shape[1]].astype(np.float64)
+    parts.append(pd.DataFrame({
+        "month": mm.month,
+        "Medio": mm.medios,
+        "share_international": np.asarray(S @ (1.0 - nat)).ravel(),
+        "share_national": np.asarray(S @ nat).ravel(),
+    }))
 
-pivot.rename(columns={
-    "national":"share_national",
-    "international":"share_international"
-}, inplace=True)
+pivot = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=["month","Medio","share_international","share_national"])
 
-pivot.to_csv(OUT, index=False)
+storage.write_table(pivot, OUT)
 
 print("[OK] wrote:", OUT)
 print("Rows:", len(pivot))
@@ -1,16 +1,17 @@
-import pandas as pd
+import storage
+from months import to_month
 
 ENTS = "data/processed/entities_long_clean.csv"
 OUT  = "data/bi/t_mec_emotion_stage3_top500_monthly.csv"
 
 keywords = ["t-mec", "tmec", "usmca", "nafta", "tratado mexico"]
 
-df = pd.read_csv(ENTS, usecols=[
+df = storage.read_table(ENTS, columns=[
     "fecha_real","Medio","entity_canon",
     "predict_emotion","intensity"
 ])
 
-df["month"] = pd.to_datetime(df["fecha_real"]).dt.to_period("M").astype(str)
+df["month"] = to_month(df["fecha_real"])
 
 mask = df["entity_canon"].str.lower().apply(
     lambda x: any(k in str(x) for k in keywords)
@@ -26,7 +27,7 @@ agg = (
          )
 )
 
-agg.to_csv(OUT, index=False)
+storage.write_table(agg, OUT)
 
 print("[OK] wrote:", OUT)
 print("Rows:", len(agg))
@@ -1,27 +1,30 @@
+import numpy as np
 import pandas as pd
 
-INP = "data/bi/agenda_share_stage3_monthly.csv"
-OUT = "data/bi/t_mec_share_stage3_top500_monthly.csv"
+import storage
+from monthly_tensor import load_tensor
 
-df = pd.read_csv(INP)
+INP = "data/bi/agenda_counts_stage3_monthly.csv"
+OUT = "data/bi/t_mec_share_stage3_top500_monthly.csv"
 
 # --- Palabras clave robustas ---
 keywords = ["t-mec", "tmec", "usmca", "nafta", "tratado mexico"]
 
-mask = df["entity_canon"].str.lower().apply(
-    lambda x: any(k in x for k in keywords)
-)
+tensor = load_tensor(INP)
+mask = tensor.entity_mask(lambda x: any(k in x.lower() for k in keywords))
 
-t_mec = df[mask].copy()
+parts = []
+for mm in tensor:
+    S = mm.columns(mask)
+    has = np.diff(S.X.indptr) > 0
+    if not has.any():
+        continue
+    t_mec = np.asarray(S.X.sum(axis=1)).ravel() / mm.totals()
+    parts.append(pd.DataFrame({"month": mm.month, "Medio": mm.medios[has], "t_mec_share": t_mec[has]}))
 
-agg = (
-    t_mec.groupby(["month","Medio"], as_index=False)
-         .agg(
-             t_mec_share=("share_within_medio_month","sum")
-         )
-)
+agg = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=["month","Medio","t_mec_share"])
 
-agg.to_csv(OUT, index=False)
+storage.write_table(agg, OUT)
 
 print("[OK] wrote:", OUT)
 print("Rows:", len(agg))
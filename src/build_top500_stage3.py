@@ -1,13 +1,15 @@
 import pandas as pd
 
+import storage
+
 INP = "data/bi/top_entities_global_stage3.csv"
 OUT = "data/bi/top500_stage3.csv"
 
-df = pd.read_csv(INP)
+df = storage.read_table(INP)
 
 top500 = df.head(500).copy()
 
-top500.to_csv(OUT, index=False)
+storage.write_table(top500, OUT)
 
 print("[OK] wrote:", OUT)
 print("Entities:", len(top500))
@@ -1,11 +1,13 @@
 import pandas as pd
 
+import storage
+
 INP = "data/processed/agenda_counts_stage3.csv"
 OUT = "data/bi/top_entities_global_stage3.csv"
 
 TOP_N = 5000
 
-df = pd.read_csv(INP, usecols=["entity_canon","count"], dtype=str)
+df = storage.read_table(INP, columns=["entity_canon","count"], dtype=str)
 df["count"] = df["count"].astype(int)
 
 top = (
@@ -16,7 +18,7 @@ top = (
       .reset_index()
 )
 
-top.to_csv(OUT, index=False)
+storage.write_table(top, OUT)
 
 print("[OK] wrote:", OUT)
 print("Rows:", len(top))
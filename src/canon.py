@@ -0,0 +1,144 @@
+"""
+Canonicalización de entidades: una sola implementación para todos los cleaners.
+
+- canon(s): strip, quitar comillas, lower, quitar acentos (NFKD), puntuación -> espacio,
+  colapsar espacios. Memo LRU acotado en el proceso.
+- canon_series(col): el nº de strings distintos es una fracción mínima de las filas,
+  así que se factoriza la columna, se canonicaliza cada valor único una vez y se
+  mapea de vuelta con los códigos.
+- Diccionario raw -> canon persistido (CANON_DICT) para que corridas/scripts
+  posteriores no recalculen strings ya vistos. Si cambia la lógica de canon(),
+  sube CANON_VERSION: el archivo lleva la versión en el nombre y el viejo se ignora.
+- En workers de un pool (worker_mode) el diccionario persistido no se carga: cada
+  worker solo junta sus entradas nuevas y las entrega con drain_new(); el proceso
+  principal las agrega con merge_entries() y las guarda una vez.
+"""
+from __future__ import annotations
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+import storage
+
+CANON_VERSION = 1
+CANON_DICT = f"data/processed/canon_dict_v{CANON_VERSION}.csv"
+
+MEMO_SIZE = 1_000_000     # memo LRU de canon() (strings sueltos)
+MAX_DICT = 5_000_000      # tope de entradas del diccionario en memoria / persistido
+
+_QUOTES = str.maketrans("", "", "“”\"'")
+_WS = re.compile(r"\s+")
+_PUNCT = re.compile(r"[^\w\s]")
+
+_dict: Optional[Dict[str, str]] = None
+_dict_new = 0
+_worker = False
+_fresh: Dict[str, str] = {}
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def _canon(s: str) -> str:
+    s = s.strip().translate(_QUOTES).lower()
+    # quitar acentos (ASCII puro ya está en NFKD)
+    if not s.isascii():
+        s = "".join(c for c in unicodedata.normalize("NFKD", s) if not unicodedata.combining(c))
+    # quitar puntuación común
+    s = _PUNCT.sub(" ", s)
+    return _WS.sub(" ", s).strip()
+
+
+def canon(s) -> str:
+    if not isinstance(s, str):
+        return ""
+    return _canon(s)
+
+
+def load_canon_dict(path: str = CANON_DICT) -> int:
+    """Carga el diccionario persistido (si existe). Devuelve nº de entradas."""
+    global _dict, _dict_new
+    _dict, _dict_new = {}, 0
+    if storage.exists(path):
+        d = storage.read_table(path, columns=["raw", "canon"], dtype=str)
+        _dict = dict(zip(d["raw"].tolist(), d["canon"].fillna("").tolist()))
+    return len(_dict)
+
+
+def save_canon_dict(path: str = CANON_DICT) -> int:
+    """Persiste el diccionario si hubo strings nuevos. Devuelve nº de entradas nuevas."""
+    global _dict_new
+    if not _dict or not _dict_new:
+        return 0
+    n_new = _dict_new
+    d = pd.DataFrame({"raw": list(_dict.keys()), "canon": list(_dict.values())})
+    storage.write_table(d, path, csv_export=False, partition=False)
+    _dict_new = 0
+    return n_new
+
+
+def worker_mode() -> None:
+    """Proceso de un pool: diccionario vacío (sin cargar el persistido) y registro de entradas nuevas."""
+    global _dict, _dict_new, _worker, _fresh
+    _dict, _dict_new, _worker, _fresh = {}, 0, True, {}
+
+
+def drain_new() -> Dict[str, str]:
+    """Entradas agregadas en este worker desde el último drain (cada raw se entrega una vez)."""
+    global _fresh
+    out, _fresh = _fresh, {}
+    return out
+
+
+def merge_entries(entries: Dict[str, str]) -> int:
+    """Agrega al diccionario del proceso principal las entradas de un worker. Devuelve nº nuevas."""
+    global _dict_new
+    if _dict is None:
+        load_canon_dict()
+    added = 0
+    for raw, c in entries.items():
+        if len(_dict) >= MAX_DICT:
+            break
+        if raw not in _dict:
+            _dict[raw] = c
+            added += 1
+    _dict_new += added
+    return added
+
+
+def canon_series(col: pd.Series, persist: bool = True) -> pd.Series:
+    """
+    Equivalente a col.map(canon), pero canonicalizando cada valor distinto una vez.
+    Con persist=True consulta/alimenta el diccionario raw -> canon (guárdalo con
+    save_canon_dict() al terminar).
+    """
+    global _dict, _dict_new
+    codes, uniques = pd.factorize(col, use_na_sentinel=True)
+
+    if persist and _dict is None:
+        load_canon_dict()
+    known = _dict if persist else {}
+
+    # último slot = NaN (código -1)
+    out = np.empty(len(uniques) + 1, dtype=object)
+    out[-1] = ""
+    room = MAX_DICT - len(known) if persist else 0
+    for i, raw in enumerate(uniques):
+        if not isinstance(raw, str):
+            out[i] = ""
+            continue
+        c = known.get(raw)
+        if c is None:
+            c = _canon(raw)
+            if room > 0:
+                known[raw] = c
+                _dict_new += 1
+                room -= 1
+                if _worker:
+                    _fresh[raw] = c
+        out[i] = c
+
+    return pd.Series(out[codes], index=col.index, name=col.name)
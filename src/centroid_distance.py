@@ -0,0 +1,56 @@
+"""
+Distancia coseno de cada medio a centroides de grupo (global + country_group).
+
+Por mes, con X = medios × entidades (conteos, CSR):
+
+    C = [1ᵀX ; G X]          suma global + suma de cada grupo (G = indicadora grupo × medio)
+    D = 1 - (X Cᵀ) / (‖x_i‖ ‖c_k‖)
+
+Una sola multiplicación dispersa por mes para todas las referencias, en vez de
+un dict por medio y arrays reconstruidos por cada par (medio, referencia). Los
+grupos salen de media_metadata (MX, US, o cualquier otro valor de country_group).
+NaN si el medio o la referencia no tienen conteos (p. ej. grupo sin medios ese mes).
+"""
+from __future__ import annotations
+
+import re
+from typing import List, Sequence
+
+import numpy as np
+from scipy.sparse import csr_matrix, vstack
+
+
+def group_column(group: str) -> str:
+    """"MX" -> "dist_to_mx_mean" (nombre de columna estable para cualquier grupo)."""
+    return f"dist_to_{re.sub(r'[^0-9a-z]+', '_', str(group).strip().lower()).strip('_')}_mean"
+
+
+def group_indicator(labels: Sequence, groups: Sequence[str]) -> csr_matrix:
+    """Matriz grupo × fila (1 si la fila pertenece al grupo); filas sin grupo quedan fuera."""
+    labels = np.asarray(labels, dtype=object)
+    pos = {g: k for k, g in enumerate(groups)}
+    k = np.fromiter((pos.get(g, -1) for g in labels), dtype=np.int64, count=len(labels))
+    rows = np.flatnonzero(k >= 0)
+    return csr_matrix((np.ones(len(rows)), (k[rows], rows)), shape=(len(groups), len(labels)))
+
+
+def centroid_distances(X: csr_matrix, labels: Sequence, groups: Sequence[str]) -> np.ndarray:
+    """
+    1 - coseno de cada fila de X contra [suma global, suma de cada grupo].
+    Devuelve float64 (filas × (1 + len(groups))).
+    """
+    X = csr_matrix(X, dtype=np.float64)
+    C = vstack([csr_matrix(X.sum(axis=0)), group_indicator(labels, groups) @ X]).tocsr()
+    dot = (X @ C.T).toarray()
+    row_norm = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+    ref_norm = np.sqrt(np.asarray(C.multiply(C).sum(axis=1)).ravel())
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dist = 1.0 - dot / np.outer(row_norm, ref_norm)
+    dist[row_norm == 0, :] = np.nan
+    dist[:, ref_norm == 0] = np.nan
+    return dist
+
+
+def default_groups(values: Sequence) -> List[str]:
+    """Grupos presentes en media_metadata (orden alfabético: MX, US, ...)."""
+    return sorted({str(v) for v in values if isinstance(v, str) and v.strip()})
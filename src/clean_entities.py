@@ -1,6 +1,12 @@
+import argparse
+
 import pandas as pd
-import re
-import unicodedata
+
+import storage
+from canon import canon, canon_series, save_canon_dict
+from clean_parallel import run_clean
+from dedup import PairDeduper
+from media_matcher import MediaMatcher
 
 ART = "data/processed/articles_emotions.csv"
 ENTS = "data/processed/entities_long.csv"
@@ -8,20 +14,6 @@ OUT = "data/processed/entities_long_clean.csv"
 
 CHUNK = 1_000_000  # baja si te pega RAM
 
-def canon(s: str) -> str:
-    if not isinstance(s, str):
-        return ""
-    s = s.strip()
-    s = s.replace("“","").replace("”","").replace('"',"").replace("'","")
-    s = re.sub(r"\s+", " ", s)
-    s = s.lower()
-    # quitar acentos
-    s = "".join(c for c in unicodedata.normalize("NFKD", s) if not unicodedata.combining(c))
-    # quitar puntuación común
-    s = re.sub(r"[^\w\s]", " ", s)
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
-
 def build_media_blacklist(medios_raw):
     """
     Crea blacklist robusta de medios:
@@ -68,56 +60,27 @@ def build_agency_blacklist():
     }
     return set(canon(a) for a in agencies)
 
-def looks_like_media_or_agency(entity_canon: str, media_set: set, agency_set: set) -> bool:
+# tokens cortos de agencia: match por token completo (no substring)
+SHORT_AGENCY_TOKENS = {"reuters", "afp", "efe", "ap", "bbc", "cnn"}
+
+def build_media_matcher(media_set: set, agency_set: set) -> MediaMatcher:
     """
-    Regla robusta:
+    Regla robusta (compilada en un autómata, ver media_matcher.py):
     - match exacto en medios/agencias
     - o contiene el nombre de un medio/agencia como token significativo
       (ej: "el universal deportes" o "reuters staff")
+    - vacío cuenta como medio (se descarta)
     """
-    if not entity_canon:
-        return True
-
-    if entity_canon in media_set or entity_canon in agency_set:
-        return True
-
-    # token check para evitar falsos positivos por substrings raros
-    tokens = set(entity_canon.split())
-    # match tokenizado con nombres cortos
-    short_agency_tokens = {"reuters", "afp", "efe", "ap", "bbc", "cnn"}
-    if tokens.intersection(short_agency_tokens):
-        return True
-
-    # contains check (frases)
-    # (esto atrapa "el universal deportes", "infobae mexico", "agencia reuters", etc.)
-    for m in media_set:
-        if len(m) >= 6 and m in entity_canon:
-            return True
-    for a in agency_set:
-        if len(a) >= 3 and a in entity_canon:
-            return True
+    return MediaMatcher(media_set, agency_set, SHORT_AGENCY_TOKENS, empty=True)
 
-    return False
+_matcher = None
 
-# 1) cargar medios reales del dataset
-df_art = pd.read_csv(ART, usecols=["Medio"])
-medios_raw = df_art["Medio"].dropna().unique().tolist()
+def init_worker(media_set: set, agency_set: set) -> None:
+    global _matcher
+    _matcher = build_media_matcher(media_set, agency_set)
 
-media_set = build_media_blacklist(medios_raw)
-agency_set = build_agency_blacklist()
-
-print("[INFO] media blacklist size:", len(media_set))
-print("[INFO] agency blacklist size:", len(agency_set))
-
-# 2) limpiar entidades por chunks
-first = True
-total_in = 0
-total_out = 0
-
-for chunk in pd.read_csv(ENTS, chunksize=CHUNK):
-    total_in += len(chunk)
-
-    chunk["entity_canon"] = chunk["entity"].map(canon)
+def clean_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    chunk["entity_canon"] = canon_series(chunk["entity"])
 
     # filtrar vacíos
     chunk = chunk[chunk["entity_canon"] != ""]
@@ -125,22 +88,45 @@ for chunk in pd.read_csv(ENTS, chunksize=CHUNK):
     # filtrar medios/agencias con heurística robusta
     mask_drop = (
         chunk["entity_type"].isin(["ORG","MISC"]) &
-        chunk["entity_canon"].map(lambda e: looks_like_media_or_agency(e, media_set, agency_set))
+        _matcher.flag(chunk["entity_canon"])
     )
     chunk = chunk[~mask_drop]
 
-    # deduplicar por URL + entidad canon (una entidad cuenta máximo 1 vez por nota)
+    # deduplicar por URL + entidad canon (una entidad cuenta máximo 1 vez por nota);
+    # el runner repite la dedup de forma global (URLs partidas entre chunks)
     chunk = chunk.drop_duplicates(subset=["URL", "entity_canon"])
 
     # reducir columnas
     keep = ["URL","Medio","Seccion","fecha_real","predict_emotion","intensity","polarity","entity_type","entity","entity_canon"]
-    chunk_out = chunk[keep]
-
-    chunk_out.to_csv(OUT, mode="w" if first else "a", index=False, header=first)
-    first = False
-    total_out += len(chunk_out)
-
-print("[OK] entities cleaned")
-print("in :", total_in)
-print("out:", total_out)
-print("wrote:", OUT)
+    return chunk[keep]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=1, help="procesos para limpiar chunks en paralelo")
+    ap.add_argument("--chunk", type=int, default=CHUNK)
+    ap.add_argument("--dedup", choices=PairDeduper.MODES, default="global",
+                    help="global (default) | external (en disco) | chunk (legacy) | report (legacy + conteo)")
+    args = ap.parse_args()
+
+    # 1) cargar medios reales del dataset
+    df_art = storage.read_table(ART, columns=["Medio"])
+    medios_raw = df_art["Medio"].dropna().unique().tolist()
+
+    media_set = build_media_blacklist(medios_raw)
+    agency_set = build_agency_blacklist()
+
+    print("[INFO] media blacklist size:", len(media_set))
+    print("[INFO] agency blacklist size:", len(agency_set))
+
+    # 2) limpiar entidades por chunks
+    total_in, total_out = run_clean(ENTS, OUT, clean_chunk, init_worker, (media_set, agency_set),
+                                    workers=args.workers, chunksize=args.chunk, dedup=args.dedup)
+    save_canon_dict()
+
+    print("[OK] entities cleaned")
+    print("in :", total_in)
+    print("out:", total_out)
+    print("wrote:", OUT)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Pipeline de limpieza fusionado: lee entities_long UNA vez, canonicaliza una vez,
+calcula las tres banderas de medio/agencia y escribe en el mismo scan las
+variantes que hoy producen cuatro scripts por separado:
+
+  entities_long_clean.csv             (clean_entities.py: quita medios ORG/MISC)
+  entities_long_clean_keep_media.csv  (clean_entities_keep_media.py)
+  entities_long_pro.csv               (clean_entities_pro.py: flag heurístico)
+  entities_long_pro_strict.csv        (add_media_flag_strict.py: flag exacto)
+
+keep_media / pro / pro_strict son las mismas filas (vacíos fuera + dedup por
+URL+entidad) con distinta bandera, así que comparten dedup. clean se deduplica
+aparte DESPUÉS de quitar medios, igual que clean_entities.py (si la primera
+aparición de un par era un ORG descartado, la siguiente sí entra).
+
+Uso:
+    python src/clean_entities_all.py --workers 8
+"""
+import argparse
+
+import pandas as pd
+
+import add_media_flag_strict as strict
+import clean_entities as clean
+import clean_entities_pro as pro
+import storage
+from canon import canon_series, save_canon_dict
+from clean_parallel import CHUNK, map_ordered, report_dedup
+from dedup import PairDeduper
+
+ART = "data/processed/articles_emotions.csv"
+ENTS = "data/processed/entities_long.csv"
+
+OUT_CLEAN = "data/processed/entities_long_clean.csv"
+OUT_KEEP_MEDIA = "data/processed/entities_long_clean_keep_media.csv"
+OUT_PRO = "data/processed/entities_long_pro.csv"
+OUT_PRO_STRICT = "data/processed/entities_long_pro_strict.csv"
+
+KEEP = ["URL","Medio","Seccion","fecha_real","predict_emotion","intensity","polarity","entity_type","entity","entity_canon"]
+
+_state = {}
+
+def init_worker(medios_raw: list) -> None:
+    clean_media = clean.build_media_blacklist(medios_raw)
+    clean_agency = clean.build_agency_blacklist()
+    pro_media = pro.build_media_set(medios_raw)
+    pro_agency = pro.build_agency_set()
+    _state["clean"] = clean.build_media_matcher(clean_media, clean_agency)
+    _state["pro"] = pro.build_media_matcher(pro_media, pro_agency)
+    _state["strict"] = (strict.build_media_set(medios_raw), strict.build_agency_set())
+
+def enrich_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """canon + las tres banderas; sin dedup (depende de la variante)."""
+    chunk["entity_canon"] = canon_series(chunk["entity"])
+    chunk = chunk.loc[chunk["entity_canon"] != "", KEEP].copy()
+
+    ent = chunk["entity_canon"]
+    chunk["drop_media"] = chunk["entity_type"].isin(["ORG","MISC"]) & _state["clean"].flag(ent)
+    chunk["is_media_like"] = _state["pro"].flag(ent).astype("int8")
+    chunk["is_media_like_strict"] = strict.strict_media_flag(chunk, *_state["strict"])
+    return chunk
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=1, help="procesos para limpiar chunks en paralelo")
+    ap.add_argument("--chunk", type=int, default=CHUNK)
+    ap.add_argument("--dedup", choices=PairDeduper.MODES, default="global")
+    args = ap.parse_args()
+
+    df_art = storage.read_table(ART, columns=["Medio"])
+    medios_raw = df_art["Medio"].dropna().unique().tolist()
+
+    writers = {
+        "clean": storage.TableWriter(OUT_CLEAN),
+        "keep_media": storage.TableWriter(OUT_KEEP_MEDIA),
+        "pro": storage.TableWriter(OUT_PRO),
+        "pro_strict": storage.TableWriter(OUT_PRO_STRICT),
+    }
+    rows = dict.fromkeys(writers, 0)
+    dedup_all = PairDeduper(mode=args.dedup)
+    dedup_clean = PairDeduper(mode=args.dedup)
+
+    def emit_all(chunk: pd.DataFrame) -> None:
+        variants = {
+            "keep_media": chunk[KEEP],
+            "pro": chunk[KEEP + ["is_media_like"]],
+            "pro_strict": chunk[KEEP + ["is_media_like_strict"]].rename(
+                columns={"is_media_like_strict": "is_media_like"}),
+        }
+        for name, df in variants.items():
+            writers[name].write(df)
+            rows[name] += len(df)
+
+    def emit_clean(chunk: pd.DataFrame) -> None:
+        writers["clean"].write(chunk[KEEP])
+        rows["clean"] += len(chunk)
+
+    total_in = 0
+
+    def chunks():
+        nonlocal total_in
+        for chunk in storage.iter_table(ENTS, chunksize=args.chunk):
+            total_in += len(chunk)
+            yield chunk
+
+    for chunk in map_ordered(chunks(), args.workers, enrich_chunk, init_worker, (medios_raw,)):
+        out = dedup_clean.filter(chunk[~chunk["drop_media"]])
+        if out is not None:
+            emit_clean(out)
+        out = dedup_all.filter(chunk)
+        if out is not None:
+            emit_all(out)
+
+    for out in dedup_clean.finish():
+        emit_clean(out)
+    for out in dedup_all.finish():
+        emit_all(out)
+    for w in writers.values():
+        w.close()
+    save_canon_dict()
+
+    report_dedup(dedup_clean, "clean")
+    report_dedup(dedup_all, "keep_media/pro")
+    print("[OK] entities cleaned (fused)")
+    print("in :", total_in)
+    for name, path in [("clean", OUT_CLEAN), ("keep_media", OUT_KEEP_MEDIA),
+                       ("pro", OUT_PRO), ("pro_strict", OUT_PRO_STRICT)]:
+        print(f"wrote: {path} rows={rows[name]}")
+
+if __name__ == "__main__":
+    main()
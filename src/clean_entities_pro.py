@@ -1,6 +1,12 @@
+import argparse
+
 import pandas as pd
-import re
-import unicodedata
+
+import storage
+from canon import canon, canon_series, save_canon_dict
+from clean_parallel import run_clean
+from dedup import PairDeduper
+from media_matcher import MediaMatcher
 
 ART = "data/processed/articles_emotions.csv"
 ENTS = "data/processed/entities_long.csv"
@@ -8,20 +14,6 @@ OUT  = "data/processed/entities_long_pro.csv"
 
 CHUNK = 1_000_000  # ajusta si tu RAM lo requiere
 
-def canon(s: str) -> str:
-    if not isinstance(s, str):
-        return ""
-    s = s.strip()
-    s = s.replace("“","").replace("”","").replace('"',"").replace("'","")
-    s = re.sub(r"\s+", " ", s)
-    s = s.lower()
-    # quitar acentos
-    s = "".join(c for c in unicodedata.normalize("NFKD", s) if not unicodedata.combining(c))
-    # quitar puntuación
-    s = re.sub(r"[^\w\s]", " ", s)
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
-
 def build_media_set(medios_raw):
     bases = set(canon(m) for m in medios_raw if isinstance(m, str) and m.strip())
     variants = set(bases)
@@ -55,74 +47,70 @@ def build_agency_set():
     }
     return set(canon(a) for a in agencies)
 
-def is_media_like(entity_canon: str, media_set: set, agency_set: set) -> int:
+SHORT_TOKENS = {"reuters", "afp", "efe", "ap", "cnn", "bbc", "fox", "msnbc", "aljazeera"}
+
+def build_media_matcher(media_set: set, agency_set: set) -> MediaMatcher:
     """
-    Heurística robusta:
+    Heurística robusta (compilada en un autómata, ver media_matcher.py):
     - match exacto
     - o contiene tokens típicos de agencia
     - o contiene el nombre de un medio conocido como frase
     """
-    if not entity_canon:
-        return 0
-
-    if entity_canon in media_set or entity_canon in agency_set:
-        return 1
-
-    tokens = set(entity_canon.split())
-    short_tokens = {"reuters", "afp", "efe", "ap", "cnn", "bbc", "fox", "msnbc", "aljazeera"}
-    if tokens.intersection(short_tokens):
-        return 1
-
-    # contains check (frases)
-    for m in media_set:
-        if len(m) >= 6 and m in entity_canon:
-            return 1
-    for a in agency_set:
-        if len(a) >= 3 and a in entity_canon:
-            return 1
-
-    return 0
-
+    return MediaMatcher(media_set, agency_set, SHORT_TOKENS, empty=False)
 
-# Load media list from articles table
-df_art = pd.read_csv(ART, usecols=["Medio"])
-medios_raw = df_art["Medio"].dropna().unique().tolist()
 
-media_set = build_media_set(medios_raw)
-agency_set = build_agency_set()
+_matcher = None
 
-print("[INFO] media_set size :", len(media_set))
-print("[INFO] agency_set size:", len(agency_set))
-
-first = True
-total_in = 0
-total_out = 0
-
-for chunk in pd.read_csv(ENTS, chunksize=CHUNK):
-    total_in += len(chunk)
+def init_worker(media_set: set, agency_set: set) -> None:
+    global _matcher
+    _matcher = build_media_matcher(media_set, agency_set)
 
+def clean_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
     # canonicalizar entidad
-    chunk["entity_canon"] = chunk["entity"].map(canon)
+    chunk["entity_canon"] = canon_series(chunk["entity"])
 
     # filtrar vacíos
     chunk = chunk[chunk["entity_canon"] != ""]
 
     # bandera media/agencia (NO se elimina)
-    chunk["is_media_like"] = chunk["entity_canon"].map(lambda e: is_media_like(e, media_set, agency_set)).astype("int8")
+    chunk["is_media_like"] = _matcher.flag(chunk["entity_canon"]).astype("int8")
 
-    # deduplicar por nota (URL+entidad canon)
+    # deduplicar por nota (URL+entidad canon); global en el runner
     chunk = chunk.drop_duplicates(subset=["URL", "entity_canon"])
 
     # reducir columnas
     keep = ["URL","Medio","Seccion","fecha_real","predict_emotion","intensity","polarity",
             "entity_type","entity","entity_canon","is_media_like"]
-    chunk_out = chunk[keep]
+    return chunk[keep]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=1, help="procesos para limpiar chunks en paralelo")
+    ap.add_argument("--chunk", type=int, default=CHUNK)
+    ap.add_argument("--dedup", choices=PairDeduper.MODES, default="global",
+                    help="global (default) | external (en disco) | chunk (legacy) | report (legacy + conteo)")
+    args = ap.parse_args()
+
+    # Load media list from articles table
+    df_art = storage.read_table(ART, columns=["Medio"])
+    medios_raw = df_art["Medio"].dropna().unique().tolist()
+
+    media_set = build_media_set(medios_raw)
+    agency_set = build_agency_set()
+
+    print("[INFO] media_set size :", len(media_set))
+    print("[INFO] agency_set size:", len(agency_set))
+
+    total_in, total_out = run_clean(ENTS, OUT, clean_chunk, init_worker, (media_set, agency_set),
+                                    workers=args.workers, chunksize=args.chunk, dedup=args.dedup)
+    save_canon_dict()
+
+    print("[OK] entities PRO built (kept media/agencies, flagged)")
+    print("in :", total_in)
+    print("out:", total_out)
+    print("wrote:", OUT)
 
-    chunk_out.to_csv(OUT, mode="w" if first else "a", index=False, header=first)
-    first = False
-    total_out += len(chunk_out)
 
-print("[OK] entities PRO built (kept media/agencies, flagged)")
-print("in :", total_in)
-print("out:", total_out)
-print("wrote:", OUT)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Runner compartido para la familia clean_entities*: lee chunks en el proceso
+principal, los limpia en un pool de procesos (canon + filtros/flags, CPU puro)
+y escribe los resultados en el orden original.
+
+La deduplicación (URL, entity_canon) se hace en el proceso principal sobre el
+flujo ya ordenado, así que es global: una URL cuyas filas quedan repartidas en
+dos chunks ya no deja duplicados (el drop_duplicates por chunk sí los dejaba).
+Ver dedup.PairDeduper para los modos (global / external / chunk / report).
+"""
+from __future__ import annotations
+
+import multiprocessing as mp
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator, Optional, Sequence, Tuple
+
+import pandas as pd
+
+import canon
+import storage
+from dedup import PairDeduper
+
+CHUNK = 1_000_000
+DEDUP_COLS = ("URL", "entity_canon")
+
+
+def _init_pool(init: Optional[Callable], init_args: tuple) -> None:
+    # el worker no carga el diccionario canon persistido (hasta MAX_DICT entradas por proceso)
+    canon.worker_mode()
+    if init is not None:
+        init(*init_args)
+
+
+def _run_chunk(fn: Callable, chunk: pd.DataFrame) -> Tuple[pd.DataFrame, dict]:
+    return fn(chunk), canon.drain_new()
+
+
+def _collect(future) -> pd.DataFrame:
+    out, entries = future.result()
+    if entries:
+        canon.merge_entries(entries)
+    return out
+
+
+def map_ordered(chunks: Iterator, workers: int, fn: Callable, init: Optional[Callable],
+                init_args: tuple) -> Iterator[pd.DataFrame]:
+    """
+    fn sobre cada chunk (en el pool si workers > 1), resultados en el orden de entrada.
+    Las entradas canon nuevas de los workers vuelven al proceso principal (save_canon_dict
+    las persiste al final, igual que en serie).
+    """
+    if workers <= 1:
+        if init is not None:
+            init(*init_args)
+        for chunk in chunks:
+            yield fn(chunk)
+        return
+
+    # spawn: igual que build_dataset; a lo sumo 2 chunks en vuelo por worker (RAM acotada)
+    ctx = mp.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                             initializer=_init_pool, initargs=(init, init_args)) as ex:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(ex.submit(_run_chunk, fn, chunk))
+            if len(pending) >= 2 * workers:
+                yield _collect(pending.popleft())
+        while pending:
+            yield _collect(pending.popleft())
+
+
+def run_clean(inp: str, out: str, fn: Callable[[pd.DataFrame], pd.DataFrame],
+              init: Optional[Callable] = None, init_args: tuple = (), workers: int = 1,
+              chunksize: int = CHUNK, dedup_cols: Optional[Sequence[str]] = DEDUP_COLS,
+              dedup: str = "global") -> Tuple[int, int]:
+    """
+    fn(chunk) -> chunk limpio (debe ser una función de módulo: se pickea al pool).
+    init(*init_args) prepara el estado del worker (sets de medios, matcher, ...).
+    Devuelve (filas_in, filas_out).
+    """
+    total_in = 0
+    total_out = 0
+
+    def chunks():
+        nonlocal total_in
+        for chunk in storage.iter_table(inp, chunksize=chunksize):
+            total_in += len(chunk)
+            yield chunk
+
+    deduper = PairDeduper(dedup_cols, mode=dedup) if dedup_cols else None
+    writer = storage.TableWriter(out)
+    for chunk_out in map_ordered(chunks(), workers, fn, init, init_args):
+        if deduper is not None:
+            chunk_out = deduper.filter(chunk_out)
+            if chunk_out is None:
+                continue
+        writer.write(chunk_out)
+        total_out += len(chunk_out)
+    if deduper is not None:
+        for chunk_out in deduper.finish():
+            writer.write(chunk_out)
+            total_out += len(chunk_out)
+    writer.close()
+
+    if deduper is not None:
+        report_dedup(deduper)
+    return total_in, total_out
+
+
+def report_dedup(deduper: PairDeduper, label: str = "") -> None:
+    label = f" [{label}]" if label else ""
+    if deduper.mode == "report":
+        print(f"[INFO]{label} cross-chunk duplicates kept by per-chunk dedup:", deduper.cross_dups)
+    elif deduper.mode != "chunk":
+        print(f"[INFO]{label} cross-chunk duplicates dropped:", deduper.cross_dups)
@@ -1,8 +1,10 @@
 import pandas as pd
 
+import storage
+
 INP = "data/bi/bloc_distance_stage3_top500_monthly.csv"
 
-df = pd.read_csv(INP)
+df = storage.read_table(INP)
 
 col = "mx_us_mean"
 
@@ -0,0 +1,126 @@
+"""
+Acumulador de conteos por llave compuesta en una sola pasada (sin llaves repetidas).
+
+Los builders mensuales agrupaban cada chunk por separado y lo escribían: una
+misma (month, Medio, entity) que aparece en dos chunks quedaba dos veces y había
+que colapsarla después. Aquí:
+
+  1) cada columna se codifica a enteros con un diccionario que crece entre
+     chunks (factorize del chunk + lookup solo de los valores únicos);
+  2) los códigos se empaquetan en una llave int64 (bits por dimensión, p. ej.
+     month 16 | Medio 16 | entity 31);
+  3) los conteos se acumulan como arrays ordenados (llave, conteo): cada chunk
+     aporta sus llaves únicas y se compacta (np.unique + reduceat) cuando el
+     buffer supera al acumulado -> costo amortizado O(n log n), ~16 bytes por
+     llave distinta en vez de un DataFrame por chunk.
+
+Uso:
+    acc = KeyCounter(["month", "Medio", "entity_canon"])
+    for chunk in ...:
+        acc.add(chunk)
+    for df in acc.iter_frames():
+        writer.write(df)
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+CHUNK_OUT = 1_000_000
+MIN_COMPACT = 1 << 20    # llaves en buffer antes de compactar (como mínimo)
+
+
+def default_bits(n_dims: int) -> List[int]:
+    """Reparte los 63 bits: 16 por dimensión y el resto a la última (la de más cardinalidad)."""
+    if n_dims == 1:
+        return [63]
+    head = [16] * (n_dims - 1)
+    last = 63 - sum(head)
+    if last < 16:
+        raise ValueError(f"too many key columns for an int64 key: {n_dims}")
+    return head + [last]
+
+
+class KeyCounter:
+    """Conteos (o sumas de pesos enteros) por combinación de columnas."""
+
+    def __init__(self, cols: Sequence[str], bits: Optional[Sequence[int]] = None, count_col: str = "count"):
+        self.cols = list(cols)
+        self.bits = list(bits) if bits is not None else default_bits(len(self.cols))
+        if len(self.bits) != len(self.cols) or sum(self.bits) > 63:
+            raise ValueError(f"bits {self.bits} do not fit {len(self.cols)} columns in an int64 key")
+        self.shifts = [sum(self.bits[i + 1:]) for i in range(len(self.bits))]
+        self.count_col = count_col
+        self.vocab: List[Dict[object, int]] = [{} for _ in self.cols]
+        self.keys = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+        self._buf_keys: List[np.ndarray] = []
+        self._buf_counts: List[np.ndarray] = []
+        self._buffered = 0
+        self.rows_in = 0
+
+    def _codes(self, i: int, values: pd.Series) -> np.ndarray:
+        codes, uniq = pd.factorize(values, sort=False)
+        vocab = self.vocab[i]
+        ucodes = np.fromiter((vocab.setdefault(u, len(vocab)) for u in uniq), dtype=np.int64, count=len(uniq))
+        if len(vocab) > (1 << self.bits[i]):
+            raise OverflowError(f"{self.cols[i]}: {len(vocab):,} values exceed {self.bits[i]} key bits")
+        return ucodes[codes]
+
+    def add(self, df: pd.DataFrame, weights: Optional[str] = None) -> None:
+        """Acumula un chunk (sin nulos en las columnas llave). weights: columna entera a sumar."""
+        if len(df) == 0:
+            return
+        key = np.zeros(len(df), dtype=np.int64)
+        for i, c in enumerate(self.cols):
+            key |= self._codes(i, df[c]) << np.int64(self.shifts[i])
+        uk, inv = np.unique(key, return_inverse=True)
+        if weights is None:
+            uc = np.bincount(inv, minlength=len(uk)).astype(np.int64)
+        else:
+            uc = np.zeros(len(uk), dtype=np.int64)
+            np.add.at(uc, inv, df[weights].to_numpy(np.int64))
+        self._buf_keys.append(uk)
+        self._buf_counts.append(uc)
+        self._buffered += len(uk)
+        self.rows_in += len(df)
+        if self._buffered >= max(len(self.keys), MIN_COMPACT):
+            self._compact()
+
+    def _compact(self) -> None:
+        if not self._buf_keys:
+            return
+        keys = np.concatenate([self.keys] + self._buf_keys)
+        counts = np.concatenate([self.counts] + self._buf_counts)
+        order = np.argsort(keys, kind="stable")
+        keys, counts = keys[order], counts[order]
+        start = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        self.keys = keys[start]
+        self.counts = np.add.reduceat(counts, start) if len(counts) else counts
+        self._buf_keys, self._buf_counts, self._buffered = [], [], 0
+
+    def __len__(self) -> int:
+        self._compact()
+        return len(self.keys)
+
+    def iter_frames(self, chunksize: int = CHUNK_OUT) -> Iterator[pd.DataFrame]:
+        """Decodifica el resultado en DataFrames de `chunksize` filas (orden por llave)."""
+        self._compact()
+        values = [np.array(list(v), dtype=object) for v in self.vocab]
+        for start in range(0, len(self.keys), chunksize):
+            k = self.keys[start:start + chunksize]
+            out = {}
+            for i, c in enumerate(self.cols):
+                code = (k >> np.int64(self.shifts[i])) & np.int64((1 << self.bits[i]) - 1)
+                out[c] = values[i][code]
+            out[self.count_col] = self.counts[start:start + chunksize]
+            yield pd.DataFrame(out)
+
+    def to_frame(self) -> pd.DataFrame:
+        parts = list(self.iter_frames())
+        if not parts:
+            return pd.DataFrame({**{c: pd.Series(dtype=object) for c in self.cols},
+                                 self.count_col: pd.Series(dtype="int64")})
+        return pd.concat(parts, ignore_index=True)
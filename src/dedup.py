@@ -0,0 +1,251 @@
+"""
+De-duplicación global (URL, entity_canon) con memoria compacta.
+
+- pair_hashes(): hash de 64 bits por fila (pandas hash_pandas_object, determinista).
+- HashSet64: set abierto (open addressing, sondeo lineal) sobre un np.uint64[];
+  ~16 bytes por llave con carga <= 0.5, contra ~150+ bytes por tupla de strings
+  en un set de Python. Inserción vectorizada por lote.
+- ExternalDedup: si el set no cabe en max_bytes, los hashes (con su nº de fila
+  global) se reparten por los bits altos en buckets en disco; cada bucket se
+  ordena por separado y de ahí salen las filas repetidas (no-primera aparición).
+
+Colisiones: con hashes de 64 bits la probabilidad de que dos pares distintos
+colisionen es ~n²/2^65 (≈3e-5 para 10M pares); una colisión descarta una fila
+de más, nunca deja pasar un duplicado.
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+EMPTY = np.uint64(0)
+MAX_LOAD = 0.5
+MAX_BYTES = 4 << 30     # tope de memoria del set en memoria antes de pasar a externo
+N_BUCKETS = 64          # buckets del modo externo (bits altos del hash)
+
+
+def pair_hashes(df: pd.DataFrame, cols: Sequence[str]) -> np.ndarray:
+    """uint64 por fila combinando las columnas (mismo par -> mismo hash entre chunks/procesos)."""
+    if len(df) == 0:
+        return np.empty(0, dtype=np.uint64)
+    return pd.util.hash_pandas_object(df[list(cols)], index=False, categorize=True).to_numpy(np.uint64)
+
+
+def first_in_batch(keys: np.ndarray) -> np.ndarray:
+    """Máscara de primeras apariciones dentro del lote (conserva orden)."""
+    _, idx = np.unique(keys, return_index=True)
+    mask = np.zeros(len(keys), dtype=bool)
+    mask[idx] = True
+    return mask
+
+
+class HashSet64:
+    """Set de uint64 con open addressing. 0 se usa como slot vacío (se guarda aparte)."""
+
+    def __init__(self, capacity: int = 1 << 20):
+        cap = 1 << max(int(capacity - 1).bit_length(), 4)
+        self.table = np.zeros(cap, dtype=np.uint64)
+        self.size = 0
+        self.has_zero = False
+
+    @property
+    def nbytes(self) -> int:
+        return self.table.nbytes
+
+    def _grow_bytes(self, n_new: int) -> int:
+        """Bytes de tabla necesarios tras insertar n_new llaves más."""
+        cap = len(self.table)
+        while (self.size + n_new) > cap * MAX_LOAD:
+            cap *= 2
+        return cap * 8
+
+    def _resize(self, cap: int) -> None:
+        old = self.table[self.table != EMPTY]
+        self.table = np.zeros(cap, dtype=np.uint64)
+        self.size = 0
+        self._insert_unique(old)
+
+    def _insert_unique(self, keys: np.ndarray) -> np.ndarray:
+        """
+        keys sin repetidos y != 0. Devuelve máscara "no estaba". Todas las llaves
+        sondean en paralelo; si dos compiten por el mismo slot vacío gana una y
+        la otra sigue al siguiente slot.
+        """
+        mask = np.uint64(len(self.table) - 1)
+        slot = keys & mask
+        new = np.zeros(len(keys), dtype=bool)
+        pending = np.arange(len(keys))
+        while len(pending):
+            k, s = keys[pending], slot[pending]
+            cur = self.table[s]
+            found = cur == k
+            empty = cur == EMPTY
+            # intenta escribir; solo una llave por slot sobrevive
+            self.table[s[empty]] = k[empty]
+            won = empty & (self.table[s] == k)
+            new[pending[won]] = True
+            done = found | won
+            slot[pending[~done]] = (s[~done] + np.uint64(1)) & mask
+            pending = pending[~done]
+        self.size += int(new.sum())
+        return new
+
+    def add(self, keys: np.ndarray) -> np.ndarray:
+        """Inserta un lote; devuelve máscara de filas que son primera aparición global."""
+        keys = np.asarray(keys, dtype=np.uint64)
+        first = first_in_batch(keys)
+        out = np.zeros(len(keys), dtype=bool)
+
+        zero = first & (keys == EMPTY)
+        if zero.any():
+            out[zero] = not self.has_zero
+            self.has_zero = True
+
+        cand = np.flatnonzero(first & (keys != EMPTY))
+        need = self._grow_bytes(len(cand))
+        if need > self.table.nbytes:
+            self._resize(need // 8)
+        out[cand] = self._insert_unique(keys[cand])
+        return out
+
+
+class ExternalDedup:
+    """
+    Dedup en disco: add() reparte (hash, fila_global) por bucket; duplicate_rows()
+    devuelve, ordenadas, las filas globales que repiten un par ya visto.
+    """
+
+    def __init__(self, n_buckets: int = N_BUCKETS, tmp_dir: Optional[str] = None):
+        self.n_buckets = n_buckets
+        self.shift = np.uint64(64 - int(np.log2(n_buckets)))
+        self.dir = tempfile.mkdtemp(prefix="dedup_", dir=tmp_dir)
+        self.files = [open(os.path.join(self.dir, f"b{b:03d}.bin"), "ab") for b in range(n_buckets)]
+        self.rows = 0
+
+    def add(self, keys: np.ndarray, rows: Optional[np.ndarray] = None) -> None:
+        """rows=None numera las llaves a continuación de las anteriores."""
+        keys = np.asarray(keys, dtype=np.uint64)
+        rec = np.empty(len(keys), dtype=[("h", "<u8"), ("row", "<i8")])
+        rec["h"] = keys
+        if rows is None:
+            rec["row"] = np.arange(self.rows, self.rows + len(keys))
+            self.rows += len(keys)
+        else:
+            rec["row"] = rows
+        bucket = (keys >> self.shift).astype(np.int64)
+        order = np.argsort(bucket, kind="stable")
+        bounds = np.searchsorted(bucket[order], np.arange(self.n_buckets + 1))
+        for b in range(self.n_buckets):
+            lo, hi = bounds[b], bounds[b + 1]
+            if hi > lo:
+                rec[order[lo:hi]].tofile(self.files[b])
+
+    def duplicate_rows(self) -> np.ndarray:
+        for f in self.files:
+            f.close()
+        drops: List[np.ndarray] = []
+        for b in range(self.n_buckets):
+            rec = np.fromfile(os.path.join(self.dir, f"b{b:03d}.bin"), dtype=[("h", "<u8"), ("row", "<i8")])
+            if len(rec) < 2:
+                continue
+            rec = rec[np.lexsort((rec["row"], rec["h"]))]
+            dup = np.zeros(len(rec), dtype=bool)
+            dup[1:] = rec["h"][1:] == rec["h"][:-1]
+            drops.append(rec["row"][dup])
+        return np.sort(np.concatenate(drops)) if drops else np.empty(0, dtype=np.int64)
+
+    def close(self) -> None:
+        for f in self.files:
+            if not f.closed:
+                f.close()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+class PairDeduper:
+    """
+    Dedup (URL, entity_canon) sobre un flujo ordenado de chunks.
+
+    mode:
+      - "global":   descarta toda repetición (dentro y entre chunks). Si el set
+                    en memoria pasaría de max_bytes, cambia a modo externo: los
+                    chunks siguientes se guardan en disco y se filtran en finish().
+      - "external": igual que global pero en disco desde el inicio.
+      - "chunk":    comportamiento anterior (solo drop_duplicates por chunk).
+      - "report":   como "chunk", pero cuenta los duplicados entre chunks que
+                    esa ruta deja pasar (cross_dups = los que sobreviven).
+    """
+
+    MODES = ("global", "external", "chunk", "report")
+
+    def __init__(self, cols: Sequence[str] = ("URL", "entity_canon"), mode: str = "global",
+                 max_bytes: int = MAX_BYTES, tmp_dir: Optional[str] = None):
+        if mode not in self.MODES:
+            raise ValueError(f"dedup mode must be one of {self.MODES}: {mode}")
+        self.cols = list(cols)
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.tmp_dir = tmp_dir
+        self.seen = HashSet64() if mode in ("global", "report") else None
+        self.ext: Optional[ExternalDedup] = None
+        self.staged: List[str] = []
+        self.dropped_within = 0
+        self.cross_dups = 0
+        if mode == "external":
+            self._to_external()
+
+    def _to_external(self) -> None:
+        self.ext = ExternalDedup(tmp_dir=self.tmp_dir)
+        if self.seen is not None:
+            # lo ya emitido es primera aparición: fila -1 (antes que todo lo nuevo)
+            keys = self.seen.table[self.seen.table != EMPTY]
+            if self.seen.has_zero:
+                keys = np.append(keys, EMPTY)
+            self.ext.add(keys, rows=np.full(len(keys), -1, dtype=np.int64))
+            self.seen = None
+
+    def filter(self, chunk: pd.DataFrame) -> Optional[pd.DataFrame]:
+        """Chunk listo para escribir, o None si quedó en disco (se emite en finish())."""
+        n = len(chunk)
+        chunk = chunk.drop_duplicates(subset=self.cols)
+        self.dropped_within += n - len(chunk)
+        if self.mode == "chunk":
+            return chunk
+
+        keys = pair_hashes(chunk, self.cols)
+        if self.seen is not None and self.seen._grow_bytes(len(keys)) > self.max_bytes:
+            print(f"[INFO] dedup set > {self.max_bytes / 2**30:.1f} GiB -> external mode")
+            self._to_external()
+
+        if self.seen is not None:
+            new = self.seen.add(keys)
+            self.cross_dups += int((~new).sum())
+            return chunk if self.mode == "report" else chunk[new]
+
+        self.ext.add(keys)
+        if self.mode == "report":
+            return chunk
+        path = os.path.join(self.ext.dir, f"stage{len(self.staged):05d}.pkl")
+        chunk.to_pickle(path)
+        self.staged.append(path)
+        return None
+
+    def finish(self):
+        """Emite (en orden) los chunks que quedaron en disco, ya filtrados."""
+        if self.ext is None:
+            return
+        drop = self.ext.duplicate_rows()
+        drop = drop[drop >= 0]
+        self.cross_dups += len(drop)
+        offset = 0
+        for path in self.staged:
+            chunk = pd.read_pickle(path)
+            rows = np.arange(offset, offset + len(chunk))
+            offset += len(chunk)
+            yield chunk[~np.isin(rows, drop, assume_unique=True)]
+        self.ext.close()
+        self.ext = None
@@ -1,22 +1,25 @@
-import re
-import unicodedata
-import pandas as pd
-from rapidfuzz import fuzz, process
+import argparse
+import hashlib
+import json
+import time
+
+import storage
+from canon import CANON_VERSION, canon
+from entity_map import (ENTITY_MAP, apply_entity_map, empty_store, entity_map_series, load_meta,
+                        load_store, save_store, update_store)
 
 # Entradas/salidas
 IN_COUNTS = "data/processed/agenda_counts_non_media.csv"      # medio-entity-count (ya lo tienes)
 OUT_COUNTS = "data/processed/agenda_counts_non_media_cons.csv" # consolidado
 OUT_MAP = "data/processed/entity_map_hybrid.csv"              # mapping original->consolidated
 
-# --- 1) Canon básico (tu entity_canon ya viene bien; aquí solo refuerzo limpieza) ---
-def canon(s: str) -> str:
-    if not isinstance(s, str):
-        return ""
-    s = s.strip().lower()
-    s = "".join(c for c in unicodedata.normalize("NFKD", s) if not unicodedata.combining(c))
-    s = re.sub(r"[^\w\s]", " ", s)
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+# Fuzzy: solo entidades con frecuencia global >= MIN_GLOBAL; score token_sort_ratio >= umbral,
+# top-50 candidatos por anchor (como process.extract(limit=50))
+MIN_GLOBAL = 800
+FUZZY_THRESHOLD = 93
+FUZZY_LIMIT = 50
+
+# --- 1) Canon básico: canon.canon (tu entity_canon ya viene bien; aquí solo refuerzo limpieza) ---
 
 # --- 2) Reglas curadas (alta precisión) ---
 RULES = {
@@ -36,13 +39,11 @@ RULES = {
     
     # --- Trump variants ---
     "trump": "donald trump",
-    "donald j trump": "donald trump",
 
     # --- Party variants ---
     "democratic": "democrat",
     "democrats": "democrat",
     "democratic party": "democrat",
-    "democrats": "democrat",
     "republicans": "republican",
     
     # Harris (ojo: si luego metes otra Harris, la refinamos
@@ -56,12 +57,12 @@ RULES = {
     "amlo": "andres manuel lopez obrador",
     "lopez obrador": "andres manuel lopez obrador",
     
-    # NYT/WaPo strings raros a veces
-    "the times": "the new york times",
-    "new york times": "the new york times",}
-    "the new york times": "",
+    # NYT/WaPo strings raros a veces: el propio medio se descarta (self-mention)
+    "the times": "",
     "new york times": "",
-    
+    "the new york times": "",
+}
+
 # --- 3) Plural stripping muy conservador ---
 
 def de_pluralize(s: str) -> str:
@@ -76,81 +77,84 @@ def de_pluralize(s: str) -> str:
     return s
 
 # --- 4) Pipeline de consolidación base (reglas + plural) ---
-def base_consolidate(ent: str) -> str:
+def explain_base(ent: str) -> tuple:
+    """(entity_base, procedencia): identity | rule | plural | rule+plural."""
     e = canon(ent)
     if not e:
-        return ""
-    if e in RULES:
+        return "", "identity"
+    rule = e in RULES
+    if rule:
         e = RULES[e]
+    plural = False
     # plural simple palabra única
     if " " not in e:
         e2 = de_pluralize(e)
+        plural = e2 != e
         # re-aplica regla si tras depluralize cae en algo conocido
         e = RULES.get(e2, e2)
-    return e
+        rule = rule or e != e2
+    source = "+".join(s for s, on in (("rule", rule), ("plural", plural)) if on)
+    return e, source or "identity"
+
+def base_consolidate(ent: str) -> str:
+    return explain_base(ent)[0]
+
+def map_signature() -> dict:
+    """Si cambia algo de esto, el store de mapping se reconstruye."""
+    rules = json.dumps(RULES, sort_keys=True, ensure_ascii=False)
+    return {
+        "rules_sha1": hashlib.sha1(rules.encode("utf-8")).hexdigest(),
+        "canon_version": CANON_VERSION,
+        "threshold": FUZZY_THRESHOLD,
+        "limit": FUZZY_LIMIT,
+    }
 
 def main():
-    df = pd.read_csv(IN_COUNTS)
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--min-global", type=int, default=MIN_GLOBAL,
+                    help="frecuencia global mínima para entrar al fuzzy")
+    ap.add_argument("--workers", type=int, default=-1, help="hilos de rapidfuzz.cdist (-1 = todos)")
+    ap.add_argument("--rebuild", action="store_true",
+                    help="ignora el store de mapping y recalcula todo desde cero")
+    args = ap.parse_args()
+
+    df = storage.read_table(IN_COUNTS)
     df["entity_canon"] = df["entity_canon"].astype(str)
 
-    # aplica consolidación base
-    df["entity_base"] = df["entity_canon"].map(base_consolidate)
-
-    # --- 5) Fuzzy SOLO en entidades frecuentes (controlado) ---
-    # idea: si una entidad aparece mucho, vale la pena agrupar variantes (ej. democratic/democrats)
-    # threshold de "frecuencia global" para entrar a fuzzy:
-    MIN_GLOBAL = 800
-
-    global_counts = df.groupby("entity_base")["count"].sum().sort_values(ascending=False)
-    frequent = global_counts[global_counts >= MIN_GLOBAL].index.tolist()
-
-    # diccionario final base->final
-    base_to_final = {e: e for e in df["entity_base"].unique()}
-
-    # fuzzy: construye clusters en el set frecuente
-    # estrategia: recorre frecuentes por orden de volumen y "absorbe" variantes muy similares
-    used = set()
-    frequent_sorted = sorted(frequent, key=lambda x: global_counts[x], reverse=True)
-
-    for anchor in frequent_sorted:
-        if anchor in used:
-            continue
-        used.add(anchor)
-
-        # candidatos: top matches para anchor dentro del universo frecuente
-        matches = process.extract(
-            anchor,
-            frequent_sorted,
-            scorer=fuzz.token_sort_ratio,
-            limit=50
-        )
-
-        for cand, score, _ in matches:
-            if cand == anchor or cand in used:
-                continue
-            # umbral alto para evitar falsos positivos
-            if score >= 93:
-                base_to_final[cand] = anchor
-                used.add(cand)
-
-    # aplica mapping final y agrega conteos
-    df["entity_final"] = df["entity_base"].map(lambda x: base_to_final.get(x, x))
-
+    # --- 5) Store de mapping: carga lo ya decidido y solo procesa lo nuevo ---
+    # reglas + plural para entity_canon nuevos; fuzzy SOLO en entidades frecuentes
+    # (>= --min-global) que nunca entraron al fuzzy, contra los anchors existentes.
+    # Con --rebuild (o si cambian reglas/umbral) = greedy completo por volumen.
+    signature = map_signature()
+    if args.rebuild:
+        store, meta = empty_store(), load_meta() or {"version": 0, "history": []}
+    else:
+        store, meta = load_store(signature)
+
+    t0 = time.perf_counter()
+    store, meta = update_store(store, meta, df[["entity_canon", "count"]], explain_base, args.min_global,
+                               FUZZY_THRESHOLD, FUZZY_LIMIT, workers=args.workers, signature=signature)
+    save_store(store, meta)
+    print(f"[OK] wrote: {ENTITY_MAP} rows={len(store)} v{meta['version']} | {time.perf_counter() - t0:.1f}s")
+
+    # aplica mapping final (join vectorizado) y agrega conteos
+    df = apply_entity_map(df, entity_map_series(store), "entity_canon", "entity_final")
+
+    # RULES mapea algunos nombres de medio a "" (descartar), igual que la versión mensual
     cons = (
-        df.groupby(["Medio", "entity_final"], as_index=False)["count"]
+        df[df["entity_final"] != ""]
+          .groupby(["Medio", "entity_final"], as_index=False)["count"]
           .sum()
           .rename(columns={"entity_final": "entity_canon"})
     )
 
-    cons.to_csv(OUT_COUNTS, index=False)
+    storage.write_table(cons, OUT_COUNTS)
 
-    # exporta mapping (útil para auditoría)
-    mapping = (
-        df[["entity_canon", "entity_base", "entity_final"]]
-          .drop_duplicates()
-          .rename(columns={"entity_final": "entity_consolidated"})
-    )
-    mapping.to_csv(OUT_MAP, index=False)
+    # exporta mapping (útil para auditoría): filas del store presentes en esta corrida
+    mapping = store[store["entity_canon"].isin(df["entity_canon"].unique())][
+        ["entity_canon", "entity_base", "entity_consolidated", "base_source", "fuzzy", "score"]
+    ]
+    storage.write_table(mapping, OUT_MAP)
 
     print("[OK] wrote:", OUT_COUNTS, "rows=", len(cons))
     print("[OK] wrote:", OUT_MAP, "rows=", len(mapping))
@@ -0,0 +1,200 @@
+"""
+Store persistente y versionado del mapping de consolidación de entidades:
+
+    entity_canon -> entity_base (reglas + plural) -> entity_consolidated (fuzzy)
+
+Una fila por entity_canon con procedencia:
+  base_source : identity | rule | plural | rule+plural
+  fuzzy       : ""        (no entró al fuzzy: debajo de min_global)
+                anchor    (entró y quedó como representante)
+                absorbed  (absorbida por `entity_consolidated`; `score` = token_sort_ratio)
+  version     : corrida en que se agregó / actualizó la fila
+
+Corridas posteriores cargan el store y solo procesan lo nuevo:
+  - entity_canon nuevos -> reglas/plural (base_fn)
+  - bases que ahora pasan min_global y nunca entraron al fuzzy -> se puntúan
+    contra los anchors existentes (mejor score >= umbral, empate: anchor de más
+    volumen); las que no matchean corren el greedy entre ellas.
+Los mappings ya decididos no cambian (estables entre corridas). Si cambian las
+reglas o el umbral/limit (firma en el .json), el store se reconstruye desde cero,
+y una reconstrucción da exactamente el resultado del greedy completo.
+
+apply_entity_map(): join vectorizado (get_indexer) para que los builders usen el
+mapping sin volver a correr la consolidación.
+"""
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime, timezone
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import storage
+from fuzzy_consolidation import LIMIT, THRESHOLD, fuzzy_clusters_scored, score_against
+
+ENTITY_MAP = "data/processed/entity_map_store.csv"
+ENTITY_MAP_META = "data/processed/entity_map_store.json"
+
+STORE_COLS = ["entity_canon", "entity_base", "entity_consolidated", "base_source", "fuzzy", "score", "version"]
+
+
+def empty_store() -> pd.DataFrame:
+    return pd.DataFrame({c: pd.Series(dtype="float64" if c == "score" else "int64" if c == "version" else object)
+                         for c in STORE_COLS})
+
+
+def load_meta(path: str = ENTITY_MAP_META) -> Optional[dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_store(signature: Optional[dict] = None, path: str = ENTITY_MAP,
+               meta_path: str = ENTITY_MAP_META) -> Tuple[pd.DataFrame, dict]:
+    """
+    (store, meta). Si `signature` (reglas/umbral/limit) no coincide con la del
+    store guardado, devuelve un store vacío (reconstrucción completa).
+    """
+    meta = load_meta(meta_path)
+    if meta is None or not storage.exists(path):
+        return empty_store(), {"version": 0, "history": []}
+    if signature is not None and meta.get("signature") != signature:
+        print("[INFO] entity map signature changed -> rebuilding store")
+        return empty_store(), {"version": meta.get("version", 0), "history": meta.get("history", [])}
+    store = storage.read_table(path)
+    store["score"] = store["score"].astype("float64")
+    store["version"] = store["version"].astype("int64")
+    return store[STORE_COLS], meta
+
+
+def save_store(store: pd.DataFrame, meta: dict, path: str = ENTITY_MAP,
+               meta_path: str = ENTITY_MAP_META) -> None:
+    storage.write_table(store[STORE_COLS], path, csv_export=False, partition=False)
+    tmp = meta_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, meta_path)
+
+
+def update_store(store: pd.DataFrame, meta: dict, counts: pd.DataFrame,
+                 base_fn: Callable[[str], Tuple[str, str]], min_global: int,
+                 threshold: float = THRESHOLD, limit: int = LIMIT, workers: int = -1,
+                 signature: Optional[dict] = None) -> Tuple[pd.DataFrame, dict]:
+    """
+    counts: (entity_canon, count) del corpus actual (puede repetir entity_canon).
+    base_fn(entity_canon) -> (entity_base, base_source).
+    """
+    version = int(meta.get("version", 0)) + 1
+
+    # 1) canon nuevos -> base
+    known = pd.Index(store["entity_canon"])
+    canon_u = pd.Index(counts["entity_canon"].unique())
+    new_canon = canon_u[~canon_u.isin(known)].tolist()
+    bases = [base_fn(c) for c in new_canon]
+    new_rows = pd.DataFrame({
+        "entity_canon": new_canon,
+        "entity_base": [b for b, _ in bases],
+        "entity_consolidated": [b for b, _ in bases],
+        "base_source": [s for _, s in bases],
+        "fuzzy": "",
+        "score": np.nan,
+        "version": version,
+    })
+    # canon nuevo cuya base ya pasó por el fuzzy: hereda esa decisión (su base está
+    # en `checked` y no se vuelve a evaluar), igual que en una reconstrucción
+    prior = (store.loc[store["fuzzy"] != "", ["entity_base", "entity_consolidated", "fuzzy", "score"]]
+             .drop_duplicates("entity_base").set_index("entity_base"))
+    pos = prior.index.get_indexer(new_rows["entity_base"])
+    inherit = pos >= 0
+    if inherit.any():
+        for col in ("entity_consolidated", "fuzzy", "score"):
+            new_rows.loc[inherit, col] = prior[col].to_numpy()[pos[inherit]]
+    store = pd.concat([store, new_rows], ignore_index=True) if len(store) else new_rows
+
+    # 2) volumen por base (mismo orden que el greedy original)
+    base_of = pd.Series(store["entity_base"].to_numpy(), index=store["entity_canon"].to_numpy())
+    cnt = counts[["entity_canon", "count"]].copy()
+    cnt["entity_base"] = base_of.reindex(cnt["entity_canon"].to_numpy()).to_numpy()
+    global_counts = cnt.groupby("entity_base")["count"].sum().sort_values(ascending=False)
+
+    checked = set(store.loc[store["fuzzy"] != "", "entity_base"])
+    frequent = [b for b in global_counts[global_counts >= min_global].index if b not in checked]
+    frequent_sorted = sorted(frequent, key=lambda x: global_counts[x], reverse=True)
+
+    # 3) nuevas frecuentes contra anchors existentes
+    anchors = store.loc[store["fuzzy"] == "anchor", "entity_base"].drop_duplicates().tolist()
+    anchors = sorted(anchors, key=lambda x: global_counts.get(x, 0), reverse=True)
+    decided = {}   # base -> (consolidated, fuzzy, score)
+    rest = frequent_sorted
+    if anchors and frequent_sorted:
+        qi, cj, sc = score_against(frequent_sorted, anchors, threshold, workers)
+        if len(qi):
+            order = np.lexsort((cj, -sc, qi))
+            qi, cj, sc = qi[order], cj[order], sc[order]
+            first = np.ones(len(qi), dtype=bool)
+            first[1:] = qi[1:] != qi[:-1]
+            for q, c, s in zip(qi[first].tolist(), cj[first].tolist(), sc[first].tolist()):
+                decided[frequent_sorted[q]] = (anchors[c], "absorbed", s)
+        rest = [b for b in frequent_sorted if b not in decided]
+
+    if not new_canon and not frequent_sorted:
+        print(f"[INFO] entity map v{version - 1}: up to date")
+        return store, meta
+
+    # 4) greedy entre las que quedan (en un store vacío = corrida completa)
+    absorbed = fuzzy_clusters_scored(rest, threshold, limit, workers)
+    for b in rest:
+        if b in absorbed:
+            a, s = absorbed[b]
+            decided[b] = (a, "absorbed", s)
+        else:
+            decided[b] = (b, "anchor", np.nan)
+
+    if decided:
+        hit = store["entity_base"].isin(list(decided))
+        d = store.loc[hit, "entity_base"].map(decided)
+        store.loc[hit, "entity_consolidated"] = d.map(lambda x: x[0])
+        store.loc[hit, "fuzzy"] = d.map(lambda x: x[1])
+        store.loc[hit, "score"] = d.map(lambda x: x[2]).astype("float64")
+        store.loc[hit, "version"] = version
+
+    n_abs = sum(1 for v in decided.values() if v[1] == "absorbed")
+    meta = {
+        "version": version,
+        "signature": signature,
+        "updated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "history": list(meta.get("history", [])) + [{
+            "version": version,
+            "min_global": min_global,
+            "new_canon": len(new_canon),
+            "new_fuzzy_checked": len(frequent_sorted),
+            "absorbed": n_abs,
+        }],
+    }
+    print(f"[INFO] entity map v{version}: +{len(new_canon)} canon | "
+          f"{len(frequent_sorted)} bases into fuzzy ({len(anchors)} existing anchors) | {n_abs} absorbed")
+    return store, meta
+
+
+def entity_map_series(store: pd.DataFrame) -> pd.Series:
+    """entity_canon -> entity_consolidated."""
+    return pd.Series(store["entity_consolidated"].to_numpy(), index=pd.Index(store["entity_canon"]))
+
+
+def apply_entity_map(df: pd.DataFrame, mapping: pd.Series, col: str = "entity_canon",
+                     out_col: Optional[str] = None) -> pd.DataFrame:
+    """
+    Join vectorizado: reemplaza `col` (o escribe `out_col`) por el consolidado.
+    Valores que no están en el store quedan igual (store desactualizado: corre
+    entity_consolidation_hybrid.py para extenderlo).
+    """
+    values = df[col].to_numpy()
+    pos = mapping.index.get_indexer(values)
+    mapped = mapping.to_numpy()[np.maximum(pos, 0)] if len(mapping) else values.copy()
+    out = np.where(pos >= 0, mapped, values)
+    df[out_col or col] = out
+    return df
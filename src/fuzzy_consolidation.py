@@ -0,0 +1,191 @@
+"""
+Fuzzy consolidation por bloques (anchor-absorption de entity_consolidation_hybrid).
+
+Algoritmo original (fuzzy_clusters_reference): recorre las entidades frecuentes
+por volumen; cada anchor no usado hace process.extract(anchor, todas, limit=50)
+con token_sort_ratio y absorbe los candidatos no usados con score >= 93.
+Son n llamadas sobre n strings: O(n²) en un loop de Python.
+
+Aquí (fuzzy_clusters):
+  1) blocking por longitud, sin pérdida: token_sort_ratio es un Indel normalizado
+     sobre los tokens ordenados, score = 100·(1 − d/(l1+l2)) y d >= |l1−l2|, así
+     que score >= t obliga a l2 ∈ [l1·(1−r)/(1+r), l1·(1+r)/(1−r)] con r = (100−t)/100.
+  2) process.cdist (C++, multi-worker, score_cutoff) de cada bloque de longitud
+     contra la mitad superior de su banda (el score es simétrico) -> pares
+     (anchor, cand, score) con score >= t.
+  3) el mismo greedy en orden de volumen, replicando limit=50: para cada anchor
+     se toman sus pares ordenados como extract (score desc, índice asc) y solo
+     los primeros `limit` cuentan (el propio anchor incluido).
+Resultado idéntico al loop original (ver scripts/check_fuzzy_consolidation.py).
+"""
+from __future__ import annotations
+
+import math
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+THRESHOLD = 93
+LIMIT = 50
+BLOCK_CELLS = 16_000_000   # celdas float64 por bloque de cdist (~128 MB)
+
+
+def fuzzy_clusters_reference(frequent_sorted: Sequence[str], threshold: float = THRESHOLD,
+                             limit: int = LIMIT) -> Dict[str, str]:
+    """Loop original con process.extract (referencia)."""
+    base_to_final = {}
+    used = set()
+    for anchor in frequent_sorted:
+        if anchor in used:
+            continue
+        used.add(anchor)
+
+        matches = process.extract(
+            anchor,
+            frequent_sorted,
+            scorer=fuzz.token_sort_ratio,
+            limit=limit
+        )
+
+        for cand, score, _ in matches:
+            if cand == anchor or cand in used:
+                continue
+            if score >= threshold:
+                base_to_final[cand] = anchor
+                used.add(cand)
+    return base_to_final
+
+
+def _sorted_token_len(s: str) -> int:
+    toks = s.split()
+    return sum(len(t) for t in toks) + max(len(toks) - 1, 0)
+
+
+def length_band(length: int, threshold: float) -> Tuple[int, int]:
+    """Rango de longitudes (tokens ordenados) que pueden llegar a `threshold` contra `length`."""
+    r = (100.0 - threshold) / 100.0
+    if r >= 1:
+        return 0, 1 << 30
+    lo = math.ceil(length * (1 - r) / (1 + r)) - 1   # holgura de 1 por redondeo
+    hi = math.floor(length * (1 + r) / (1 - r)) + 1
+    return max(lo, 0), hi
+
+
+def score_pairs(choices: Sequence[str], threshold: float = THRESHOLD, workers: int = -1,
+                block_cells: int = BLOCK_CELLS) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Todos los pares (i, j) con token_sort_ratio(choices[i], choices[j]) >= threshold
+    (incluye i == j). Devuelve (i, j, score) como arrays.
+    """
+    choices = list(choices)
+    lens = np.fromiter((_sorted_token_len(c) for c in choices), dtype=np.int64, count=len(choices))
+    order = np.argsort(lens, kind="stable")
+    sorted_lens = lens[order]
+
+    rows_out: List[np.ndarray] = []
+    cols_out: List[np.ndarray] = []
+    scores_out: List[np.ndarray] = []
+    # token_sort_ratio es simétrico: cada bloque solo se compara contra longitudes
+    # >= la suya y los pares con longitud mayor se reflejan (i, j) -> (j, i)
+    for length in np.unique(sorted_lens):
+        start_len = np.searchsorted(sorted_lens, length, "left")
+        end_len = np.searchsorted(sorted_lens, length, "right")
+        rows = order[start_len:end_len]
+        _, hi = length_band(int(length), threshold)
+        cols = order[start_len:np.searchsorted(sorted_lens, hi, "right")]
+        col_strs = [choices[j] for j in cols]
+        step = max(1, block_cells // max(len(cols), 1))
+        for start in range(0, len(rows), step):
+            rb = rows[start:start + step]
+            m = process.cdist([choices[i] for i in rb], col_strs, scorer=fuzz.token_sort_ratio,
+                              score_cutoff=threshold, dtype=np.float64, workers=workers)
+            ri, ci = np.nonzero(m >= threshold)
+            i, j, sc = rb[ri], cols[ci], m[ri, ci]
+            longer = ci >= len(rows)
+            rows_out += [i, j[longer]]
+            cols_out += [j, i[longer]]
+            scores_out += [sc, sc[longer]]
+
+    if not rows_out:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0, dtype=np.float64)
+    return np.concatenate(rows_out), np.concatenate(cols_out), np.concatenate(scores_out)
+
+
+def score_against(queries: Sequence[str], choices: Sequence[str], threshold: float = THRESHOLD,
+                  workers: int = -1, block_cells: int = BLOCK_CELLS) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Pares (query i, choice j, score) con score >= threshold, con el mismo blocking por longitud."""
+    queries, choices = list(queries), list(choices)
+    q_lens = np.fromiter((_sorted_token_len(c) for c in queries), dtype=np.int64, count=len(queries))
+    c_lens = np.fromiter((_sorted_token_len(c) for c in choices), dtype=np.int64, count=len(choices))
+    q_order = np.argsort(q_lens, kind="stable")
+    c_order = np.argsort(c_lens, kind="stable")
+    q_sorted, c_sorted = q_lens[q_order], c_lens[c_order]
+
+    rows_out: List[np.ndarray] = []
+    cols_out: List[np.ndarray] = []
+    scores_out: List[np.ndarray] = []
+    for length in np.unique(q_sorted):
+        rows = q_order[np.searchsorted(q_sorted, length, "left"):np.searchsorted(q_sorted, length, "right")]
+        lo, hi = length_band(int(length), threshold)
+        cols = c_order[np.searchsorted(c_sorted, lo, "left"):np.searchsorted(c_sorted, hi, "right")]
+        if not len(cols):
+            continue
+        col_strs = [choices[j] for j in cols]
+        step = max(1, block_cells // len(cols))
+        for start in range(0, len(rows), step):
+            rb = rows[start:start + step]
+            m = process.cdist([queries[i] for i in rb], col_strs, scorer=fuzz.token_sort_ratio,
+                              score_cutoff=threshold, dtype=np.float64, workers=workers)
+            ri, ci = np.nonzero(m >= threshold)
+            rows_out.append(rb[ri])
+            cols_out.append(cols[ci])
+            scores_out.append(m[ri, ci])
+
+    if not rows_out:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0, dtype=np.float64)
+    return np.concatenate(rows_out), np.concatenate(cols_out), np.concatenate(scores_out)
+
+
+def greedy_absorb(n: int, pi: np.ndarray, pj: np.ndarray, ps: np.ndarray,
+                  limit: int = LIMIT) -> Dict[int, Tuple[int, float]]:
+    """
+    Greedy anchor-absorption sobre pares ya puntuados (índices en orden de volumen).
+    Devuelve {candidato: (anchor, score)}.
+    """
+    # orden de extract: por anchor, score desc, índice del candidato asc
+    order = np.lexsort((pj, -ps, pi))
+    pi, pj, ps = pi[order], pj[order], ps[order]
+    starts = np.searchsorted(pi, np.arange(n + 1))
+
+    used = np.zeros(n, dtype=bool)
+    absorbed: Dict[int, Tuple[int, float]] = {}
+    for a in range(n):
+        if used[a]:
+            continue
+        used[a] = True
+        end = min(starts[a + 1], starts[a] + limit)
+        for c, sc in zip(pj[starts[a]:end].tolist(), ps[starts[a]:end].tolist()):
+            if c == a or used[c]:
+                continue
+            absorbed[c] = (a, sc)
+            used[c] = True
+    return absorbed
+
+
+def fuzzy_clusters_scored(frequent_sorted: Sequence[str], threshold: float = THRESHOLD, limit: int = LIMIT,
+                          workers: int = -1) -> Dict[str, Tuple[str, float]]:
+    """{candidato: (anchor, score)} con blocking + cdist."""
+    frequent_sorted = list(frequent_sorted)
+    pi, pj, ps = score_pairs(frequent_sorted, threshold, workers)
+    absorbed = greedy_absorb(len(frequent_sorted), pi, pj, ps, limit)
+    return {frequent_sorted[c]: (frequent_sorted[a], sc) for c, (a, sc) in absorbed.items()}
+
+
+def fuzzy_clusters(frequent_sorted: Sequence[str], threshold: float = THRESHOLD, limit: int = LIMIT,
+                   workers: int = -1) -> Dict[str, str]:
+    """Mismo resultado que fuzzy_clusters_reference, con blocking + cdist."""
+    scored = fuzzy_clusters_scored(frequent_sorted, threshold, limit, workers)
+    return {c: a for c, (a, _) in scored.items()}
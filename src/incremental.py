@@ -0,0 +1,129 @@
+"""
+Ingesta incremental: watermark persistido junto a data/processed y helpers de
+upsert/reemplazo para que los builders mensuales recalculen solo los meses tocados.
+"""
+from __future__ import annotations
+
+import os
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+from bson import json_util
+
+import storage
+from months import to_month
+
+WATERMARK = "data/processed/ingest_watermark.json"
+
+CHUNK = 300_000
+
+
+def load_watermark(path: str = WATERMARK) -> Optional[dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        # json_util: conserva ObjectId / datetime para re-usarlos en la query
+        return json_util.loads(f.read())
+
+
+def save_watermark(wm: dict, path: str = WATERMARK) -> None:
+    wm = dict(wm, updated_at=datetime.now(timezone.utc).isoformat(timespec="seconds"))
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(json_util.dumps(wm, indent=2))
+    os.replace(tmp, path)
+
+
+def delta_query(query: dict, wm: Optional[dict]) -> dict:
+    """Docs nuevos (_id mayor) o con fecha_real posterior al último watermark."""
+    if not wm:
+        return dict(query)
+    newer = []
+    if wm.get("max_id") is not None:
+        newer.append({"_id": {"$gt": wm["max_id"]}})
+    if wm.get("max_fecha_real") is not None:
+        newer.append({"fecha_real": {"$gt": wm["max_fecha_real"]}})
+    if not newer:
+        return dict(query)
+    return {"$and": [query, {"$or": newer}]}
+
+
+def snapshot_watermark(coll, query: dict) -> dict:
+    """max(_id) y max(fecha_real) actuales de la colección (antes de leer el delta)."""
+    def top(field):
+        doc = next(iter(coll.find(query, {field: 1}).sort(field, -1).limit(1)), None)
+        return doc.get(field) if doc else None
+
+    return {"max_id": top("_id"), "max_fecha_real": top("fecha_real")}
+
+
+def months_of(fecha: pd.Series) -> pd.Series:
+    """fecha_real -> 'YYYY-MM' (NaN si no parsea), igual que los builders mensuales."""
+    return to_month(fecha)
+
+
+def upsert_by_url(path: str, delta_path: str, delta_urls: Set[str],
+                  chunksize: int = CHUNK) -> Tuple[Set[str], int]:
+    """
+    Reescribe `path` sin las filas cuyo URL está en `delta_urls` y agrega el
+    delta al final (upsert por URL, robusto a re-scrapes). Devuelve los meses
+    de las filas reemplazadas (que también quedan tocados) y las filas totales
+    de `path` después del upsert.
+    """
+    replaced_months: Set[str] = set()
+    rows = 0
+
+    tmp = path + ".tmp"
+    first = True
+    if os.path.exists(path):
+        for chunk in pd.read_csv(path, dtype=str, chunksize=chunksize, keep_default_na=False):
+            hit = chunk["URL"].isin(delta_urls)
+            if hit.any():
+                replaced_months.update(months_of(chunk.loc[hit, "fecha_real"]).dropna())
+            chunk[~hit].to_csv(tmp, mode="w" if first else "a", index=False, header=first)
+            rows += int((~hit).sum())
+            first = False
+
+    for chunk in pd.read_csv(delta_path, dtype=str, chunksize=chunksize, keep_default_na=False):
+        chunk.to_csv(tmp, mode="w" if first else "a", index=False, header=first)
+        rows += len(chunk)
+        first = False
+
+    os.replace(tmp, path)
+    return replaced_months, rows
+
+
+def touched_months(path: str = WATERMARK) -> List[str]:
+    wm = load_watermark(path)
+    if not wm:
+        raise SystemExit(f"[ERROR] No hay watermark en {path}. Corre build_dataset.py --incremental primero.")
+    return sorted(wm.get("touched_months") or [])
+
+
+def _mtime(path: str) -> float:
+    if storage.has_parquet(path):
+        root = storage.parquet_path(path)
+        cols = os.path.join(root, storage.COLUMNS_FILE)
+        return os.path.getmtime(cols if os.path.exists(cols) else root)
+    return os.path.getmtime(path)
+
+
+def require_fresh(path: str, hint: str, watermark: str = WATERMARK) -> None:
+    """
+    Falla si `path` (tabla derivada que la ingesta incremental no actualiza, p.ej.
+    entities_long_clean) es anterior al último watermark: los meses tocados
+    saldrían con los datos viejos.
+    """
+    if not storage.exists(path):
+        raise SystemExit(f"[ERROR] No existe {path}. {hint}")
+    if os.path.exists(watermark) and _mtime(path) < os.path.getmtime(watermark):
+        raise SystemExit(f"[ERROR] {path} es anterior a la última ingesta incremental. {hint}")
+
+
+def replace_months(out_path: str, fresh: pd.DataFrame, months: Iterable[str]) -> int:
+    """
+    Reescribe una tabla mensual reemplazando solo las filas de `months` por `fresh`
+    (particiones Parquet de esos meses + export CSV). Devuelve filas totales.
+    """
+    return storage.replace_partitions(out_path, fresh, sorted(set(months)))
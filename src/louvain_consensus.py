@@ -0,0 +1,225 @@
+"""
+Louvain multi-semilla + consensus clustering.
+
+best_partition es estocástico: una sola corrida es un sorteo. Aquí:
+
+  1) R corridas con semillas fijas (seed0 .. seed0+R-1) en un pool de procesos
+     (spawn, como clean_parallel/build_dataset; el grafo se pasa una vez por
+     worker en el initializer);
+  2) matriz de co-asignación C (N × N): fracción de corridas en que i y j caen
+     en la misma comunidad;
+  3) partición de consenso (Lancichinetti & Fortunato 2012): Louvain sobre C
+     umbralizada en tau, repetido hasta que todas las corridas coinciden
+     (máx. MAX_ITER);
+  4) estabilidad por nodo: Jaccard promedio (sobre corridas) entre la comunidad
+     del nodo en la corrida y su comunidad de consenso.
+
+Las corridas se escriben en el formato de outputs/perturbation_runs.json que lee
+figures_results.py ({"nodes": [...], "levels": [{"p": 0.0, "runs": [{"Q", "partition"}]}]});
+el consenso va en claves extra que ese lector ignora.
+
+Uso:
+    python src/louvain_consensus.py --source stage3 --runs 50 --workers 8
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+import storage
+
+RUNS = 50
+SEED0 = 0
+TAU = 0.5
+MAX_ITER = 10
+
+SOURCES = {
+    # source: (tabla de similitud, formato, umbral por defecto de su agenda_louvain*.py, salida)
+    "non_media_cons": ("data/processed/similarity_cosine.csv", "matrix", 0.45,
+                       "data/processed/louvain_consensus.csv"),
+    "stage3": ("data/processed/similarity_cosine_stage3.csv", "pairs", 0.70,
+               "data/processed/louvain_consensus_stage3.csv"),
+    "stage2_mentions": ("data/processed/similarity_cosine_stage2_mentions.csv", "pairs", 0.70,
+                        "data/processed/louvain_consensus_stage2_mentions.csv"),
+}
+RUNS_OUT = "outputs/louvain_runs_{source}.json"
+
+
+# -----------------------------
+# Corridas (pool)
+# -----------------------------
+_G = None
+_NODES: List = []
+
+
+def init_graph(nodes: Sequence, u: np.ndarray, v: np.ndarray, w: np.ndarray) -> None:
+    """Initializer del worker: arma el grafo una vez (nodos en orden fijo, aislados incluidos)."""
+    global _G, _NODES
+    from similarity_graph import build_graph
+    _NODES = list(nodes)
+    _G = build_graph(np.asarray(u, dtype=object), np.asarray(v, dtype=object), w, nodes=_NODES)
+
+
+def canonical_labels(labels: np.ndarray) -> np.ndarray:
+    """Etiquetas renumeradas por primera aparición (0, 1, ... en orden de nodos)."""
+    _, first, inv = np.unique(labels, return_index=True, return_inverse=True)
+    rank = np.empty(len(first), dtype=np.int64)
+    rank[np.argsort(first, kind="stable")] = np.arange(len(first))
+    return rank[inv]
+
+
+def run_seed(seed: int) -> Tuple[float, np.ndarray]:
+    """Una corrida de Louvain sobre el grafo del worker -> (Q, etiquetas por nodo)."""
+    import community as community_louvain
+    part = community_louvain.best_partition(_G, weight="weight", random_state=int(seed))
+    q = community_louvain.modularity(part, _G, weight="weight")
+    return float(q), canonical_labels(np.array([part[n] for n in _NODES]))
+
+
+def louvain_runs(nodes: Sequence, u, v, w, seeds: Sequence[int], workers: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """R corridas (una por semilla) -> (Q (R,), particiones (R, N)). Orden = orden de seeds."""
+    init_args = (list(nodes), np.asarray(u, dtype=object), np.asarray(v, dtype=object), np.asarray(w, dtype=float))
+    if workers <= 1 or len(seeds) <= 1:
+        init_graph(*init_args)
+        results = [run_seed(s) for s in seeds]
+    else:
+        ctx = mp.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                 initializer=init_graph, initargs=init_args) as ex:
+            results = list(ex.map(run_seed, seeds))
+    Q = np.array([q for q, _ in results], dtype=float)
+    P = np.stack([p for _, p in results]) if results else np.empty((0, len(nodes)), dtype=np.int64)
+    return Q, P
+
+
+# -----------------------------
+# Consenso
+# -----------------------------
+def coassignment(partitions: np.ndarray) -> np.ndarray:
+    """C[i, j] = fracción de corridas con i, j en la misma comunidad (one-hot · one-hotᵀ)."""
+    R, N = partitions.shape
+    C = np.zeros((N, N))
+    for lab in partitions:
+        H = np.zeros((N, int(lab.max()) + 1))
+        H[np.arange(N), lab] = 1.0
+        C += H @ H.T
+    return C / max(R, 1)
+
+
+def consensus_partition(C: np.ndarray, nodes: Sequence, seeds: Sequence[int], tau: float = TAU,
+                        workers: int = 1, max_iter: int = MAX_ITER) -> Tuple[np.ndarray, int]:
+    """Louvain iterado sobre C umbralizada hasta que todas las corridas coinciden."""
+    from similarity_graph import edges_from_matrix
+    nodes = list(nodes)
+    P = None
+    for it in range(1, max_iter + 1):
+        u, v, w = edges_from_matrix(C, nodes, threshold=tau)
+        if len(w) == 0:
+            return np.arange(len(nodes)), it          # nadie co-asignado >= tau: singletons
+        _, P = louvain_runs(nodes, u, v, w, seeds, workers)
+        if (P == P[0]).all():
+            return P[0], it
+        C = coassignment(P)
+    return P[0], max_iter
+
+
+def node_stability(partitions: np.ndarray, consensus: np.ndarray) -> np.ndarray:
+    """Jaccard promedio entre la comunidad de cada nodo en cada corrida y la de consenso."""
+    same_c = consensus[:, None] == consensus[None, :]
+    acc = np.zeros(len(consensus))
+    for lab in partitions:
+        same_r = lab[:, None] == lab[None, :]
+        acc += (same_r & same_c).sum(axis=1) / (same_r | same_c).sum(axis=1)
+    return acc / max(len(partitions), 1)
+
+
+def runs_payload(nodes: Sequence, levels: List[Dict]) -> Dict:
+    """
+    Formato de outputs/perturbation_runs.json. levels: [{"p", "Q", "partitions", "seeds"}, ...]
+    (Q: (R,), partitions: (R, N)); claves extra por nivel/corrida se conservan.
+    """
+    out = {"nodes": [str(n) for n in nodes], "levels": []}
+    for lvl in levels:
+        runs = [{"Q": float(q), "partition": [int(x) for x in part], "seed": int(s)}
+                for q, part, s in zip(lvl["Q"], lvl["partitions"], lvl["seeds"])]
+        extra = {k: v for k, v in lvl.items() if k not in ("p", "Q", "partitions", "seeds")}
+        out["levels"].append({"p": float(lvl["p"]), "runs": runs, **extra})
+    return out
+
+
+def write_json(payload: Dict, path: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+    os.replace(tmp, path)
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+def load_edges(source: str, threshold: Optional[float], top_k: Optional[int]):
+    from similarity_graph import edges_from_matrix, edges_from_pairs
+    path, kind, default_thr, _ = SOURCES[source]
+    thr = default_thr if threshold is None else threshold
+    if kind == "matrix":
+        sim = pd.read_csv(path, index_col=0)
+        return edges_from_matrix(sim, threshold=thr, top_k=top_k)
+    return edges_from_pairs(storage.read_table(path), threshold=thr, top_k=top_k)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--source", choices=list(SOURCES), default="non_media_cons")
+    ap.add_argument("--runs", type=int, default=RUNS, help="corridas de Louvain (semillas)")
+    ap.add_argument("--seed0", type=int, default=SEED0, help="semillas seed0 .. seed0+runs-1")
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--threshold", type=float, default=None, help="default: el de agenda_louvain*.py")
+    ap.add_argument("--top-k", type=int, default=None)
+    ap.add_argument("--tau", type=float, default=TAU, help="umbral de co-asignación del consenso")
+    ap.add_argument("--runs-out", default=None, help=f"JSON de corridas (default: {RUNS_OUT})")
+    args = ap.parse_args()
+
+    u, v, w = load_edges(args.source, args.threshold, args.top_k)
+    if len(w) == 0:
+        raise SystemExit("Grafo vacío. Baja --threshold.")
+    # nodos = los del grafo, en orden de aparición (como agenda_louvain*.py)
+    nodes = list(dict.fromkeys(np.column_stack([u, v]).ravel().tolist()))
+    seeds = list(range(args.seed0, args.seed0 + args.runs))
+    print(f"[INFO] nodes: {len(nodes)} | edges: {len(w)} | runs: {len(seeds)} | workers: {args.workers}")
+
+    Q, P = louvain_runs(nodes, u, v, w, seeds, args.workers)
+    C = coassignment(P)
+    consensus, iters = consensus_partition(C, nodes, seeds, args.tau, args.workers)
+    consensus = canonical_labels(consensus)
+    stability = node_stability(P, consensus)
+    n_distinct = len({tuple(p) for p in P.tolist()})
+    print(f"[INFO] Q mean={Q.mean():.4f} sd={Q.std():.4f} | distinct partitions: {n_distinct} | "
+          f"consensus: {consensus.max() + 1} communities ({iters} iter)")
+
+    out_csv = SOURCES[args.source][3]
+    out = pd.DataFrame({"Medio": nodes, "Community": consensus, "stability": stability})
+    out["community_size"] = out.groupby("Community")["Medio"].transform("size")
+    storage.write_table(out.sort_values(["Community", "Medio"]), out_csv)
+
+    runs_out = args.runs_out or RUNS_OUT.format(source=args.source)
+    payload = runs_payload(nodes, [{"p": 0.0, "Q": Q, "partitions": P, "seeds": seeds}])
+    payload["consensus"] = {"partition": consensus.tolist(), "stability": stability.round(6).tolist(),
+                            "tau": args.tau, "iterations": iters, "threshold": args.threshold,
+                            "source": args.source}
+    write_json(payload, runs_out)
+
+    print("[OK] wrote:", out_csv)
+    print("[OK] wrote:", runs_out)
+    print(out.sort_values(["Community", "Medio"]).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
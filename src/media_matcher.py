@@ -0,0 +1,178 @@
+"""
+Detector de entidades que son medios/agencias (media_set / agency_set) compilado
+como autómata Aho-Corasick, para marcar un chunk completo de una vez.
+
+La heurística es la de clean_entities / clean_entities_pro (ver match_scalar):
+  1) match exacto contra media_set ∪ agency_set
+  2) algún token (split por espacio) en short_tokens
+  3) contiene como substring un medio con len >= min_media_len
+     o una agencia con len >= min_agency_len
+
+Las tres reglas se compilan en un solo autómata envolviendo cada string como
+BOS + s + EOS:
+  - exacto:  BOS m EOS
+  - token:   (BOS|" ") t (" "|EOS)
+  - frase:   m
+El autómata se materializa como tabla densa [estado, símbolo] y se recorre en
+NumPy columna a columna sobre todos los valores únicos del chunk (ordenados por
+longitud), así que el costo es O(caracteres únicos) y no O(filas × blacklist).
+
+Supone strings ya canonicalizados (canon.canon): minúsculas, un solo espacio
+entre tokens, sin espacios al inicio/fin.
+"""
+from __future__ import annotations
+
+from collections import deque
+from typing import Iterable, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+BLOCK = 65_536  # strings por bloque (memoria: BLOCK × max_len × 4 bytes)
+
+
+def match_scalar(s: str, media_set: Set[str], agency_set: Set[str], short_tokens: Set[str],
+                 min_media_len: int = 6, min_agency_len: int = 3) -> bool:
+    """Heurística original, un string a la vez (referencia para equivalencia/benchmark)."""
+    if s in media_set or s in agency_set:
+        return True
+    if set(s.split()).intersection(short_tokens):
+        return True
+    for m in media_set:
+        if len(m) >= min_media_len and m in s:
+            return True
+    for a in agency_set:
+        if len(a) >= min_agency_len and a in s:
+            return True
+    return False
+
+
+class MediaMatcher:
+    """
+    Uso:
+        matcher = MediaMatcher(media_set, agency_set, short_tokens)
+        flags = matcher.flag(chunk["entity_canon"])   # np.ndarray[bool]
+    """
+
+    def __init__(self, media_set: Iterable[str], agency_set: Iterable[str], short_tokens: Iterable[str],
+                 min_media_len: int = 6, min_agency_len: int = 3, empty: bool = False):
+        media_set, agency_set = set(media_set), set(agency_set)
+        self.empty = empty
+
+        patterns: List[List[str]] = []
+        bos, eos = "\x02", "\x03"
+        for m in media_set | agency_set:
+            if m:
+                patterns.append([bos] + list(m) + [eos])
+        for t in short_tokens:
+            for left in (bos, " "):
+                for right in (" ", eos):
+                    patterns.append([left] + list(t) + [right])
+        for m in media_set:
+            if len(m) >= min_media_len:
+                patterns.append(list(m))
+        for a in agency_set:
+            if len(a) >= min_agency_len:
+                patterns.append(list(a))
+
+        # símbolos: 0 = cualquier char fuera de los patrones (siempre vuelve a la raíz)
+        chars = sorted({c for p in patterns for c in p} - {bos, eos})
+        self.sym = {c: i + 1 for i, c in enumerate(chars)}
+        self.BOS = len(chars) + 1
+        self.EOS = len(chars) + 2
+        self.sym[bos], self.sym[eos] = self.BOS, self.EOS
+        n_sym = len(chars) + 3
+
+        max_cp = max((ord(c) for c in chars), default=0)
+        # último slot = 0 para codepoints fuera del alfabeto (se hace clip)
+        self.lut = np.zeros(max_cp + 2, dtype=np.int32)
+        for c in chars:
+            self.lut[ord(c)] = self.sym[c]
+
+        self.table, self.accept = self._compile(patterns, n_sym)
+
+    def _compile(self, patterns: List[List[str]], n_sym: int):
+        # trie
+        goto = [{}]
+        accept = [False]
+        for p in patterns:
+            s = 0
+            for c in p:
+                a = self.sym[c]
+                nxt = goto[s].get(a)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[s][a] = nxt
+                    goto.append({})
+                    accept.append(False)
+                s = nxt
+            accept[s] = True
+
+        # BFS: fail links -> tabla densa (DFA). La fila de un estado hereda la
+        # de su fail y se sobreescribe con sus transiciones propias.
+        table = np.zeros((len(goto), n_sym), dtype=np.int32)
+        for a, nxt in goto[0].items():
+            table[0, a] = nxt
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            s = queue.popleft()
+            table[s] = table[fail[s]]
+            accept[s] = accept[s] or accept[fail[s]]
+            for a, nxt in goto[s].items():
+                fail[nxt] = table[fail[s], a]
+                table[s, a] = nxt
+                queue.append(nxt)
+
+        return table, np.asarray(accept, dtype=bool)
+
+    def match(self, s: str) -> bool:
+        if not s:
+            return self.empty
+        state = self.table[0, self.BOS]
+        hit = bool(self.accept[state])
+        for c in s:
+            if hit:
+                return True
+            state = self.table[state, self.sym.get(c, 0)]
+            hit = bool(self.accept[state])
+        return hit or bool(self.accept[self.table[state, self.EOS]])
+
+    def _match_block(self, values: List[str]) -> np.ndarray:
+        n = len(values)
+        lens = np.fromiter((len(v) for v in values), dtype=np.int64, count=n)
+        width = int(lens.max()) + 1 if n else 1
+
+        # codepoints (n, width) vía UTF-32 de un array '<U' de ancho fijo
+        cps = np.array(values, dtype=f"<U{width}").view(np.uint32).reshape(n, width)
+        codes = self.lut[np.minimum(cps, len(self.lut) - 1)]
+        codes[np.arange(n), lens] = self.EOS
+
+        state = np.full(n, self.table[0, self.BOS], dtype=np.int32)
+        hit = self.accept[state].copy()
+        for j in range(width):
+            state = self.table[state, codes[:, j]]
+            hit |= self.accept[state]
+        hit[lens == 0] = self.empty
+        return hit
+
+    def flag_values(self, values: List[str]) -> np.ndarray:
+        """Flags para una lista de strings (idealmente únicos)."""
+        out = np.zeros(len(values), dtype=bool)
+        if not values:
+            return out
+        order = np.argsort(np.fromiter((len(v) for v in values), dtype=np.int64, count=len(values)),
+                          kind="stable")
+        for start in range(0, len(order), BLOCK):
+            idx = order[start:start + BLOCK]
+            out[idx] = self._match_block([values[i] for i in idx])
+        return out
+
+    def flag(self, col: pd.Series, na: Optional[bool] = None) -> np.ndarray:
+        """Flag por fila: se evalúa cada valor distinto una vez y se mapea con factorize."""
+        codes, uniques = pd.factorize(col, use_na_sentinel=True)
+        values = [v if isinstance(v, str) else "" for v in uniques]
+        res = np.empty(len(values) + 1, dtype=bool)
+        res[:-1] = self.flag_values(values)
+        res[-1] = self.empty if na is None else na
+        return res[codes]
@@ -0,0 +1,267 @@
+"""
+Tensor disperso de conteos (month × Medio × entity) materializado una vez y
+leído por memory-map desde todos los builders BI.
+
+    data/processed/tensors/<tabla>/
+        meta.json     meses, filas por mes, dtypes, firma de la tabla fuente
+        row_medio.bin int32   medio_id de cada fila (orden alfabético dentro del mes)
+        indptr.bin    int64   CSR global (filas = pares month-Medio)
+        indices.bin   int32   entity_id (vocab.py)
+        data.bin      int32   count
+
+Cada mes es un bloque contiguo de filas del CSR global: tensor[month] devuelve
+un MonthMatrix (csr_matrix medios × entity_id) sin releer ni reagrupar la tabla.
+share, HHI, distancias y métricas por tema son álgebra dispersa sobre eso, y los
+filtros por entidad (top500, palabras clave) se evalúan una vez por entidad del
+vocabulario (entity_mask) en vez de una vez por fila.
+
+Si la tabla fuente cambia (firma: tamaños/mtimes de sus archivos) el tensor se
+reconstruye al cargarlo.
+
+Uso:
+    tensor = load_tensor("data/bi/agenda_counts_stage3_monthly.csv")
+    for mm in tensor:
+        shares = mm.shares()
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+import storage
+from vocab import compact_ids, entity_vocab, medio_vocab, save_vocabs
+
+TENSOR_DIR = "data/processed/tensors"
+COUNTS = "data/bi/agenda_counts_stage3_monthly.csv"
+FORMAT_VERSION = 1
+
+FILES = {"row_medio": np.int32, "indptr": np.int64, "indices": np.int32, "data": np.int32}
+
+
+def tensor_root(src: str) -> str:
+    name = os.path.splitext(os.path.basename(src))[0]
+    return os.path.join(TENSOR_DIR, name)
+
+
+def source_stamp(src: str) -> str:
+    """Firma barata de la tabla fuente (rutas, tamaños y mtimes de sus archivos)."""
+    h = hashlib.sha1()
+    if storage.has_parquet(src):
+        root = storage.parquet_path(src)
+        for dirpath, _, files in sorted(os.walk(root)):
+            for f in sorted(files):
+                st = os.stat(os.path.join(dirpath, f))
+                h.update(f"{os.path.relpath(os.path.join(dirpath, f), root)}|{st.st_size}|{st.st_mtime_ns}\n".encode())
+    elif os.path.exists(src):
+        st = os.stat(src)
+        h.update(f"{src}|{st.st_size}|{st.st_mtime_ns}".encode())
+    return h.hexdigest()
+
+
+@dataclass
+class MonthMatrix:
+    """
+    Un mes: X (medios × entity_id, conteos) con filas en orden alfabético de Medio.
+    En la vista apilada (MonthlyTensor.stacked) month es None y row_month da el
+    índice de mes de cada fila.
+    """
+
+    month: Optional[str]
+    X: csr_matrix
+    medio_ids: np.ndarray
+    medios: np.ndarray
+    row_month: Optional[np.ndarray] = None
+
+    @property
+    def row_of_nnz(self) -> np.ndarray:
+        return np.repeat(np.arange(self.X.shape[0]), np.diff(self.X.indptr))
+
+    def totals(self) -> np.ndarray:
+        return np.asarray(self.X.sum(axis=1), dtype=np.float64).ravel()
+
+    def shares(self) -> csr_matrix:
+        """Share dentro del medio-mes (float64, mismo patrón de nnz que X)."""
+        S = self.X.astype(np.float64)
+        tot = self.totals()
+        S.data /= tot[self.row_of_nnz]
+        return S
+
+    def columns(self, mask: np.ndarray) -> "MonthMatrix":
+        """Solo las entidades con mask[entity_id] (mismas filas)."""
+        n = self.X.shape[1]
+        keep = np.zeros(n, dtype=bool)
+        keep[:min(len(mask), n)] = mask[:n]
+        hit = keep[self.X.indices]
+        per_row = np.bincount(self.row_of_nnz[hit], minlength=self.X.shape[0])
+        indptr = np.concatenate([[0], np.cumsum(per_row)]).astype(self.X.indptr.dtype)
+        X = csr_matrix((self.X.data[hit], self.X.indices[hit], indptr), shape=self.X.shape)
+        return MonthMatrix(self.month, X, self.medio_ids, self.medios, self.row_month)
+
+    def nonempty_rows(self) -> "MonthMatrix":
+        nz = np.diff(self.X.indptr) > 0
+        row_month = self.row_month[nz] if self.row_month is not None else None
+        return MonthMatrix(self.month, self.X[nz], self.medio_ids[nz], self.medios[nz], row_month)
+
+    def long_frame(self, values: Optional[Dict[str, np.ndarray]] = None) -> pd.DataFrame:
+        """(month, Medio, entity_canon, count[, values...]) por nnz, en orden CSR."""
+        rows = self.row_of_nnz
+        out = {
+            "month": np.full(len(rows), self.month, dtype=object),
+            "Medio": self.medios[rows],
+            "entity_canon": entity_vocab().values[self.X.indices],
+            "count": self.X.data.astype(np.int64),
+        }
+        out.update(values or {})
+        return pd.DataFrame(out)
+
+
+class MonthlyTensor:
+    """Tensor mmap'eado; iterar devuelve un MonthMatrix por mes (orden cronológico)."""
+
+    def __init__(self, root: str):
+        self.root = root
+        with open(os.path.join(root, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.months: List[str] = self.meta["months"]
+        self.month_ptr = np.asarray(self.meta["month_ptr"], dtype=np.int64)
+        self.n_entities = int(self.meta["n_entities"])
+        self.arrays = {}
+        for name, dtype in FILES.items():
+            path = os.path.join(root, f"{name}.bin")
+            n = os.path.getsize(path) // np.dtype(dtype).itemsize
+            self.arrays[name] = np.memmap(path, dtype=dtype, mode="r", shape=(n,)) if n else np.empty(0, dtype)
+        self._pos = {m: i for i, m in enumerate(self.months)}
+
+    def __len__(self) -> int:
+        return len(self.months)
+
+    def __iter__(self) -> Iterator[MonthMatrix]:
+        for m in self.months:
+            yield self[m]
+
+    def __getitem__(self, month: str) -> MonthMatrix:
+        i = self._pos[month]
+        r0, r1 = int(self.month_ptr[i]), int(self.month_ptr[i + 1])
+        indptr = np.asarray(self.arrays["indptr"][r0:r1 + 1])
+        lo, hi = int(indptr[0]), int(indptr[-1])
+        X = csr_matrix((np.asarray(self.arrays["data"][lo:hi]),
+                        np.asarray(self.arrays["indices"][lo:hi]),
+                        (indptr - lo).astype(np.int32 if hi - lo < 2**31 else np.int64)),
+                       shape=(r1 - r0, self.n_entities))
+        medio_ids = np.asarray(self.arrays["row_medio"][r0:r1])
+        return MonthMatrix(month, X, medio_ids, medio_vocab().decode(medio_ids))
+
+    def stacked(self) -> MonthMatrix:
+        """Todas las filas (month, Medio) en un solo CSR (orden cronológico, luego Medio)."""
+        indptr = np.asarray(self.arrays["indptr"])
+        n_rows = len(indptr) - 1
+        X = csr_matrix((np.asarray(self.arrays["data"]), np.asarray(self.arrays["indices"]), indptr),
+                       shape=(n_rows, self.n_entities))
+        medio_ids = np.asarray(self.arrays["row_medio"])
+        row_month = np.repeat(np.arange(len(self.months)), np.diff(self.month_ptr))
+        return MonthMatrix(None, X, medio_ids, medio_vocab().decode(medio_ids), row_month)
+
+    def entity_mask(self, pred: Callable[[str], bool]) -> np.ndarray:
+        """pred(entity_canon) evaluado una vez por entidad del vocabulario."""
+        values = entity_vocab().values[:self.n_entities]
+        return np.fromiter((bool(pred(v)) for v in values), dtype=bool, count=len(values))
+
+    def names_mask(self, names) -> np.ndarray:
+        """Máscara por entity_id de una lista de entity_canon (las ausentes se ignoran)."""
+        pos = entity_vocab().index.get_indexer(pd.Index(list(names), dtype=object))
+        mask = np.zeros(self.n_entities, dtype=bool)
+        mask[pos[(pos >= 0) & (pos < self.n_entities)]] = True
+        return mask
+
+
+def _iter_source_months(src: str):
+    cols = ["month", "Medio", "entity_canon", "count"]
+    months = storage.list_months(src)
+    if months:
+        for m in months:
+            yield m, storage.read_table(src, columns=cols, months=[m])
+        return
+    df = storage.read_table(src, columns=cols)
+    for m, sub in df.groupby("month", sort=True):
+        yield m, sub
+
+
+def build_tensor(src: str = COUNTS, root: Optional[str] = None) -> MonthlyTensor:
+    """Materializa el tensor de `src` (month, Medio, entity_canon, count)."""
+    root = root or tensor_root(src)
+    stamp = source_stamp(src)
+    tmp = root + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    fh = {name: open(os.path.join(tmp, f"{name}.bin"), "wb") for name in FILES}
+
+    months, month_ptr = [], [0]
+    n_rows, nnz = 0, 0
+    np.array([0], dtype=np.int64).tofile(fh["indptr"])
+    medios, ents = medio_vocab(), entity_vocab()
+    for month, df in _iter_source_months(src):
+        df = df.dropna(subset=["Medio", "entity_canon"])
+        if not len(df):
+            continue
+        counts = df["count"].to_numpy(np.int64)
+        if counts.max() > np.iinfo(np.int32).max:
+            raise OverflowError(f"{src} {month}: count exceeds int32")
+        rows, labels = compact_ids(medios.encode(df["Medio"]), medios)
+        cols = ents.encode(df["entity_canon"])
+        X = csr_matrix((counts, (rows, cols)), shape=(len(labels), len(ents)))
+        X.sum_duplicates()
+        X.sort_indices()
+
+        medios.index.get_indexer(labels).astype(np.int32).tofile(fh["row_medio"])
+        (X.indptr[1:].astype(np.int64) + nnz).tofile(fh["indptr"])
+        X.indices.astype(np.int32).tofile(fh["indices"])
+        X.data.astype(np.int32).tofile(fh["data"])
+        months.append(str(month))
+        n_rows += X.shape[0]
+        nnz += X.nnz
+        month_ptr.append(n_rows)
+
+    for f in fh.values():
+        f.close()
+    save_vocabs()
+    meta = {
+        "format": FORMAT_VERSION,
+        "source": src,
+        "source_stamp": stamp,
+        "months": months,
+        "month_ptr": month_ptr,
+        "n_entities": len(ents),
+        "n_medios": len(medios),
+        "rows": n_rows,
+        "nnz": nnz,
+        "dtypes": {k: np.dtype(v).name for k, v in FILES.items()},
+    }
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    shutil.rmtree(root, ignore_errors=True)
+    os.replace(tmp, root)
+    print(f"[OK] tensor: {root} | months={len(months)} rows={n_rows} nnz={nnz}")
+    return MonthlyTensor(root)
+
+
+def load_tensor(src: str = COUNTS, rebuild: bool = False) -> MonthlyTensor:
+    """Tensor de `src`; lo (re)construye si no existe o si la tabla fuente cambió."""
+    root = tensor_root(src)
+    meta_path = os.path.join(root, "meta.json")
+    if not rebuild and os.path.exists(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") == FORMAT_VERSION and meta.get("source_stamp") == source_stamp(src):
+            return MonthlyTensor(root)
+        print(f"[INFO] {src} changed -> rebuilding tensor")
+    if not storage.exists(src):
+        raise SystemExit(f"[ERROR] No existe {src}. Corre el builder de conteos mensuales primero.")
+    return build_tensor(src, root)
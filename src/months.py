@@ -0,0 +1,153 @@
+"""
+fecha_real -> mes, parseando cada string distinto una sola vez.
+
+Los builders mensuales hacían pd.to_datetime (con inferencia de formato) sobre
+la columna completa de cada chunk, aunque fecha_real tiene muchos menos valores
+distintos que filas (decenas de menciones por artículo). Aquí:
+
+  - factorize del chunk -> solo se parsean los strings que no están en cache;
+  - fast path con formato explícito (ISO8601: "2024-01-31 12:00:00[.ffffff][+00:00]",
+    "2024-01-31"); lo que no matchea cae al parser genérico valor por valor;
+  - el resultado se guarda como día (datetime64[D], hora de pared) y de ahí salen
+    el código de mes (int32, meses desde 1970-01; MONTH_NA = -1 si no parsea), la
+    etiqueta YYYY-MM y el día del mes.
+
+Con un solo formato por columna el resultado es el mismo que
+pd.to_datetime(errors="coerce").dt.to_period("M") (ver scripts/bench_months.py).
+Con formatos mezclados NO: pd.to_datetime infiere el formato del primer valor
+del chunk y deja en NaT los que no lo siguen (p.ej. "2024-02-01 10:00:00" tras
+"2024-01-31", o "31/01/2024"), así que el mes dependía de cómo caían los chunks.
+Aquí cada string se parsea por su cuenta: esos valores ahora sí tienen mes.
+"""
+from __future__ import annotations
+
+import warnings
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+MONTH_NA = -1
+DAY_NA = np.iinfo(np.int32).min
+MAX_CACHE = 5_000_000
+
+
+def _wall_clock(dt: pd.DatetimeIndex) -> pd.DatetimeIndex:
+    return dt.tz_localize(None) if dt.tz is not None else dt
+
+
+def parse_days(values: Sequence[str]) -> np.ndarray:
+    """Strings -> días desde 1970-01-01 (int32; DAY_NA si no parsea)."""
+    values = pd.Index(values, dtype=object)
+    try:
+        with warnings.catch_warnings():
+            # offsets mezclados: pandas avisa y devuelve objetos -> DatetimeIndex falla abajo
+            warnings.simplefilter("ignore", FutureWarning)
+            dt = _wall_clock(pd.DatetimeIndex(pd.to_datetime(values, format="ISO8601", errors="coerce")))
+        days = dt.values.astype("datetime64[D]")
+        bad = np.isnat(days)
+    except (ValueError, TypeError):
+        # offsets mezclados u otra cosa que el parser vectorizado no acepta
+        days = np.full(len(values), np.datetime64("NaT"), dtype="datetime64[D]")
+        bad = np.ones(len(values), dtype=bool)
+
+    for i in np.flatnonzero(bad):
+        with warnings.catch_warnings():
+            # "31/01/2024": pandas avisa que infiere %d/%m/%Y
+            warnings.simplefilter("ignore", UserWarning)
+            ts = pd.to_datetime(values[i], errors="coerce")
+        if ts is not pd.NaT and not pd.isna(ts):
+            days[i] = np.datetime64((ts.tz_localize(None) if ts.tzinfo else ts).date(), "D")
+
+    out = days.astype(np.int64)
+    out[np.isnat(days)] = DAY_NA
+    return out.astype(np.int32)
+
+
+def days_to_month_codes(days: np.ndarray) -> np.ndarray:
+    ok = days != DAY_NA
+    months = np.full(len(days), MONTH_NA, dtype=np.int32)
+    months[ok] = days[ok].astype("datetime64[D]").astype("datetime64[M]").astype(np.int32)
+    return months
+
+
+def month_labels_of_codes(codes: np.ndarray) -> pd.Series:
+    """Código de mes -> "YYYY-MM" (string, <NA> para MONTH_NA)."""
+    codes = np.asarray(codes)
+    ok = codes != MONTH_NA
+    if not ok.any():
+        return pd.Series(pd.NA, index=range(len(codes)), dtype="string")
+    lo, hi = int(codes[ok].min()), int(codes[ok].max())
+    # tabla por rango de meses (pocos) + un slot final para <NA>
+    table = np.array([str(np.datetime64(c, "M")) for c in range(lo, hi + 1)] + [None], dtype=object)
+    return pd.Series(table[np.where(ok, codes - lo, hi - lo + 1)], dtype="string")
+
+
+class MonthCache:
+    """Cache string -> día; sirve a todos los chunks de una corrida."""
+
+    def __init__(self, max_size: int = MAX_CACHE):
+        self.max_size = max_size
+        self._days: Dict[str, int] = {}
+        self.parsed = 0
+
+    def days(self, fecha: pd.Series) -> np.ndarray:
+        """Días desde 1970-01-01 por fila (int32, DAY_NA si falta o no parsea)."""
+        if pd.api.types.is_datetime64_any_dtype(fecha):
+            dt = _wall_clock(pd.DatetimeIndex(fecha))
+            d = dt.values.astype("datetime64[D]")
+            out = d.astype(np.int64)
+            out[np.isnat(d)] = DAY_NA
+            return out.astype(np.int32)
+
+        codes, uniq = pd.factorize(fecha, sort=False)
+        uniq = np.asarray(uniq, dtype=object)
+        cache = self._days
+        miss = [u for u in uniq if u not in cache]
+        if miss:
+            if len(cache) + len(miss) > self.max_size:
+                cache.clear()
+            cache.update(zip(miss, parse_days(miss).tolist()))
+            self.parsed += len(miss)
+        udays = np.fromiter((cache[u] for u in uniq), dtype=np.int32, count=len(uniq))
+        return np.where(codes >= 0, udays[np.maximum(codes, 0)] if len(udays) else DAY_NA, DAY_NA).astype(np.int32)
+
+    def month_codes(self, fecha: pd.Series) -> np.ndarray:
+        return days_to_month_codes(self.days(fecha))
+
+    def to_month(self, fecha: pd.Series) -> pd.Series:
+        """
+        Como pd.to_datetime(fecha, errors="coerce").dt.to_period("M").astype("string"),
+        salvo en columnas con formatos mezclados (ver docstring del módulo).
+        """
+        out = month_labels_of_codes(self.month_codes(fecha))
+        out.index = fecha.index
+        return out
+
+
+_default: Optional[MonthCache] = None
+
+
+def default_cache() -> MonthCache:
+    global _default
+    if _default is None:
+        _default = MonthCache()
+    return _default
+
+
+def to_month(fecha: pd.Series) -> pd.Series:
+    """fecha_real -> "YYYY-MM" (string, <NA> si no parsea) con la cache del proceso."""
+    return default_cache().to_month(fecha)
+
+
+def month_codes(fecha: pd.Series) -> np.ndarray:
+    return default_cache().month_codes(fecha)
+
+
+def day_of_month(days: np.ndarray) -> np.ndarray:
+    """Días desde 1970 -> día del mes (1..31; 0 para DAY_NA)."""
+    ok = days != DAY_NA
+    out = np.zeros(len(days), dtype=np.int8)
+    d = days[ok].astype("datetime64[D]")
+    out[ok] = (d - d.astype("datetime64[M]")).astype(np.int64) + 1
+    return out
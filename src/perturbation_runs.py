@@ -0,0 +1,293 @@
+"""
+Genera outputs/perturbation_runs.json (estudio de robustez al ruido que lee
+figures_results.py).
+
+Para cada nivel de ruido p de la grilla y cada corrida r = 0..R-1:
+  1) perturba el grafo base (matriz de similitud umbralizada) con el modelo
+     de ruido elegido;
+  2) corre Louvain sobre el grafo perturbado y guarda (Q, partición).
+
+Modelos de ruido (--noise):
+  - weight: w' = w · (1 + p·ε), ε ~ N(0, 1); aristas con w' <= 0 se caen
+  - drop:   cada arista se elimina con probabilidad p
+  - rewire: cada arista se mueve con probabilidad p a un par (i, j) sin arista,
+            elegido al azar, conservando su peso (mismo número de aristas)
+
+Semillas deterministas: el ruido y la semilla de Louvain de (p, r) salen de
+SeedSequence([seed, round(p·1e6), r]), así que una corrida no depende del orden,
+del número de workers ni de qué otras (p, r) se corrieron antes.
+
+Las corridas se escriben a medida que terminan en un journal JSONL (una línea
+por corrida, flush por línea; la primera línea es la metadata). Si el proceso se
+interrumpe, volver a correr el mismo comando retoma desde lo que ya está en el
+journal. Con --out *.json además se reescribe (atómico) el JSON consolidado al
+cerrar cada nivel.
+
+Uso:
+    python src/perturbation_runs.py --p 0,0.05,0.1,0.2,0.3 --runs 50 --workers 8
+    python src/perturbation_runs.py --matrix data/processed/similarity_cosine_stage3.csv \
+        --threshold 0.70 --noise rewire --out outputs/perturbation_runs_stage3.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+import storage
+from louvain_consensus import canonical_labels, runs_payload, write_json
+
+MATRIX = "data/similarity_matrix.csv"
+MATRIX_FALLBACK = "data/processed/similarity_cosine.csv"
+OUT = "outputs/perturbation_runs.json"
+
+P_GRID = "0,0.05,0.1,0.15,0.2,0.3"
+RUNS = 50
+SEED = 42
+THRESHOLD = 0.45          # mismo corte que agenda_louvain.py
+NOISE_MODELS = ("weight", "drop", "rewire")
+
+
+# -----------------------------
+# Entrada
+# -----------------------------
+def load_similarity(path: str) -> Tuple[List[str], np.ndarray]:
+    """Matriz cuadrada (index = columns) o tabla long-form (Medio_A, Medio_B, cosine) -> (nodos, S)."""
+    df = storage.read_table(path)
+    if {"Medio_A", "Medio_B"}.issubset(df.columns):
+        nodes = sorted(set(df["Medio_A"].astype(str)) | set(df["Medio_B"].astype(str)))
+        pos = {m: i for i, m in enumerate(nodes)}
+        i = df["Medio_A"].astype(str).map(pos).to_numpy()
+        j = df["Medio_B"].astype(str).map(pos).to_numpy()
+        S = np.zeros((len(nodes), len(nodes)))
+        S[i, j] = S[j, i] = df["cosine"].to_numpy(dtype=float)
+        return nodes, S
+    df = df.set_index(df.columns[0])
+    df.index = df.index.astype(str).str.strip()
+    df.columns = df.columns.astype(str).str.strip()
+    df = df.loc[df.index, df.index]
+    return df.index.tolist(), df.to_numpy(dtype=float)
+
+
+# -----------------------------
+# Ruido
+# -----------------------------
+def p_key(p: float) -> int:
+    return int(round(p * 1_000_000))
+
+
+def run_rng(seed: int, p: float, r: int) -> Tuple[np.random.Generator, int]:
+    """RNG del ruido + semilla de Louvain para (p, r), independientes del orden de ejecución."""
+    ss = np.random.SeedSequence([seed, p_key(p), r])
+    noise_ss, louvain_ss = ss.spawn(2)
+    return np.random.default_rng(noise_ss), int(louvain_ss.generate_state(1)[0])
+
+
+def perturb(u: np.ndarray, v: np.ndarray, w: np.ndarray, n: int, p: float, model: str,
+            rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Aristas (u < v, índices enteros) perturbadas con nivel p."""
+    if p <= 0:
+        return u, v, w
+    if model == "weight":
+        w2 = w * (1.0 + p * rng.standard_normal(len(w)))
+        keep = w2 > 0
+        return u[keep], v[keep], w2[keep]
+    if model == "drop":
+        keep = rng.random(len(w)) >= p
+        return u[keep], v[keep], w[keep]
+    if model == "rewire":
+        move = rng.random(len(w)) < p
+        k = int(move.sum())
+        taken = u.astype(np.int64) * n + v
+        free = n * (n - 1) // 2 - len(w)
+        k = min(k, free)
+        if k == 0:
+            return u, v, w
+        new = np.empty(0, dtype=np.int64)
+        while len(new) < k:
+            a = rng.integers(0, n, 2 * k)
+            b = rng.integers(0, n, 2 * k)
+            lo, hi = np.minimum(a, b), np.maximum(a, b)
+            cand = (lo * n + hi)[lo != hi]
+            cand = cand[~np.isin(cand, taken) & ~np.isin(cand, new)]
+            # únicos en orden de sorteo (reproducible)
+            _, first = np.unique(cand, return_index=True)
+            new = np.concatenate([new, cand[np.sort(first)]])
+        new = new[:k]
+        moved = np.flatnonzero(move)[:k]
+        u, v = u.copy(), v.copy()
+        u[moved], v[moved] = new // n, new % n
+        return u, v, w
+    raise ValueError(f"noise model desconocido: {model!r} (usa {NOISE_MODELS})")
+
+
+# -----------------------------
+# Worker
+# -----------------------------
+_BASE: Dict = {}
+
+
+def init_worker(u: np.ndarray, v: np.ndarray, w: np.ndarray, n: int, model: str, seed: int) -> None:
+    """Initializer: aristas base (índices enteros) una vez por worker."""
+    _BASE.update(u=u, v=v, w=w, n=n, model=model, seed=seed)
+
+
+def run_task(task: Tuple[float, int]) -> Dict:
+    """Una corrida (p, r) -> registro del journal."""
+    import community as community_louvain
+    from similarity_graph import build_graph
+    p, r = task
+    rng, louvain_seed = run_rng(_BASE["seed"], p, r)
+    u, v, w = perturb(_BASE["u"], _BASE["v"], _BASE["w"], _BASE["n"], p, _BASE["model"], rng)
+    nodes = range(_BASE["n"])
+    G = build_graph(u, v, w, nodes=nodes)
+    part = community_louvain.best_partition(G, weight="weight", random_state=louvain_seed)
+    q = community_louvain.modularity(part, G, weight="weight") if G.number_of_edges() else 0.0
+    labels = canonical_labels(np.array([part[i] for i in nodes]))
+    return {"p": float(p), "run": int(r), "seed": louvain_seed, "Q": float(q),
+            "edges": int(len(w)), "partition": labels.tolist()}
+
+
+# -----------------------------
+# Journal (JSONL) + resume
+# -----------------------------
+def read_journal(path: str) -> Tuple[Optional[Dict], List[Dict]]:
+    """(meta, registros). Una última línea truncada (corte a medio escribir) se descarta del archivo."""
+    if not os.path.exists(path):
+        return None, []
+    meta, records, good = None, [], 0
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                obj = json.loads(line)
+            except ValueError:
+                break
+            if not line.endswith(b"\n"):
+                break
+            good += len(line)
+            if obj.get("type") == "meta":
+                meta = obj
+            else:
+                records.append(obj)
+    if good < os.path.getsize(path):
+        with open(path, "r+b") as f:
+            f.truncate(good)
+        print(f"[WARN] journal truncado a la última línea completa: {path}")
+    return meta, records
+
+
+def journal_payload(meta: Dict, records: Iterable[Dict]) -> Dict:
+    """Registros del journal -> formato de figures_results (niveles por p, corridas por r)."""
+    by_p: Dict[float, Dict[int, Dict]] = {}
+    for rec in records:
+        by_p.setdefault(rec["p"], {})[rec["run"]] = rec
+    levels = []
+    for p in sorted(by_p):
+        runs = [by_p[p][r] for r in sorted(by_p[p])]
+        levels.append({"p": p, "Q": [x["Q"] for x in runs], "partitions": [x["partition"] for x in runs],
+                       "seeds": [x["seed"] for x in runs]})
+    payload = runs_payload(meta["nodes"], levels)
+    payload["meta"] = {k: v for k, v in meta.items() if k not in ("type", "nodes")}
+    return payload
+
+
+def journal_path(out: str) -> str:
+    return out if out.endswith(".jsonl") else os.path.splitext(out)[0] + ".jsonl"
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--matrix", default=None, help=f"default: {MATRIX} (o {MATRIX_FALLBACK})")
+    ap.add_argument("--threshold", type=float, default=THRESHOLD, help="aristas con similitud >= threshold")
+    ap.add_argument("--top-k", type=int, default=None)
+    ap.add_argument("--noise", choices=NOISE_MODELS, default="rewire")
+    ap.add_argument("--p", default=P_GRID, help="grilla de niveles de ruido, separada por comas")
+    ap.add_argument("--runs", type=int, default=RUNS, help="corridas de Louvain por nivel")
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--out", default=OUT, help="*.json (journal *.jsonl + JSON consolidado) o *.jsonl")
+    ap.add_argument("--restart", action="store_true", help="descarta el journal existente")
+    args = ap.parse_args()
+
+    matrix = args.matrix
+    if matrix is None:
+        matrix = MATRIX if storage.exists(MATRIX) else MATRIX_FALLBACK
+    from similarity_graph import edges_from_matrix
+    nodes, S = load_similarity(matrix)
+    u, v, w = edges_from_matrix(S, threshold=args.threshold, top_k=args.top_k)
+    u, v = u.astype(np.int64), v.astype(np.int64)
+    if len(w) == 0:
+        raise SystemExit("Grafo vacío. Baja --threshold.")
+
+    grid = sorted({float(x) for x in args.p.split(",") if x.strip()})
+    meta = {"type": "meta", "matrix": matrix, "threshold": args.threshold, "top_k": args.top_k,
+            "noise": args.noise, "seed": args.seed, "nodes": nodes}
+
+    jpath = journal_path(args.out)
+    if args.restart and os.path.exists(jpath):
+        os.remove(jpath)
+    old_meta, records = read_journal(jpath)
+    if old_meta is not None:
+        same = all(old_meta.get(k) == meta[k] for k in meta)
+        if not same:
+            raise SystemExit(f"{jpath} es de otra configuración (matriz/umbral/ruido/semilla/nodos). "
+                             f"Usa otro --out o --restart.")
+    os.makedirs(os.path.dirname(jpath) or ".", exist_ok=True)
+    if old_meta is None:
+        with open(jpath, "w", encoding="utf-8") as f:
+            f.write(json.dumps(meta) + "\n")
+
+    done = {(p_key(rec["p"]), rec["run"]) for rec in records}
+    tasks = [(p, r) for p in grid for r in range(args.runs) if (p_key(p), r) not in done]
+    print(f"[INFO] nodes: {len(nodes)} | edges: {len(w)} | noise: {args.noise} | p: {grid} | "
+          f"runs: {args.runs} | pending: {len(tasks)} (done: {len(done)}) | workers: {args.workers}")
+
+    remaining = {}
+    for p, _ in tasks:
+        remaining[p] = remaining.get(p, 0) + 1
+
+    def consolidate():
+        if not args.out.endswith(".jsonl"):
+            write_json(journal_payload(meta, records), args.out)
+
+    init_args = (u, v, w, len(nodes), args.noise, args.seed)
+    with open(jpath, "a", encoding="utf-8") as journal:
+        if args.workers <= 1:
+            init_worker(*init_args)
+            results = map(run_task, tasks)
+            ex = None
+        else:
+            ex = ProcessPoolExecutor(max_workers=args.workers, mp_context=mp.get_context("spawn"),
+                                     initializer=init_worker, initargs=init_args)
+            results = ex.map(run_task, tasks)
+        try:
+            # en orden de tareas: cada nivel se cierra antes de empezar a escribir el siguiente
+            for rec in results:
+                journal.write(json.dumps(rec) + "\n")
+                journal.flush()
+                records.append(rec)
+                remaining[rec["p"]] -= 1
+                if remaining[rec["p"]] == 0:
+                    consolidate()
+                    qs = [x["Q"] for x in records if x["p"] == rec["p"]]
+                    print(f"[INFO] p={rec['p']:g}: {len(qs)} runs | Q mean={np.mean(qs):.4f}")
+        finally:
+            if ex is not None:
+                ex.shutdown(cancel_futures=True)
+
+    consolidate()
+    print("[OK] wrote:", jpath)
+    if not args.out.endswith(".jsonl"):
+        print("[OK] wrote:", args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""
+Motor de similitud entre medios sobre una matriz Medio × entidad cacheada.
+
+La matriz de conteos se arma una sola vez por tabla (lectura por chunks) y se
+guarda en data/processed/matrices/<tabla>/ (CSR .npz + etiquetas de filas y
+columnas); se reconstruye solo si la tabla fuente cambia. Sobre esa matriz se
+evalúan varias ponderaciones y métricas sin releer nada:
+
+    ponderaciones: raw, share, tfidf, bm25, ppmi
+    métricas:      cosine, js (1 - distancia Jensen–Shannon, base 2),
+                   hellinger (1 - distancia de Hellinger)
+
+js y hellinger comparan distribuciones: la fila ponderada se normaliza a suma 1.
+Todas devuelven similitud en [0, 1] (cosine puede ser < 0 solo con pesos negativos,
+que ninguna ponderación produce).
+
+Uso:
+    am = load_matrix("data/processed/agenda_counts_stage3.csv")
+    S = similarity(am.X, weighting="bm25", metric="js")    # medios × medios
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfTransformer
+
+import storage
+from monthly_tensor import source_stamp
+from sparse_similarity import cosine_matrix
+from vocab import Vocab, compact_ids
+
+MATRIX_DIR = "data/processed/matrices"
+CHUNK = 1_000_000
+FORMAT_VERSION = 1
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Opcional: remover self-entities obvias (si no las consolidaste a "")
+DROP_SELF = set([
+    "the new york times",
+    "the washington post",
+    "el universal",
+    "infobae",
+    "reuters",
+    "efe",
+    "afp",
+    "associated press",
+    "the associated press",
+])
+
+
+@dataclass
+class AgendaMatrix:
+    """Conteos medios × entidades (filas en orden alfabético de Medio)."""
+
+    X: sparse.csr_matrix
+    medios: np.ndarray
+    entities: np.ndarray
+
+    def drop_entities(self, names) -> "AgendaMatrix":
+        """Pone en cero las columnas de `names` (p. ej. self-entities de medios)."""
+        pos = pd.Index(self.entities).get_indexer(pd.Index(list(names), dtype=object))
+        keep = np.ones(self.X.shape[1])
+        keep[pos[pos >= 0]] = 0.0
+        X = (self.X @ sparse.diags(keep)).tocsr()
+        X.eliminate_zeros()
+        return AgendaMatrix(X, self.medios, self.entities)
+
+    def nonempty_rows(self) -> "AgendaMatrix":
+        nz = np.diff(self.X.indptr) > 0
+        return AgendaMatrix(self.X[nz], self.medios[nz], self.entities)
+
+
+def matrix_root(src: str) -> str:
+    return os.path.join(MATRIX_DIR, os.path.splitext(os.path.basename(src))[0])
+
+
+def build_matrix(src: str, entity_col: str = "entity_canon", chunksize: int = CHUNK) -> AgendaMatrix:
+    """Acumula (Medio, entity_col, count) chunk a chunk: memoria ~ nnz + un chunk."""
+    medio_v, ent_v = Vocab("Medio"), Vocab(entity_col)
+    X = None
+    for chunk in storage.iter_table(src, columns=["Medio", entity_col, "count"], chunksize=chunksize):
+        r = medio_v.encode(chunk["Medio"])
+        c = ent_v.encode(chunk[entity_col])
+        ok = (r >= 0) & (c >= 0)
+        part = sparse.csr_matrix((chunk["count"].to_numpy(dtype=np.float64)[ok], (r[ok], c[ok])),
+                                 shape=(len(medio_v), len(ent_v)))
+        if X is None:
+            X = part
+        else:
+            X.resize(part.shape)     # los vocabularios solo crecen
+            X = X + part
+    if X is None:
+        X = sparse.csr_matrix((0, 0))
+    # filas en orden alfabético de Medio (como los scripts originales)
+    order, medios = compact_ids(np.arange(len(medio_v), dtype=np.int32), medio_v)
+    X = X[np.argsort(order)].tocsr()
+    X.sort_indices()
+    return AgendaMatrix(X, medios, ent_v.values)
+
+
+def save_matrix(am: AgendaMatrix, root: str, meta: dict) -> None:
+    tmp = root + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    sparse.save_npz(os.path.join(tmp, "X.npz"), am.X)
+    storage.write_table(pd.DataFrame({"Medio": am.medios}), os.path.join(tmp, "rows.csv"), partition=False)
+    storage.write_table(pd.DataFrame({"entity": am.entities}), os.path.join(tmp, "cols.csv"), partition=False)
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    shutil.rmtree(root, ignore_errors=True)
+    os.replace(tmp, root)
+
+
+def load_matrix(src: str, entity_col: str = "entity_canon", rebuild: bool = False,
+                chunksize: int = CHUNK) -> AgendaMatrix:
+    """Matriz de `src` desde cache; la (re)construye si no existe o si `src` cambió."""
+    root = matrix_root(src)
+    meta_path = os.path.join(root, "meta.json")
+    stamp = source_stamp(src)
+    if not rebuild and os.path.exists(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if (meta.get("format") == FORMAT_VERSION and meta.get("source_stamp") == stamp
+                and meta.get("entity_col") == entity_col):
+            X = sparse.load_npz(os.path.join(root, "X.npz")).tocsr()
+            medios = storage.read_table(os.path.join(root, "rows.csv"))["Medio"].to_numpy(dtype=object)
+            entities = storage.read_table(os.path.join(root, "cols.csv"))["entity"].to_numpy(dtype=object)
+            return AgendaMatrix(X, medios, entities)
+        print(f"[INFO] {src} changed -> rebuilding matrix")
+    if not storage.exists(src):
+        raise SystemExit(f"[ERROR] No existe {src}")
+    am = build_matrix(src, entity_col, chunksize)
+    save_matrix(am, root, {"format": FORMAT_VERSION, "source": src, "source_stamp": stamp,
+                           "entity_col": entity_col, "shape": list(am.X.shape), "nnz": int(am.X.nnz)})
+    print(f"[OK] matrix: {root} | shape={am.X.shape} nnz={am.X.nnz}")
+    return am
+
+
+# -----------------------------
+# Ponderaciones (CSR -> CSR, mismo patrón de nnz o menor)
+# -----------------------------
+def _row_scale(X: sparse.csr_matrix, scale: np.ndarray) -> sparse.csr_matrix:
+    X = X.copy()
+    X.data *= np.repeat(scale, np.diff(X.indptr))
+    return X
+
+
+def _l1_rows(X: sparse.csr_matrix) -> sparse.csr_matrix:
+    tot = np.asarray(X.sum(axis=1)).ravel()
+    with np.errstate(divide="ignore"):
+        inv = np.where(tot > 0, 1.0 / tot, 0.0)
+    return _row_scale(X, inv)
+
+
+def weight_raw(X):
+    return sparse.csr_matrix(X, dtype=np.float64)
+
+
+def weight_share(X):
+    """Share dentro del medio (fila suma 1)."""
+    return _l1_rows(weight_raw(X))
+
+
+def weight_tfidf(X):
+    """TF-IDF sublineal (la ponderación histórica de agenda_similarity.py)."""
+    tfidf = TfidfTransformer(norm="l2", use_idf=True, smooth_idf=True, sublinear_tf=True)
+    return tfidf.fit_transform(weight_raw(X)).tocsr()
+
+
+def weight_bm25(X, k1: float = BM25_K1, b: float = BM25_B):
+    """Okapi BM25 con cada medio como documento (largo = total de menciones)."""
+    X = weight_raw(X)
+    n = X.shape[0]
+    df = np.bincount(X.indices, minlength=X.shape[1])
+    idf = np.log1p((n - df + 0.5) / (df + 0.5))
+    length = np.asarray(X.sum(axis=1)).ravel()
+    avg = length.mean() if n else 0.0
+    norm = k1 * (1 - b + b * length / avg) if avg > 0 else np.full(n, k1)
+    W = X.copy()
+    tf = W.data
+    W.data = idf[W.indices] * tf * (k1 + 1) / (tf + np.repeat(norm, np.diff(W.indptr)))
+    return W
+
+
+def weight_ppmi(X):
+    """PPMI medio–entidad: max(0, log(p(m, e) / (p(m) p(e))))."""
+    X = weight_raw(X)
+    total = X.data.sum()
+    row = np.asarray(X.sum(axis=1)).ravel()
+    col = np.asarray(X.sum(axis=0)).ravel()
+    W = X.copy()
+    rows = np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))
+    with np.errstate(divide="ignore"):
+        W.data = np.maximum(np.log(X.data * total / (row[rows] * col[X.indices])), 0.0)
+    W.eliminate_zeros()
+    return W
+
+
+WEIGHTINGS: Dict[str, Callable] = {
+    "raw": weight_raw,
+    "share": weight_share,
+    "tfidf": weight_tfidf,
+    "bm25": weight_bm25,
+    "ppmi": weight_ppmi,
+}
+
+
+# -----------------------------
+# Métricas (CSR ponderada -> similitud densa medios × medios)
+# -----------------------------
+def sim_cosine(W):
+    return cosine_matrix(W)
+
+
+def sim_hellinger(W):
+    """1 - H(P, Q), H² = 1 - Σ √(p q) (coeficiente de Bhattacharyya como X Xᵀ)."""
+    R = _l1_rows(W)
+    R.data = np.sqrt(R.data)
+    bc = (R @ R.T).toarray()
+    S = 1.0 - np.sqrt(np.clip(1.0 - bc, 0.0, None))
+    empty = np.diff(W.indptr) == 0
+    S[empty, :] = np.nan
+    S[:, empty] = np.nan
+    return S
+
+
+def sim_js(W):
+    """
+    1 - √JSD(P, Q) (base 2). Por fila p (densa) contra todas las filas Q a la vez:
+    solo el soporte de Q aporta términos mixtos; la masa de p fuera de ese
+    soporte aporta ½·p·log 2 (igual que q donde p = 0).
+    """
+    P = _l1_rows(W)
+    n = P.shape[0]
+    rows_nnz = np.diff(P.indptr)
+    starts = P.indptr[:-1]
+    log2 = np.log(2.0)
+    S = np.full((n, n), np.nan)
+    q = P.data
+    for i in range(n):
+        if rows_nnz[i] == 0:
+            continue
+        p = np.zeros(P.shape[1])
+        p[P.indices[P.indptr[i]:P.indptr[i + 1]]] = P.data[P.indptr[i]:P.indptr[i + 1]]
+        pc = p[P.indices]
+        m = pc + q
+        both = pc > 0
+        term = np.where(both, 0.0, 0.5 * q * log2)
+        term[both] = 0.5 * (pc[both] * np.log(2 * pc[both] / m[both]) + q[both] * np.log(2 * q[both] / m[both]))
+        ok = rows_nnz > 0
+        inner = np.zeros(n)
+        shared_p = np.zeros(n)
+        inner[ok] = np.add.reduceat(term, starts[ok])
+        shared_p[ok] = np.add.reduceat(pc, starts[ok])
+        jsd = (inner + 0.5 * log2 * (1.0 - shared_p)) / log2
+        S[i, ok] = 1.0 - np.sqrt(np.clip(jsd[ok], 0.0, 1.0))
+    return S
+
+
+METRICS: Dict[str, Callable] = {
+    "cosine": sim_cosine,
+    "js": sim_js,
+    "hellinger": sim_hellinger,
+}
+
+
+def similarity(X, weighting: str = "raw", metric: str = "cosine") -> np.ndarray:
+    return METRICS[metric](WEIGHTINGS[weighting](X))
+
+
+def method_name(weighting: str, metric: str) -> str:
+    return f"{weighting}_{metric}"
+
+
+def all_similarities(X, weightings=None, metrics=None) -> Dict[str, np.ndarray]:
+    """{"tfidf_cosine": S, ...}; cada ponderación se calcula una vez para todas las métricas."""
+    out = {}
+    for w in weightings or WEIGHTINGS:
+        W = WEIGHTINGS[w](X)
+        for m in metrics or METRICS:
+            out[method_name(w, m)] = METRICS[m](W)
+    return out
+
+
+def pairs_frame(medios: np.ndarray, sims: Dict[str, np.ndarray], prefix: Optional[str] = None) -> pd.DataFrame:
+    """Long-form (Medio_A, Medio_B, <método>...) con A < B en orden de filas."""
+    i, j = np.triu_indices(len(medios), k=1)
+    out = pd.DataFrame({"Medio_A": medios[i], "Medio_B": medios[j]})
+    for name, S in sims.items():
+        out[f"{prefix}{name}" if prefix else name] = S[i, j]
+    return out
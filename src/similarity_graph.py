@@ -0,0 +1,125 @@
+"""
+Construcción de grafos de similitud para Louvain, sin loops por par.
+
+Las aristas salen como arrays (u, v, w) con máscaras de NumPy y el grafo se arma
+de una vez (add_weighted_edges_from):
+
+  - edges_from_matrix: matriz cuadrada de similitud (medios × medios), triángulo
+    superior en orden fila-mayor (mismo grafo, mismo orden de nodos y aristas
+    que el doble loop sobre sim.loc[i, j]);
+  - edges_from_pairs: tabla long-form (Medio_A, Medio_B, cosine), en orden de filas;
+  - knn_edges: coseno entre filas de una matriz dispersa por bloques de filas,
+    sin materializar la matriz n × n completa (grafos de entidades).
+
+Filtros: threshold (w >= threshold) y/o top_k por nodo (la arista queda si está
+entre las k más fuertes de cualquiera de sus extremos; mutual=True exige ambos).
+"""
+from __future__ import annotations
+
+from typing import Optional, Sequence, Tuple
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from sparse_similarity import l2_normalize_rows
+
+Edges = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def topk_mask(u: np.ndarray, v: np.ndarray, w: np.ndarray, k: int, mutual: bool = False) -> np.ndarray:
+    """Aristas dentro del top-k (por peso) de u, de v, o de ambos (mutual)."""
+    n = len(w)
+    ends = np.concatenate([u, v])
+    weights = np.concatenate([w, w])
+    # rango de cada arista dentro de su nodo: orden por (nodo, -peso, posición)
+    order = np.lexsort((np.arange(2 * n), -weights, ends))
+    sorted_ends = ends[order]
+    start = np.r_[0, np.flatnonzero(sorted_ends[1:] != sorted_ends[:-1]) + 1]
+    rank = np.empty(2 * n, dtype=np.int64)
+    rank[order] = np.arange(2 * n) - np.repeat(start, np.diff(np.r_[start, 2 * n]))
+    in_u, in_v = rank[:n] < k, rank[n:] < k
+    return (in_u & in_v) if mutual else (in_u | in_v)
+
+
+def filter_edges(u, v, w, threshold: Optional[float] = None, top_k: Optional[int] = None,
+                 mutual: bool = False) -> Edges:
+    u, v, w = np.asarray(u), np.asarray(v), np.asarray(w, dtype=np.float64)
+    keep = ~np.isnan(w)
+    if threshold is not None:
+        keep &= w >= threshold
+    u, v, w = u[keep], v[keep], w[keep]
+    if top_k is not None and len(w):
+        keep = topk_mask(u, v, w, top_k, mutual)
+        u, v, w = u[keep], v[keep], w[keep]
+    return u, v, w
+
+
+def edges_from_matrix(S, labels: Optional[Sequence] = None, threshold: Optional[float] = None,
+                      top_k: Optional[int] = None, mutual: bool = False) -> Edges:
+    """Matriz de similitud (ndarray o DataFrame con index=columns) -> aristas i < j."""
+    if isinstance(S, pd.DataFrame):
+        labels = S.index.to_numpy() if labels is None else labels
+        S = S.to_numpy(dtype=np.float64)
+    labels = np.asarray(labels if labels is not None else np.arange(len(S)), dtype=object)
+    i, j = np.triu_indices(len(S), k=1)
+    i, j, w = filter_edges(i, j, S[i, j], threshold, top_k, mutual)
+    return labels[i], labels[j], w
+
+
+def edges_from_pairs(df: pd.DataFrame, a: str = "Medio_A", b: str = "Medio_B", weight: str = "cosine",
+                     threshold: Optional[float] = None, top_k: Optional[int] = None,
+                     mutual: bool = False) -> Edges:
+    """Tabla long-form de pares -> aristas (en el orden de las filas)."""
+    u = df[a].to_numpy(dtype=object)
+    v = df[b].to_numpy(dtype=object)
+    u, v, w = filter_edges(u, v, df[weight].to_numpy(dtype=np.float64), threshold)
+    if top_k is not None and len(w):
+        # ranking por nodo sobre códigos enteros
+        codes, _ = pd.factorize(np.concatenate([u, v]))
+        keep = topk_mask(codes[:len(u)], codes[len(u):], w, top_k, mutual)
+        u, v, w = u[keep], v[keep], w[keep]
+    return u, v, w
+
+
+def knn_edges(X, labels: Optional[Sequence] = None, k: int = 10, threshold: Optional[float] = None,
+              mutual: bool = False, block_rows: int = 2048) -> Edges:
+    """
+    Coseno entre filas de X (dispersa) y top-k vecinos por fila, por bloques de
+    `block_rows` filas (memoria ~ block_rows × n). Devuelve aristas i < j únicas.
+    """
+    Xn = l2_normalize_rows(X)
+    n = Xn.shape[0]
+    labels = np.asarray(labels if labels is not None else np.arange(n), dtype=object)
+    kk = min(k, n - 1)
+    if kk <= 0:
+        empty = np.empty(0)
+        return labels[:0], labels[:0], empty
+    us, vs, ws = [], [], []
+    for s in range(0, n, block_rows):
+        e = min(s + block_rows, n)
+        B = (Xn[s:e] @ Xn.T).toarray()
+        B[np.arange(e - s), np.arange(s, e)] = -np.inf          # sin auto-aristas
+        cand = np.argpartition(-B, kk - 1, axis=1)[:, :kk]
+        us.append(np.repeat(np.arange(s, e), kk))
+        vs.append(cand.ravel())
+        ws.append(np.take_along_axis(B, cand, axis=1).ravel())
+    u, v, w = np.concatenate(us), np.concatenate(vs), np.concatenate(ws)
+    keep = w > 0 if threshold is None else w >= threshold
+    u, v, w = u[keep], v[keep], w[keep]
+    # arista no dirigida: (min, max); mutual = propuesta desde ambos extremos
+    a, b = np.minimum(u, v), np.maximum(u, v)
+    key = a.astype(np.int64) * n + b
+    _, first, counts = np.unique(key, return_index=True, return_counts=True)
+    if mutual:
+        first = first[counts == 2]
+    return labels[a[first]], labels[b[first]], w[first]
+
+
+def build_graph(u, v, w, nodes: Optional[Sequence] = None) -> nx.Graph:
+    """Grafo no dirigido en bloque; `nodes` agrega también nodos aislados (en ese orden)."""
+    G = nx.Graph()
+    if nodes is not None:
+        G.add_nodes_from(nodes)
+    G.add_weighted_edges_from(zip(u.tolist(), v.tolist(), np.asarray(w, dtype=float).tolist()))
+    return G
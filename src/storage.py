@@ -0,0 +1,478 @@
+"""
+Capa de I/O compartida para data/processed y data/bi.
+
+- Escritura en Parquet (dataset hive particionado por mes) con dictionary
+  encoding para columnas repetitivas (Medio, entity_canon, entity_type,
+  predict_emotion).
+- Lectura con proyección de columnas y predicate pushdown (filters / months).
+- Las tablas de data/bi (Looker) además se exportan a CSV.
+- Si un builder pide una tabla que todavía solo existe como CSV (artefactos
+  viejos), se lee el CSV: las rutas en los scripts siguen siendo *.csv.
+
+Convención: la ruta lógica es la del CSV ("data/bi/foo.csv"); el dataset
+Parquet vive al lado ("data/bi/foo.parquet/").
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from months import to_month
+
+DICT_COLS = ["Medio", "entity_canon", "entity_type", "predict_emotion"]
+
+# tablas que Looker consume: se mantiene el export CSV
+CSV_EXPORT_DIRS = ("data/bi",)
+
+# clave de partición: "month" si la tabla ya la trae; si solo tiene fecha_real
+# se deriva una columna oculta "part_month" (no se devuelve al leer salvo que se pida)
+MONTH_COL = "month"
+HIDDEN_MONTH_COL = "part_month"
+
+# orden original de columnas (la partición se reubica al final al escribir);
+# los archivos con prefijo "_" los ignora pyarrow.dataset
+COLUMNS_FILE = "_columns.json"
+
+CHUNK = 1_000_000
+
+
+def parquet_path(path: str) -> str:
+    root, ext = os.path.splitext(path)
+    return root + ".parquet" if ext == ".csv" else path
+
+
+def has_parquet(path: str) -> bool:
+    return os.path.isdir(parquet_path(path))
+
+
+def exists(path: str) -> bool:
+    return has_parquet(path) or os.path.exists(path)
+
+
+def list_months(path: str) -> List[str]:
+    """Valores de la partición mensual del dataset Parquet (sin leer datos); [] si no hay."""
+    root = parquet_path(path)
+    if not os.path.isdir(root):
+        return []
+    part_col = _partition_col(root)
+    if part_col is None:
+        return []
+    prefix = part_col + "="
+    return sorted(n[len(prefix):] for n in os.listdir(root)
+                  if n.startswith(prefix) and os.path.isdir(os.path.join(root, n)))
+
+
+def wants_csv_export(path: str) -> bool:
+    norm = os.path.normpath(path).replace(os.sep, "/")
+    return path.endswith(".csv") and any(norm.startswith(d + "/") or f"/{d}/" in norm for d in CSV_EXPORT_DIRS)
+
+
+def _month_from_fecha(fecha: pd.Series) -> pd.Series:
+    return to_month(fecha).fillna("unknown").astype(object)
+
+
+def _partition_col(root: str) -> Optional[str]:
+    for name in sorted(os.listdir(root)):
+        if "=" in name and os.path.isdir(os.path.join(root, name)):
+            return name.split("=", 1)[0]
+    return None
+
+
+# -----------------------------
+# Escritura
+# -----------------------------
+
+class TableWriter:
+    """
+    Writer incremental (reemplaza el patrón `to_csv(mode="w" if first else "a")`).
+    Cada write() agrega archivos al dataset; el esquema queda fijo desde el
+    primer chunk para que todos los part files sean compatibles.
+    """
+
+    def __init__(self, path: str, csv_export: Optional[bool] = None, partition: bool = True,
+                 append: bool = False, staging: Optional[str] = None):
+        self.path = path
+        self.root = parquet_path(path)
+        self.csv_export = wants_csv_export(path) if csv_export is None else csv_export
+        self.partition = partition
+        self.schema: Optional[pa.Schema] = None
+        self.part_col: Optional[str] = None
+        self.n_parts = 0
+        self.rows = 0
+        self.tag = "part"
+
+        if append and os.path.isdir(self.root):
+            # agrega archivos a un dataset existente (mismo esquema / partición);
+            # el CSV export lo regenera quien llama (ver replace_partitions)
+            dataset, self.part_col = _dataset(path)
+            schema = dataset.schema
+            if self.part_col:
+                schema = schema.remove(schema.get_field_index(self.part_col))
+                schema = schema.append(pa.field(self.part_col, pa.string()))
+            self.schema = schema.remove_metadata()
+            self.csv_export = False
+            self.tag = f"upd{time.time_ns()}"
+            if staging:
+                # mismo esquema, pero los part files van a `staging` (fuera del dataset)
+                self.root = staging
+                os.makedirs(staging, exist_ok=True)
+            return
+
+        if os.path.isdir(self.root):
+            shutil.rmtree(self.root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _prepare(self, df: pd.DataFrame) -> pd.DataFrame:
+        if not self.partition:
+            return df
+        if self.schema is None:
+            if MONTH_COL in df.columns:
+                self.part_col = MONTH_COL
+            elif "fecha_real" in df.columns:
+                self.part_col = HIDDEN_MONTH_COL
+        if self.part_col == MONTH_COL:
+            df = df.assign(**{MONTH_COL: df[MONTH_COL].astype("string").fillna("unknown")})
+        elif self.part_col == HIDDEN_MONTH_COL:
+            df = df.assign(**{HIDDEN_MONTH_COL: _month_from_fecha(df["fecha_real"])})
+        return df
+
+    def write(self, df: pd.DataFrame) -> None:
+        first = self.n_parts == 0
+        if self.csv_export:
+            df.to_csv(self.path, mode="w" if first else "a", index=False, header=first)
+
+        df = self._prepare(df)
+        if self.schema is None:
+            cols = [c for c in df.columns if c != HIDDEN_MONTH_COL]
+            with open(os.path.join(self.root, COLUMNS_FILE), "w", encoding="utf-8") as f:
+                json.dump(cols, f)
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            # columnas todo-null en el primer chunk -> string
+            fields = [pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f for f in table.schema]
+            self.schema = pa.schema(fields).remove_metadata()
+            table = table.cast(self.schema)
+        else:
+            # sin metadata pandas (igual que el primer chunk): si no, un dataset hecho
+            # solo de archivos agregados devuelve `month` como string[python]
+            table = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False).replace_schema_metadata()
+
+        dict_cols = [c for c in DICT_COLS if c in table.column_names and c != self.part_col]
+        name = f"{self.tag}-{self.n_parts:05d}-0.parquet"
+        # un pq.write_table por partición (mismo layout hive que write_to_dataset);
+        # el writer de datasets de pyarrow a veces aborta el proceso al salir
+        # ("terminate called without an active exception") con sus hilos vivos
+        if self.part_col:
+            keys = table[self.part_col]
+            for value in pc.unique(keys).to_pylist():
+                part = table.filter(pc.equal(keys, value)).drop_columns([self.part_col])
+                d = os.path.join(self.root, f"{self.part_col}={value}")
+                os.makedirs(d, exist_ok=True)
+                pq.write_table(part, os.path.join(d, name), use_dictionary=dict_cols or False)
+        else:
+            pq.write_table(table, os.path.join(self.root, name), use_dictionary=dict_cols or False)
+        self.n_parts += 1
+        self.rows += len(df)
+
+    def close(self) -> None:
+        if self.rows == 0 and self.schema is not None and not self.tag.startswith("upd"):
+            # sin filas no hay particiones: un archivo vacío con el esquema (sin
+            # partición) para que los lectores vean las columnas
+            pq.write_table(self.schema.empty_table(), os.path.join(self.root, f"{self.tag}-empty.parquet"))
+        if self.n_parts == 0 and self.csv_export:
+            # sin datos: deja al menos el CSV vacío (el dataset queda vacío)
+            open(self.path, "w").close()
+
+    def __enter__(self) -> "TableWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def write_table(df: pd.DataFrame, path: str, csv_export: Optional[bool] = None, partition: bool = True) -> None:
+    """Escribe una tabla completa (Parquet + CSV si es de data/bi)."""
+    with TableWriter(path, csv_export=csv_export, partition=partition) as w:
+        w.write(df)
+
+
+# -----------------------------
+# Lectura
+# -----------------------------
+
+def _dataset(path: str):
+    root = parquet_path(path)
+    part_col = _partition_col(root)
+    partitioning = None
+    if part_col:
+        partitioning = ds.partitioning(pa.schema([(part_col, pa.string())]), flavor="hive")
+    return ds.dataset(root, format="parquet", partitioning=partitioning), part_col
+
+
+def _expression(filters: Optional[Sequence], months: Optional[Sequence[str]], part_col: Optional[str]):
+    expr = pq.filters_to_expression(filters) if filters else None
+    if months is not None:
+        col = part_col or MONTH_COL
+        m = ds.field(col).isin(list(months))
+        expr = m if expr is None else (expr & m)
+    return expr
+
+
+def _apply_dtype(df: pd.DataFrame, dtype: Any) -> pd.DataFrame:
+    """dtype estilo read_csv; str se omite (Parquet ya trae strings tipados)."""
+    if dtype is None or dtype is str or dtype == "string":
+        return df
+    if isinstance(dtype, dict):
+        conv = {c: t for c, t in dtype.items() if c in df.columns and t is not str}
+        return df.astype(conv) if conv else df
+    return df.astype(dtype)
+
+
+def _column_order(path: str, columns: Optional[List[str]]) -> Optional[List[str]]:
+    if columns is not None:
+        return list(columns)
+    meta = os.path.join(parquet_path(path), COLUMNS_FILE)
+    if not os.path.exists(meta):
+        return None
+    with open(meta, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _to_pandas(table: pa.Table, order: Optional[List[str]]) -> pd.DataFrame:
+    df = table.to_pandas()
+    if order is not None:
+        df = df[[c for c in order if c in df.columns]]
+    # columnas de partición / diccionario -> strings planos (evita groupby categórico)
+    for c in df.columns:
+        if isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].astype(object)
+    return df
+
+
+def _csv_filter(df: pd.DataFrame, filters: Optional[Sequence], months: Optional[Sequence[str]]) -> pd.DataFrame:
+    ops = {
+        "==": lambda s, v: s == v, "=": lambda s, v: s == v, "!=": lambda s, v: s != v,
+        "<": lambda s, v: s < v, "<=": lambda s, v: s <= v,
+        ">": lambda s, v: s > v, ">=": lambda s, v: s >= v,
+        "in": lambda s, v: s.isin(list(v)), "not in": lambda s, v: ~s.isin(list(v)),
+    }
+    for col, op, val in filters or []:
+        df = df[ops[op](df[col], val)]
+    if months is not None:
+        if MONTH_COL in df.columns:
+            df = df[df[MONTH_COL].isin(list(months))]
+        else:
+            df = df[_month_from_fecha(df["fecha_real"]).isin(list(months))]
+    return df
+
+
+def _csv_usecols(path, columns, filters, months):
+    if columns is None:
+        return None
+    need = list(columns) + [f[0] for f in filters or [] if f[0] not in columns]
+    if months is not None:
+        header = pd.read_csv(path, nrows=0).columns
+        month_src = MONTH_COL if MONTH_COL in header else "fecha_real"
+        if month_src not in need:
+            need.append(month_src)
+    return need
+
+
+def read_table(path: str, columns: Optional[List[str]] = None, filters: Optional[Sequence] = None,
+               months: Optional[Sequence[str]] = None, dtype: Any = None) -> pd.DataFrame:
+    """
+    Lee una tabla (Parquet si existe, si no el CSV).
+    - columns: proyección
+    - filters: [(col, op, value), ...] en formato pyarrow (pushdown en Parquet)
+    - months: atajo para filtrar por la partición mensual
+    """
+    if has_parquet(path):
+        dataset, part_col = _dataset(path)
+        table = dataset.to_table(columns=columns, filter=_expression(filters, months, part_col))
+        df = _to_pandas(table, _column_order(path, columns))
+        return _apply_dtype(df, dtype)
+
+    usecols = _csv_usecols(path, columns, filters, months)
+    df = pd.read_csv(path, usecols=usecols, dtype=dtype)
+    df = _csv_filter(df, filters, months)
+    return df[columns] if columns is not None else df
+
+
+def iter_table(path: str, columns: Optional[List[str]] = None, filters: Optional[Sequence] = None,
+               months: Optional[Sequence[str]] = None, dtype: Any = None,
+               chunksize: int = CHUNK) -> Iterator[pd.DataFrame]:
+    """Igual que read_table pero por chunks de ~chunksize filas (memoria acotada)."""
+    if has_parquet(path):
+        dataset, part_col = _dataset(path)
+        order = _column_order(path, columns)
+        scanner = dataset.scanner(columns=columns, filter=_expression(filters, months, part_col),
+                                  batch_size=min(chunksize, 1 << 20))
+        pending, n = [], 0
+        for batch in scanner.to_batches():
+            if batch.num_rows == 0:
+                continue
+            pending.append(batch)
+            n += batch.num_rows
+            if n >= chunksize:
+                yield _apply_dtype(_to_pandas(pa.Table.from_batches(pending), order), dtype)
+                pending, n = [], 0
+        if pending:
+            yield _apply_dtype(_to_pandas(pa.Table.from_batches(pending), order), dtype)
+        return
+
+    usecols = _csv_usecols(path, columns, filters, months)
+    for chunk in pd.read_csv(path, usecols=usecols, dtype=dtype, chunksize=chunksize):
+        chunk = _csv_filter(chunk, filters, months)
+        yield chunk[columns] if columns is not None else chunk
+
+
+def disk_size(path: str) -> Dict[str, int]:
+    """Bytes en disco del CSV y del dataset Parquet (0 si no existe)."""
+    out = {"csv": os.path.getsize(path) if os.path.exists(path) else 0, "parquet": 0}
+    root = parquet_path(path)
+    if os.path.isdir(root):
+        for d, _, files in os.walk(root):
+            out["parquet"] += sum(os.path.getsize(os.path.join(d, f)) for f in files)
+    return out
+
+
+# -----------------------------
+# Mantenimiento
+# -----------------------------
+
+def export_csv(path: str, chunksize: int = CHUNK) -> None:
+    """Regenera el CSV de una tabla a partir de su dataset Parquet."""
+    first = True
+    for chunk in iter_table(path, chunksize=chunksize):
+        chunk.to_csv(path, mode="w" if first else "a", index=False, header=first)
+        first = False
+    if first:
+        open(path, "w").close()
+
+
+def _column_kind(col: pd.Series) -> str:
+    """Tipo de una columna en un chunk: empty / bool / int / float / str."""
+    if col.isna().all():
+        return "empty"
+    t = col.dtype
+    if pd.api.types.is_bool_dtype(t):
+        return "bool"
+    if pd.api.types.is_integer_dtype(t):
+        return "int"
+    if pd.api.types.is_float_dtype(t):
+        # enteros con blancos llegan como float: siguen siendo Int64 si son enteros exactos
+        v = col.dropna().to_numpy()
+        integral = np.isfinite(v).all() and (np.mod(v, 1) == 0).all() and np.abs(v).max() < 2 ** 53
+        return "int" if integral else "float"
+    return "str"
+
+
+def _merge_kind(a: str, b: str) -> str:
+    if a == "empty" or a == b:
+        return b
+    if b == "empty":
+        return a
+    if {a, b} == {"int", "float"}:
+        return "float"
+    return "str"
+
+
+_KIND_DTYPE = {"bool": "boolean", "int": "Int64", "float": "float64", "str": str, "empty": str}
+
+
+def _csv_dtypes(path: str, chunksize: int = CHUNK) -> Dict[str, Any]:
+    """
+    dtypes estables para leer un CSV grande por chunks (evita esquemas distintos
+    por chunk). Se infieren sobre la columna completa (una pasada): un Int64 que
+    más adelante trae decimales pasa a float64, y si mezcla texto a str.
+    """
+    kinds: Dict[str, str] = {}
+    for chunk in pd.read_csv(path, chunksize=chunksize, low_memory=False):
+        for c in chunk.columns:
+            kinds[c] = _merge_kind(kinds.get(c, "empty"), _column_kind(chunk[c]))
+    if not kinds:
+        kinds = {c: "str" for c in pd.read_csv(path, nrows=0).columns}
+    return {c: _KIND_DTYPE[k] for c, k in kinds.items()}
+
+
+def csv_to_parquet(path: str, chunksize: int = CHUNK) -> int:
+    """Convierte (streaming) una tabla CSV existente a su dataset Parquet. Devuelve filas."""
+    dtype = _csv_dtypes(path, chunksize)
+    with TableWriter(path, csv_export=False) as w:
+        for chunk in pd.read_csv(path, dtype=dtype, chunksize=chunksize):
+            w.write(chunk)
+    return w.rows
+
+
+def replace_partitions(path: str, fresh: pd.DataFrame, months: Sequence[str]) -> int:
+    """
+    Reemplaza solo los meses `months` de una tabla mensual por `fresh`. El
+    esquema se toma del dataset antes de tocarlo; `fresh` se escribe primero en
+    un directorio de staging y solo si eso termina se cambian las particiones
+    (si falla, el dataset queda como estaba). El CSV (si es tabla BI) se
+    regenera desde el Parquet. Devuelve filas totales de la tabla.
+    """
+    root = parquet_path(path)
+    if not has_parquet(path):
+        # solo existe CSV (artefacto viejo): se migra primero
+        if os.path.exists(path):
+            csv_to_parquet(path)
+        else:
+            write_table(fresh, path)
+            return len(fresh)
+
+    dataset, part_col = _dataset(path)
+    if part_col is None:
+        # dataset vacío o sin partición mensual: se reescribe completo
+        old = read_table(path)
+        if len(old):
+            old = old[~old[MONTH_COL].astype(str).isin(list(months))]
+            fresh = pd.concat([old, fresh], ignore_index=True)
+        write_table(fresh, path)
+        return len(fresh)
+
+    tag = time.time_ns()
+    staging, trash = f"{root}.staging-{tag}", f"{root}.old-{tag}"
+    try:
+        if len(fresh):
+            with TableWriter(path, append=True, staging=staging) as w:
+                w.write(fresh)
+        staged = os.listdir(staging) if os.path.isdir(staging) else []
+        names = sorted(set(f"{part_col}={m}" for m in months) | set(staged))
+
+        # swap: particiones viejas -> trash, staged -> dataset (renames en el mismo fs)
+        os.makedirs(trash)
+        moved, swapped = [], []
+        try:
+            for name in names:
+                d = os.path.join(root, name)
+                if os.path.isdir(d):
+                    os.replace(d, os.path.join(trash, name))
+                    moved.append(name)
+            for name in staged:
+                os.replace(os.path.join(staging, name), os.path.join(root, name))
+                swapped.append(name)
+        except BaseException:
+            for name in swapped:
+                shutil.rmtree(os.path.join(root, name))
+            for name in moved:
+                os.replace(os.path.join(trash, name), os.path.join(root, name))
+            raise
+        shutil.rmtree(trash)
+    finally:
+        if os.path.isdir(staging):
+            shutil.rmtree(staging)
+
+    if wants_csv_export(path):
+        export_csv(path)
+    dataset, _ = _dataset(path)
+    return dataset.count_rows()
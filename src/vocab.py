@@ -0,0 +1,113 @@
+"""
+Diccionarios persistentes Medio / entity_canon -> id int32 estable.
+
+Los ids se asignan una vez (append-only: un valor nuevo recibe el siguiente id,
+los existentes nunca cambian) y se guardan junto a las tablas procesadas:
+
+    data/processed/dict_medio.csv    (id, Medio)
+    data/processed/dict_entity.csv   (id, entity_canon)
+
+Con ids globales los builders agrupan y arman matrices sobre enteros: la columna
+de entidades de una matriz medio × entidad es directamente entity_id (sin
+dict/map por script) y solo las filas (pocos medios) se compactan.
+
+Uso:
+    ents = entity_vocab()
+    eid = ents.encode(df["entity_canon"])        # np.int32, -1 para nulos
+    ...
+    save_vocabs()                                # persiste solo si hubo ids nuevos
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import storage
+
+MEDIO_DICT = "data/processed/dict_medio.csv"
+ENTITY_DICT = "data/processed/dict_entity.csv"
+
+NA_ID = -1
+
+
+class Vocab:
+    """Valor <-> id int32 append-only. path=None: diccionario solo en memoria."""
+
+    def __init__(self, name: str, path: Optional[str] = None):
+        self.name = name
+        self.path = path
+        self.values = np.empty(0, dtype=object)
+        self.dirty = False
+        if path is not None and storage.exists(path):
+            d = storage.read_table(path).sort_values("id")
+            if not np.array_equal(d["id"].to_numpy(), np.arange(len(d))):
+                raise ValueError(f"{path}: ids are not 0..n-1")
+            self.values = d[name].to_numpy(dtype=object)
+        self.index = pd.Index(self.values)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def encode(self, values, grow: bool = True) -> np.ndarray:
+        """ids por fila (int32). Nulos -> NA_ID; desconocidos -> id nuevo (grow) o NA_ID."""
+        codes, uniq = pd.factorize(pd.Series(values), sort=False)
+        uniq = np.asarray(uniq, dtype=object)
+        pos = self.index.get_indexer(uniq)
+        new = pos < 0
+        if grow and new.any():
+            pos[new] = np.arange(len(self.values), len(self.values) + int(new.sum()))
+            self.values = np.concatenate([self.values, uniq[new]])
+            self.index = pd.Index(self.values)
+            self.dirty = True
+        if len(self.values) > np.iinfo(np.int32).max:
+            raise OverflowError(f"{self.name}: vocabulary exceeds int32")
+        ids = pos.astype(np.int32)[np.maximum(codes, 0)] if len(pos) else np.full(len(codes), NA_ID, np.int32)
+        ids[codes < 0] = NA_ID
+        return ids
+
+    def decode(self, ids: np.ndarray) -> np.ndarray:
+        """ids -> valores (object; None para NA_ID)."""
+        ids = np.asarray(ids)
+        out = np.empty(len(ids), dtype=object)
+        ok = ids >= 0
+        out[ok] = self.values[ids[ok]]
+        return out
+
+    def save(self) -> None:
+        if self.path is None or not self.dirty:
+            return
+        storage.write_table(pd.DataFrame({"id": np.arange(len(self.values), dtype=np.int32),
+                                          self.name: self.values}), self.path, partition=False)
+        self.dirty = False
+
+
+@lru_cache(maxsize=None)
+def medio_vocab() -> Vocab:
+    return Vocab("Medio", MEDIO_DICT)
+
+
+@lru_cache(maxsize=None)
+def entity_vocab() -> Vocab:
+    return Vocab("entity_canon", ENTITY_DICT)
+
+
+def save_vocabs() -> None:
+    medio_vocab().save()
+    entity_vocab().save()
+
+
+def compact_ids(ids: np.ndarray, vocab: Vocab) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    ids globales -> índices locales 0..k-1 ordenados por valor (p. ej. filas de
+    medios en orden alfabético, como los builders originales). Devuelve
+    (locales, etiquetas).
+    """
+    present = np.unique(ids)
+    labels = vocab.decode(present)
+    order = np.argsort(labels.astype(str), kind="stable")
+    rank = np.empty(len(present), dtype=np.int64)
+    rank[order] = np.arange(len(present))
+    return rank[np.searchsorted(present, ids)], labels[order]